@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
-from .models import User
+from .models import User, XpEvent
 
 
 @admin.register(User)
@@ -37,3 +37,18 @@ class UserAdmin(BaseUserAdmin):
 
     search_fields = ("username", "email")
     ordering = ("username",)
+
+
+@admin.register(XpEvent)
+class XpEventAdmin(admin.ModelAdmin):
+    list_display = (
+        "user",
+        "amount",
+        "branch_name",
+        "score",
+        "created_at",
+    )
+
+    list_select_related = ("user",)
+    search_fields = ("user__username", "branch_name")
+    readonly_fields = ("user", "branch_id", "branch_name", "score", "amount", "created_at")
@@ -0,0 +1,39 @@
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+
+from core import metrics
+
+
+def user_cache_key(user_id):
+    return f"accounts:user:{user_id}"
+
+
+def invalidate_user(user_id):
+    cache.delete(user_cache_key(user_id))
+
+
+class CachedModelBackend(ModelBackend):
+    """
+    ModelBackend that serves the per-request session user from the cache.
+
+    Entries live for USER_CACHE_TTL seconds (0 disables caching) and are
+    dropped whenever the user row is saved or deleted.
+    """
+
+    def get_user(self, user_id):
+        ttl = settings.USER_CACHE_TTL
+        if not ttl:
+            return super().get_user(user_id)
+
+        key = user_cache_key(user_id)
+        user = cache.get(key)
+        if user is not None:
+            metrics.cache_hit("user")
+            return user
+
+        metrics.cache_miss("user")
+        user = super().get_user(user_id)
+        if user is not None:
+            cache.set(key, user, ttl)
+        return user
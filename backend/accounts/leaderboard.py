@@ -0,0 +1,142 @@
+"""
+XP leaderboard.
+
+Active users are ordered by (level desc, xp desc, id asc) over the
+accounts_user_rank index, partial on is_active. Ranks use competition
+ranking: 1 + the number of users with a strictly higher (level, xp). Two
+cached structures keep lookups cheap:
+
+* the top-N snapshot, computed with a RANK() window that PostgreSQL streams
+  off the index and stops after N rows; dropped when add_xp moves a score
+  into (or within) it;
+* a per-level user count, so "users ahead of me" is a sum over levels plus
+  a count of the same-level users with more xp, read from an index range
+  (its cost grows with the number of those users, not the table).
+
+The level counts are never edited in place, which would lose concurrent
+updates: level-ups, new users and (de)activations delete them, and the next
+read recounts. A read racing such a delete can store counts that are
+already stale, so they expire after LEADERBOARD_LEVELS_TTL seconds.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, F, Q, Window
+from django.db.models.functions import Rank
+
+from core import metrics
+
+from .models import User
+
+TOP_KEY = "leaderboard:top"
+LEVELS_KEY = "leaderboard:levels"
+ORDERING = [F("level").desc(), F("xp").desc(), F("id").asc()]
+FIELDS = ("id", "username", "level", "xp")
+
+
+def top(limit):
+    """Return the first `limit` (<= LEADERBOARD_TOP_N) ranked users."""
+    snapshot = cache.get(TOP_KEY)
+    if snapshot is None:
+        metrics.cache_miss("leaderboard")
+        snapshot = list(
+            User.objects.filter(is_active=True)
+            .annotate(rank=Window(Rank(), order_by=[F("level").desc(), F("xp").desc()]))
+            .order_by(*ORDERING)
+            .values(*FIELDS, "rank")[: settings.LEADERBOARD_TOP_N]
+        )
+        cache.set(TOP_KEY, snapshot, settings.LEADERBOARD_CACHE_TTL)
+    else:
+        metrics.cache_hit("leaderboard")
+    return snapshot[:limit]
+
+
+def level_counts():
+    counts = cache.get(LEVELS_KEY)
+    if counts is None:
+        metrics.cache_miss("leaderboard_levels")
+        counts = dict(
+            User.objects.filter(is_active=True)
+            .values_list("level")
+            .annotate(n=Count("id"))
+            .values_list("level", "n")
+        )
+        cache.set(LEVELS_KEY, counts, settings.LEADERBOARD_LEVELS_TTL)
+    else:
+        metrics.cache_hit("leaderboard_levels")
+    return counts
+
+
+def users_ahead(level, xp):
+    """Number of users with a strictly higher (level, xp)."""
+    above = sum(n for lvl, n in level_counts().items() if lvl > level)
+    same_level = User.objects.filter(is_active=True, level=level, xp__gt=xp).count()
+    return above + same_level
+
+
+def rank_of(user):
+    return users_ahead(user.level, user.xp) + 1
+
+
+def encode_cursor(row):
+    return f"{row['level']}:{row['xp']}:{row['id']}"
+
+
+def page(cursor=None, limit=50):
+    """
+    Keyset page of ranked users after `cursor` ("level:xp:id"). Returns
+    (rows, next_cursor); raises ValueError for a malformed cursor.
+    """
+    if not cursor and limit <= settings.LEADERBOARD_TOP_N:
+        rows = top(limit)
+        next_cursor = encode_cursor(rows[-1]) if len(rows) == limit else None
+        return rows, next_cursor
+
+    qs = User.objects.filter(is_active=True).order_by(*ORDERING)
+    if cursor:
+        level, xp, user_id = (int(part) for part in cursor.split(":"))
+        qs = qs.filter(
+            Q(level__lt=level)
+            | Q(level=level, xp__lt=xp)
+            | Q(level=level, xp=xp, id__gt=user_id)
+        )
+    rows = list(qs.values(*FIELDS)[:limit])
+    if not rows:
+        return rows, None
+
+    first = rows[0]
+    first_rank = users_ahead(first["level"], first["xp"]) + 1
+    ties_before = User.objects.filter(
+        is_active=True, level=first["level"], xp=first["xp"], id__lt=first["id"]
+    ).count()
+    position = first_rank + ties_before
+
+    previous = None
+    for index, row in enumerate(rows):
+        if previous and (row["level"], row["xp"]) == (previous["level"], previous["xp"]):
+            row["rank"] = previous["rank"]
+        else:
+            row["rank"] = first_rank if index == 0 else position + index
+        previous = row
+
+    next_cursor = encode_cursor(rows[-1]) if len(rows) == limit else None
+    return rows, next_cursor
+
+
+def score_changed(user, old_level):
+    """Keep cached leaderboard state in step after add_xp saved `user`."""
+    if old_level != user.level:
+        cache.delete(LEVELS_KEY)
+
+    snapshot = cache.get(TOP_KEY)
+    if snapshot is None:
+        return
+    cutoff = snapshot[-1] if snapshot else None
+    in_snapshot = any(row["id"] == user.pk for row in snapshot)
+    full = len(snapshot) >= settings.LEADERBOARD_TOP_N
+    if in_snapshot or not full or (user.level, user.xp) >= (cutoff["level"], cutoff["xp"]):
+        cache.delete(TOP_KEY)
+
+
+def membership_changed():
+    """A user joined or left the ranking (created, deleted, (de)activated)."""
+    cache.delete_many([TOP_KEY, LEVELS_KEY])
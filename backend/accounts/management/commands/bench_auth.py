@@ -0,0 +1,56 @@
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from accounts.models import User
+
+SESSION_BACKENDS = ["db", "cached_db", "signed_cookies"]
+
+
+class Command(BaseCommand):
+    help = "Measure queries and latency per request for a small authenticated endpoint."
+
+    def add_arguments(self, parser):
+        parser.add_argument("username")
+        parser.add_argument("--path", default="/api/auth/me/")
+        parser.add_argument("--requests", type=int, default=200)
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options["username"])
+        except User.DoesNotExist:
+            raise CommandError("Unknown user")
+
+        self.stdout.write(f"{'session':<16}{'user cache':<12}{'queries/req':>12}{'ms/req':>10}")
+        for backend in SESSION_BACKENDS:
+            for ttl in (0, settings.USER_CACHE_TTL or 30):
+                queries, ms = self.run(user, backend, ttl, options["path"], options["requests"])
+                cached = f"{ttl}s" if ttl else "off"
+                self.stdout.write(f"{backend:<16}{cached:<12}{queries:>12.2f}{ms:>10.2f}")
+
+    def run(self, user, backend, ttl, path, n):
+        engine = f"django.contrib.sessions.backends.{backend}"
+        with override_settings(SESSION_ENGINE=engine, USER_CACHE_TTL=ttl, ALLOWED_HOSTS=["*"]):
+            client = Client()
+            client.force_login(user)
+            client.get(path)  # warm caches
+
+            with ExitStack() as stack:
+                contexts = [
+                    stack.enter_context(CaptureQueriesContext(conn))
+                    for conn in connections.all()
+                ]
+                started = time.perf_counter()
+                for _ in range(n):
+                    client.get(path)
+                elapsed = time.perf_counter() - started
+
+            client.logout()
+
+        total = sum(len(ctx.captured_queries) for ctx in contexts)
+        return total / n, elapsed * 1000 / n
@@ -0,0 +1,39 @@
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Sum
+
+from accounts import leaderboard
+from accounts.backends import invalidate_user
+from accounts.models import User, split_total_xp
+
+
+class Command(BaseCommand):
+    help = "Recompute User.level/xp from the XP ledger; --check only reports drift."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--check", action="store_true")
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        totals = dict(
+            User.objects.values_list("id").annotate(total=Sum("xp_events__amount")).values_list("id", "total")
+        )
+
+        drifted = []
+        for user in User.objects.only("id", "level", "xp").iterator(chunk_size=options["batch_size"]):
+            level, xp = split_total_xp(totals.get(user.id) or 0)
+            if (level, xp) != (user.level, user.xp):
+                user.level, user.xp = level, xp
+                drifted.append(user)
+
+        self.stdout.write(f"{len(drifted)} users drifted from the ledger")
+        if options["check"] or not drifted:
+            return
+
+        with transaction.atomic():
+            User.objects.bulk_update(drifted, ["level", "xp"], batch_size=options["batch_size"])
+        for user in drifted:
+            invalidate_user(user.id)
+        cache.delete_many([leaderboard.TOP_KEY, leaderboard.LEVELS_KEY])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {len(drifted)} users"))
@@ -0,0 +1,18 @@
+# Generated by Django 6.0 on 2026-10-19 14:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['-level', '-xp', 'id'], name='accounts_user_rank_idx'),
+        ),
+    ]
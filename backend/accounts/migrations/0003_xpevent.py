@@ -0,0 +1,31 @@
+# Generated by Django 6.0 on 2026-10-19 14:06
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_user_rank_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='XpEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('branch_id', models.BigIntegerField(blank=True, null=True)),
+                ('branch_name', models.CharField(blank=True, max_length=100)),
+                ('score', models.FloatField(blank=True, null=True)),
+                ('amount', models.IntegerField()),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='xp_events', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'created_at'], name='xpevent_user_created_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+from django.db import migrations
+
+
+def opening_balances(apps, schema_editor):
+    """Seed the ledger with each user's existing lifetime XP so rebuilds keep it."""
+    User = apps.get_model("accounts", "User")
+    XpEvent = apps.get_model("accounts", "XpEvent")
+
+    events = []
+    for user_id, level, xp in User.objects.values_list("id", "level", "xp").iterator():
+        total = sum(100 + (lvl - 1) * 50 for lvl in range(1, level)) + xp
+        if total:
+            events.append(XpEvent(user_id=user_id, amount=total))
+    XpEvent.objects.bulk_create(events, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_xpevent'),
+    ]
+
+    operations = [
+        migrations.RunPython(opening_balances, migrations.RunPython.noop),
+    ]
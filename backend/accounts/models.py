@@ -26,23 +26,80 @@ class User(AbstractBaseUser, PermissionsMixin):
     is_active = models.BooleanField(default=True)
     is_staff = models.BooleanField(default=False)
     date_joined = models.DateTimeField(default=timezone.now)
+    # Index of the database shard holding this user's branches (see
+    # core.sharding); null while they are on the default database.
+    shard = models.PositiveSmallIntegerField(null=True, blank=True, editable=False)
 
     USERNAME_FIELD = "username"
     REQUIRED_FIELDS = []
 
     objects = UserManager()
 
+    class Meta:
+        indexes = [
+            # Partial on is_active, the filter of every ranking query, so the
+            # same-level "users ahead" count is a range scan on (level, xp).
+            models.Index(
+                fields=["-level", "-xp", "id"], condition=models.Q(is_active=True), name="accounts_user_rank_idx"
+            ),
+        ]
+
     def __str__(self):
         return self.username
 
     def add_xp(self, earned_xp: int):
         """Add XP and handle level-ups."""
+        from .leaderboard import score_changed
+
+        old_level = self.level
+        self.gain_xp(earned_xp)
+        self.save()
+        score_changed(self, old_level)
+
+    def gain_xp(self, earned_xp: int):
+        """Apply XP and level-ups in memory only; the caller saves."""
         self.xp += earned_xp
         while self.xp >= self.next_level_xp():
             self.xp -= self.next_level_xp()
             self.level += 1
-        self.save()
 
     def next_level_xp(self):
         """Simple linear XP growth"""
-        return 100 + (self.level - 1) * 50
+        return level_xp(self.level)
+
+    def total_xp(self):
+        """XP earned overall, i.e. what the ledger should sum to."""
+        return sum(level_xp(level) for level in range(1, self.level)) + self.xp
+
+
+def level_xp(level):
+    return 100 + (level - 1) * 50
+
+
+def split_total_xp(total):
+    """Return the (level, xp) projection of a lifetime XP total."""
+    level = 1
+    while total >= level_xp(level):
+        total -= level_xp(level)
+        level += 1
+    return level, total
+
+
+class XpEvent(models.Model):
+    """Append-only record of XP awarded; User.level/xp are its projection."""
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="xp_events")
+    # Branches are deleted when pulled, so keep a plain id and name snapshot.
+    branch_id = models.BigIntegerField(null=True, blank=True)
+    branch_name = models.CharField(max_length=100, blank=True)
+    score = models.FloatField(null=True, blank=True)
+    amount = models.IntegerField()
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "created_at"], name="xpevent_user_created_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id}: +{self.amount} ({self.branch_name or 'opening balance'})"
@@ -0,0 +1,51 @@
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from core.sharding import drop_owner, place_owner
+
+from . import leaderboard
+from .backends import invalidate_user
+from .models import User
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def drop_cached_user(sender, instance, **kwargs):
+    invalidate_user(instance.pk)
+
+
+@receiver(post_save, sender=User)
+def place_new_owner(sender, instance, created, raw=False, using=None, **kwargs):
+    if created and not raw and using == DEFAULT_DB_ALIAS:
+        place_owner(instance)
+
+
+@receiver(post_delete, sender=User)
+def drop_sharded_data(sender, instance, using=None, **kwargs):
+    if using == DEFAULT_DB_ALIAS:
+        drop_owner(instance)
+
+
+@receiver(post_init, sender=User)
+def remember_active(sender, instance, **kwargs):
+    if instance.pk is None or "is_active" in instance.get_deferred_fields():
+        instance._was_active = None
+    else:
+        instance._was_active = instance.is_active
+
+
+@receiver(post_save, sender=User)
+def update_ranking_members(sender, instance, created, raw=False, using=None, **kwargs):
+    # Shard stub rows (core.sharding) are not ranked.
+    if using != DEFAULT_DB_ALIAS:
+        return
+    if created or instance._was_active != instance.is_active:
+        leaderboard.membership_changed()
+    instance._was_active = instance.is_active
+
+
+@receiver(post_delete, sender=User)
+def drop_ranked_user(sender, instance, using=None, **kwargs):
+    if using == DEFAULT_DB_ALIAS:
+        leaderboard.membership_changed()
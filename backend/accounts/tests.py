@@ -1,3 +1,161 @@
-from django.test import TestCase
+from datetime import datetime, timezone
+import io
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+
+from . import leaderboard
+from .backends import CachedModelBackend, user_cache_key
+from .models import User, XpEvent, split_total_xp
+
+
+@override_settings(USER_CACHE_TTL=30)
+class CachedUserTests(TestCase):
+    databases = "__all__"
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user("ada", password="pw")
+        self.backend = CachedModelBackend()
+
+    def test_session_user_is_served_from_the_cache(self):
+        self.assertEqual(self.backend.get_user(self.user.pk), self.user)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.backend.get_user(self.user.pk).username, "ada")
+
+    def test_saving_or_deleting_the_user_drops_the_entry(self):
+        self.backend.get_user(self.user.pk)
+        self.user.level = 4
+        self.user.save()
+        self.assertIsNone(cache.get(user_cache_key(self.user.pk)))
+        self.assertEqual(self.backend.get_user(self.user.pk).level, 4)
+
+        self.user.delete()
+        self.assertIsNone(self.backend.get_user(self.user.pk))
+
+    def test_zero_ttl_disables_caching(self):
+        with self.settings(USER_CACHE_TTL=0):
+            self.backend.get_user(self.user.pk)
+        self.assertIsNone(cache.get(user_cache_key(self.user.pk)))
+
+    def test_authenticated_requests_reuse_the_cached_user(self):
+        self.client.force_login(self.user)
+        self.client.get("/api/auth/me/")
+        self.assertIsNotNone(cache.get(user_cache_key(self.user.pk)))
+        response = self.client.get("/api/auth/me/")
+        self.assertEqual(response.json()["username"], "ada")
+
+
+@override_settings(LEADERBOARD_TOP_N=3)
+class LeaderboardTests(TestCase):
+    databases = "__all__"
+
+    def setUp(self):
+        cache.clear()
+        self.users = {}
+        for name, level, xp in [("a", 3, 10), ("b", 2, 50), ("c", 2, 50), ("d", 2, 20), ("e", 1, 0)]:
+            self.users[name] = User.objects.create_user(name, level=level, xp=xp)
+        User.objects.create_user("gone", level=9, is_active=False)
+
+    def ranks(self, rows):
+        return [(row["username"], row["rank"]) for row in rows]
+
+    def test_competition_ranks(self):
+        self.assertEqual(
+            [leaderboard.rank_of(self.users[name]) for name in "abcde"], [1, 2, 2, 4, 5]
+        )
+        self.assertEqual(self.ranks(leaderboard.top(3)), [("a", 1), ("b", 2), ("c", 2)])
+
+    def test_pages_continue_past_the_snapshot(self):
+        rows, cursor = leaderboard.page(limit=2)
+        self.assertEqual(self.ranks(rows), [("a", 1), ("b", 2)])
+        rows, cursor = leaderboard.page(cursor, limit=2)
+        self.assertEqual(self.ranks(rows), [("c", 2), ("d", 4)])
+        rows, cursor = leaderboard.page(cursor, limit=2)
+        self.assertEqual((self.ranks(rows), cursor), ([("e", 5)], None))
+        with self.assertRaises(ValueError):
+            leaderboard.page("bad", limit=2)
+
+    def test_xp_gains_update_cached_ranks(self):
+        leaderboard.top(3)
+        leaderboard.level_counts()
+        self.users["e"].add_xp(300)
+        self.assertEqual(self.users["e"].level, 3)
+        self.assertEqual(leaderboard.rank_of(self.users["e"]), 1)
+        self.assertEqual(leaderboard.level_counts(), {2: 3, 3: 2})
+        self.assertEqual(self.ranks(leaderboard.top(3))[0], ("e", 1))
+
+    def test_level_ups_never_write_counts_back(self):
+        stale = leaderboard.level_counts()
+        self.users["e"].add_xp(300)
+        # A request that read the counts before the level-up cannot
+        # overwrite the recount with its copy.
+        self.assertIsNone(cache.get(leaderboard.LEVELS_KEY))
+        self.assertNotEqual(leaderboard.level_counts(), stale)
+
+    def test_new_and_deactivated_users_move_cached_ranks(self):
+        leaderboard.top(3)
+        self.assertEqual(leaderboard.rank_of(self.users["b"]), 2)
+        User.objects.create_user("f", level=5)
+        self.assertEqual(leaderboard.rank_of(self.users["b"]), 3)
+        self.assertEqual(self.ranks(leaderboard.top(1)), [("f", 1)])
+
+        self.users["a"].is_active = False
+        self.users["a"].save()
+        self.assertEqual(leaderboard.rank_of(self.users["b"]), 2)
+        self.assertNotIn("a", [row["username"] for row in leaderboard.top(3)])
+
+        self.users["a"].is_active = True
+        self.users["a"].save()
+        self.assertEqual(leaderboard.rank_of(self.users["b"]), 3)
+        User.objects.get(username="f").delete()
+        self.assertEqual(leaderboard.rank_of(self.users["b"]), 2)
+
+    def test_same_level_count_is_an_index_range(self):
+        queryset = User.objects.filter(is_active=True, level=2, xp__gt=20)
+        if connection.vendor == "sqlite":
+            self.assertIn("accounts_user_rank_idx", queryset.explain())
+        self.assertEqual(queryset.count(), 2)
+
+
+class XpLedgerTests(TestCase):
+    databases = "__all__"
+
+    def setUp(self):
+        self.user = User.objects.create_user("ada")
+
+    def award(self, amount, branch_id=1, when=None):
+        return XpEvent.objects.create(
+            user=self.user, branch_id=branch_id, branch_name="b", amount=amount,
+            created_at=when or datetime(2026, 3, 2, tzinfo=timezone.utc),
+        )
+
+    def test_projection_round_trips(self):
+        for total in (0, 99, 100, 249, 250, 1234):
+            level, xp = split_total_xp(total)
+            self.assertEqual(User(level=level, xp=xp).total_xp(), total)
+        self.assertEqual(split_total_xp(250), (3, 0))
+
+    def test_rebuild_xp_repairs_drift(self):
+        self.award(180)
+        out = io.StringIO()
+        call_command("rebuild_xp", "--check", stdout=out)
+        self.assertIn("1 users drifted", out.getvalue())
+        self.user.refresh_from_db()
+        self.assertEqual((self.user.level, self.user.xp), (1, 0))
+
+        call_command("rebuild_xp", stdout=io.StringIO())
+        self.user.refresh_from_db()
+        self.assertEqual((self.user.level, self.user.xp), (2, 80))
+
+    def test_history_buckets_exclude_the_opening_balance(self):
+        self.award(500, branch_id=None)
+        self.award(30)
+        self.award(20, when=datetime(2026, 3, 4, tzinfo=timezone.utc))
+        self.award(10, when=datetime(2026, 3, 12, tzinfo=timezone.utc))
+        self.client.force_login(self.user)
+        rows = self.client.get("/api/auth/xp/history/", {"bucket": "week"}).json()
+        self.assertEqual([row["xp"] for row in rows], [50, 10])
+        self.assertEqual(self.client.get("/api/auth/xp/history/", {"bucket": "year"}).status_code, 400)
@@ -1,9 +1,20 @@
 from django.urls import path
-from .views import LoginView, LogoutView, MeView, csrf
+from .views import (
+    LeaderboardView,
+    LoginView,
+    LogoutView,
+    MeView,
+    MyRankView,
+    XpHistoryView,
+    csrf,
+)
 
 urlpatterns = [
     path("login/", LoginView.as_view(), name="login"),
     path("logout/", LogoutView.as_view(), name="logout"),
     path("me/", MeView.as_view(), name="me"),
     path("csrf/", csrf, name="csrf"),
+    path("leaderboard/", LeaderboardView.as_view(), name="leaderboard"),
+    path("leaderboard/me/", MyRankView.as_view(), name="leaderboard-me"),
+    path("xp/history/", XpHistoryView.as_view(), name="xp-history"),
 ]
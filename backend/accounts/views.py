@@ -1,3 +1,5 @@
+import logging
+
 from django.contrib.auth import login, logout
 from rest_framework.views import APIView
 from rest_framework.response import Response
@@ -5,8 +7,18 @@ from rest_framework.permissions import AllowAny, IsAuthenticated
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
 
+from django.db.models import Sum
+from django.db.models.functions import TruncDay, TruncMonth, TruncWeek
+
+from core.fieldsets import rows_response
+from core.timerange import parse_time_range
+
+from . import leaderboard
+from .models import XpEvent
 from .serializers import LoginSerializer, UserSerializer
 
+logger = logging.getLogger(__name__)
+
 from django.http import JsonResponse
 from django.views.decorators.csrf import ensure_csrf_cookie
 
@@ -39,7 +51,68 @@ class MeView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        print("MeView called by user:", request.user)
+        logger.debug("MeView called", extra={"user_id": request.user.pk})
         serializer = UserSerializer(request.user)
-        print("Serialized data:", serializer.data)
         return Response(serializer.data)
+
+
+MAX_LEADERBOARD_PAGE = 200
+
+
+class LeaderboardView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        try:
+            limit = min(int(request.query_params.get("limit", 50)), MAX_LEADERBOARD_PAGE)
+            rows, next_cursor = leaderboard.page(request.query_params.get("cursor"), max(limit, 1))
+        except ValueError:
+            return Response({"error": "invalid limit or cursor"}, status=400)
+        return Response({"results": rows, "next": next_cursor})
+
+
+class MyRankView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        user = request.user
+        return Response({
+            "id": user.id,
+            "username": user.username,
+            "level": user.level,
+            "xp": user.xp,
+            "rank": leaderboard.rank_of(user),
+        })
+
+
+XP_BUCKETS = {"day": TruncDay, "week": TruncWeek, "month": TruncMonth}
+
+
+class XpHistoryView(APIView):
+    """XP earned per day/week/month, aggregated from the ledger."""
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        bucket = request.query_params.get("bucket", "week")
+        if bucket not in XP_BUCKETS:
+            return Response({"error": "bucket must be day, week or month"}, status=400)
+        try:
+            start, end = parse_time_range(request)
+        except ValueError as exc:
+            return Response({"error": str(exc)}, status=400)
+
+        events = XpEvent.objects.filter(user=request.user).exclude(branch_id=None)
+        if start:
+            events = events.filter(created_at__gte=start)
+        if end:
+            events = events.filter(created_at__lt=end)
+
+        data = (
+            events
+            .annotate(period=XP_BUCKETS[bucket]("created_at"))
+            .values("period")
+            .annotate(xp=Sum("amount"))
+            .order_by("period")
+        )
+        return rows_response(request, data)
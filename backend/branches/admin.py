@@ -1,5 +1,5 @@
-from django.contrib import admin
-from .models import Branch
+from django.contrib import admin, messages
+from .models import Branch, pull_commits
 
 
 @admin.register(Branch)
@@ -13,12 +13,23 @@ class BranchAdmin(admin.ModelAdmin):
     )
 
     list_filter = ("is_main", "created_at")
+    list_select_related = ("owner",)
     search_fields = ("name", "owner__username")
     readonly_fields = ("created_at",)
+    raw_id_fields = ("owner",)
+    # Autocomplete lookups page through this admin too.
+    ordering = ("-id",)
 
     actions = ["pull_commit_admin"]
 
+    def get_queryset(self, request):
+        # __str__ shows the owner, including in autocomplete results.
+        return super().get_queryset(request).select_related("owner")
+
     @admin.action(description="Pull commit (award XP & delete)")
     def pull_commit_admin(self, request, queryset):
-        for branch in queryset:
-            branch.pull_commit()
+        skipped = queryset.filter(is_main=True).count()
+        pulled, owners, xp = pull_commits(queryset)
+        self.message_user(request, f"Pulled {pulled} branches: {xp} XP to {owners} users.")
+        if skipped:
+            self.message_user(request, f"Skipped {skipped} main branches.", messages.WARNING)
@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class BranchesConfig(AppConfig):
     name = 'branches'
+
+    def ready(self):
+        from . import signals  # noqa: F401
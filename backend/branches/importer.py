@@ -0,0 +1,239 @@
+"""
+Streaming import of task and tracker history into a branch.
+
+Input is CSV (with a header row) or NDJSON, one record per row:
+
+    type       "entry" or "task"
+    name       tracker name / task title, matched within the branch
+    value      entry value (entries)
+    timestamp  ISO-8601 time of the entry (entries; defaults to now)
+    completed  true/false (tasks)
+    weight     task weight (tasks, optional)
+
+Rows are parsed lazily and written in chunks, one transaction per chunk
+(entries through executemany, tasks through bulk_create). Task completions
+are logged and rolled up in the same transaction (tasks.services).
+Trackers missing from the branch are created on first sight; tasks are
+matched by title and updated, or created. Derived state (thresholds,
+streaks, the branch score) is rebuilt once, after the last chunk.
+"""
+import csv
+import gzip
+import io
+import json
+import time
+import zlib
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from itertools import islice
+
+from django.db import connections, transaction
+
+from core.sharding import current_alias
+from streaks.services import rebuild_tracker_streaks
+from tasks import scheduling
+from tasks.models import Task
+from tasks.services import log_completions
+from trackers.models import Tracker, TrackerEntry
+from trackers.services import rebuild_tracker_state
+
+from .scoring import recompute_branch
+
+CHUNK_SIZE = 20_000
+TRUE_VALUES = {"1", "true", "yes", "y", "t"}
+
+
+class HistoryImportError(ValueError):
+    pass
+
+
+def _entry_insert_sql(connection):
+    # Entries skip bulk_create: building model instances costs more than the
+    # insert itself at import volumes, so rows go straight to executemany.
+    qn = connection.ops.quote_name
+    opts = TrackerEntry._meta
+    columns = ", ".join(qn(opts.get_field(name).column) for name in ("tracker", "value", "timestamp"))
+    return f"INSERT INTO {qn(opts.db_table)} ({columns}) VALUES (%s, %s, %s)"
+
+
+@dataclass
+class ImportStats:
+    rows: int = 0
+    entries: int = 0
+    tasks_created: int = 0
+    tasks_updated: int = 0
+    trackers_created: list = field(default_factory=list)
+    elapsed: float = 0.0
+
+    def as_dict(self):
+        return {
+            "rows": self.rows,
+            "entries": self.entries,
+            "tasksCreated": self.tasks_created,
+            "tasksUpdated": self.tasks_updated,
+            "trackersCreated": self.trackers_created,
+            "rowsPerSecond": int(self.rows / self.elapsed) if self.elapsed else None,
+        }
+
+
+def open_rows(fileobj, fmt, filename=""):
+    """
+    Yield dict rows from a binary file object, decompressing *.gz inputs.
+    Undecodable or malformed input raises HistoryImportError naming the line.
+    """
+    if fmt not in ("csv", "ndjson"):
+        raise HistoryImportError(f"Unsupported format: {fmt}")
+    if filename.endswith(".gz"):
+        fileobj = gzip.GzipFile(fileobj=fileobj)
+    text = io.TextIOWrapper(fileobj, encoding="utf-8", newline="")
+    reader, line = None, 0
+    try:
+        if fmt == "csv":
+            reader = csv.DictReader(text, strict=True)
+            yield from reader
+        else:
+            for line, raw in enumerate(text, start=1):
+                if not raw.strip():
+                    continue
+                try:
+                    row = json.loads(raw)
+                except json.JSONDecodeError as exc:
+                    raise HistoryImportError(f"Line {line}: invalid JSON ({exc.msg})") from exc
+                if not isinstance(row, dict):
+                    raise HistoryImportError(f"Line {line}: expected a JSON object")
+                yield row
+    except csv.Error as exc:
+        # line_num only advances once a record parses.
+        raise HistoryImportError(f"Line {reader.line_num + 1}: {exc}") from exc
+    except UnicodeDecodeError as exc:
+        line = reader.line_num if reader else line
+        raise HistoryImportError(f"Line {line + 1}: not valid UTF-8") from exc
+    except (gzip.BadGzipFile, EOFError, zlib.error) as exc:
+        raise HistoryImportError(f"Line {line + 1}: corrupt gzip data ({exc})") from exc
+
+
+def _parse_timestamp(raw, default):
+    if not raw:
+        return default
+    value = datetime.fromisoformat(str(raw).replace("Z", "+00:00"))
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def _timestamp_adapter(connection):
+    if connection.vendor == "sqlite":
+        # Same text form Django's SQLite backend stores, without its
+        # per-value timezone bookkeeping.
+        return lambda value: str(value.astimezone(timezone.utc).replace(tzinfo=None))
+    return connection.ops.adapt_datetimefield_value
+
+
+def _parse_bool(raw):
+    if isinstance(raw, bool):
+        return raw
+    return str(raw).strip().lower() in TRUE_VALUES
+
+
+class HistoryImporter:
+    def __init__(self, branch, dry_run=False, chunk_size=CHUNK_SIZE, progress=None):
+        self.branch = branch
+        self.dry_run = dry_run
+        self.chunk_size = chunk_size
+        self.progress = progress
+        self.stats = ImportStats()
+        self.trackers = dict(branch.trackers.values_list("name", "id"))
+        self.tasks = dict(branch.tasks.values_list("title", "id"))
+        self.touched_trackers = set()
+
+    def run(self, rows):
+        started = time.perf_counter()
+        rows = iter(rows)
+        while True:
+            chunk = list(islice(rows, self.chunk_size))
+            if not chunk:
+                break
+            self._import_chunk(chunk)
+            self.stats.elapsed = time.perf_counter() - started
+            if self.progress:
+                self.progress(self.stats)
+
+        if not self.dry_run and self.touched_trackers:
+            rebuild_tracker_state(self.touched_trackers)
+            rebuild_tracker_streaks(self.touched_trackers, self.branch.owner)
+        if not self.dry_run and self.stats.rows:
+            # bulk_create/bulk_update bypass the score and schedule signals.
+            recompute_branch(self.branch)
+            scheduling.invalidate(self.branch.owner_id)
+        self.stats.elapsed = time.perf_counter() - started
+        return self.stats
+
+    def _import_chunk(self, chunk):
+        now = datetime.now(timezone.utc)
+        # Imports run on the active shard (core.sharding).
+        connection = connections[current_alias()]
+        adapt = _timestamp_adapter(connection)
+        entries, new_tasks, updated_tasks = [], {}, {}
+
+        for offset, row in enumerate(chunk, start=self.stats.rows + 1):
+            kind = (row.get("type") or "").strip().lower()
+            name = (row.get("name") or "").strip()
+            if not name:
+                raise HistoryImportError(f"Row {offset}: name is required")
+            try:
+                if kind == "entry":
+                    entries.append((
+                        self._tracker_id(name),
+                        float(row["value"]),
+                        adapt(_parse_timestamp(row.get("timestamp"), now)),
+                    ))
+                elif kind == "task":
+                    completed = _parse_bool(row.get("completed", False))
+                    weight = int(row.get("weight") or 1)
+                    if name in self.tasks:
+                        updated_tasks[self.tasks[name]] = (completed, weight)
+                    else:
+                        new_tasks[name] = Task(
+                            branch=self.branch, title=name, completed=completed, weight=weight
+                        )
+                else:
+                    raise HistoryImportError(f"Row {offset}: type must be 'entry' or 'task'")
+            except HistoryImportError:
+                raise
+            except (KeyError, TypeError, ValueError) as exc:
+                raise HistoryImportError(f"Row {offset}: {exc}") from exc
+
+        self.stats.rows += len(chunk)
+        self.stats.entries += len(entries)
+        self.stats.tasks_created += len(new_tasks)
+        self.stats.tasks_updated += len(updated_tasks)
+        if self.dry_run:
+            return
+
+        with transaction.atomic(using=connection.alias):
+            if entries:
+                with connection.cursor() as cursor:
+                    cursor.executemany(_entry_insert_sql(connection), entries)
+            owner = self.branch.owner
+            for task in new_tasks.values():
+                task.completed_at = now if task.completed else None
+            created = Task.objects.bulk_create(new_tasks.values())
+            self.tasks.update((task.title, task.id) for task in created)
+            log_completions(owner, {task: False for task in created}, now)
+            if updated_tasks:
+                tasks = list(Task.objects.filter(id__in=updated_tasks))
+                previous = {}
+                for task in tasks:
+                    previous[task] = task.completed
+                    task.completed, task.weight = updated_tasks[task.id]
+                log_completions(owner, previous, now)
+                Task.objects.bulk_update(tasks, ["completed", "completed_at", "weight"])
+
+    def _tracker_id(self, name):
+        tracker_id = self.trackers.get(name)
+        if tracker_id is None:
+            self.stats.trackers_created.append(name)
+            tracker_id = -len(self.stats.trackers_created)
+            if not self.dry_run:
+                tracker_id = Tracker.objects.create(branch=self.branch, name=name).id
+            self.trackers[name] = tracker_id
+        self.touched_trackers.add(tracker_id)
+        return tracker_id
@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from branches.importer import CHUNK_SIZE, HistoryImporter, HistoryImportError, open_rows
+from branches.models import Branch
+from core.sharding import find, using_alias
+
+
+class Command(BaseCommand):
+    help = "Stream-import tracker entries and tasks from CSV or NDJSON into a branch."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--branch", type=int, required=True, help="Target branch id.")
+        parser.add_argument("--format", choices=["csv", "ndjson"])
+        parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+        parser.add_argument("--dry-run", action="store_true")
+
+    def handle(self, *args, **options):
+        branch = find(Branch, id=options["branch"])
+        if branch is None:
+            raise CommandError("Unknown branch")
+
+        path = options["path"]
+        fmt = options["format"] or ("ndjson" if ".ndjson" in path or ".jsonl" in path else "csv")
+
+        def progress(stats):
+            rate = int(stats.rows / stats.elapsed) if stats.elapsed else 0
+            self.stdout.write(f"{stats.rows} rows ({rate} rows/s)")
+
+        importer = HistoryImporter(
+            branch,
+            dry_run=options["dry_run"],
+            chunk_size=options["chunk_size"],
+            progress=progress,
+        )
+        try:
+            with open(path, "rb") as fileobj, using_alias(branch._state.db):
+                stats = importer.run(open_rows(fileobj, fmt, path))
+        except HistoryImportError as exc:
+            raise CommandError(f"{exc} (rows before the failing chunk were committed)")
+
+        summary = stats.as_dict()
+        prefix = "Dry run: would import" if options["dry_run"] else "Imported"
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefix} {summary['rows']} rows: {summary['entries']} entries, "
+            f"{summary['tasksCreated']} new tasks, {summary['tasksUpdated']} task updates, "
+            f"{len(summary['trackersCreated'])} new trackers in {stats.elapsed:.2f}s "
+            f"({summary['rowsPerSecond']} rows/s)"
+        ))
@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Prefetch
+
+from branches.models import Branch
+from core import sharding
+from tasks.models import Task
+from trackers.models import Tracker
+
+
+class Command(BaseCommand):
+    help = "Recompute cached branch score terms from tasks and trackers; --check only reports drift."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--check", action="store_true")
+        parser.add_argument("--tolerance", type=float, default=1e-6)
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument(
+            "--database",
+            choices=sharding.data_aliases(),
+            help="Only rebuild branches on this database (default: every database holding branches).",
+        )
+
+    def handle(self, *args, **options):
+        aliases = [options["database"]] if options["database"] else sharding.data_aliases()
+        for alias in aliases:
+            with sharding.using_alias(alias):
+                self.rebuild(alias, options)
+
+    def rebuild(self, alias, options):
+        branches = Branch.objects.using(alias).only("id", "score_earned", "score_total").prefetch_related(
+            Prefetch("tasks", queryset=Task.objects.only("id", "branch_id", "weight", "completed")),
+            Prefetch("trackers", queryset=Tracker.objects.all()),
+        )
+
+        drifted = []
+        for branch in branches.iterator(chunk_size=options["batch_size"]):
+            earned, total = branch.calculate_score_terms()
+            if total != branch.score_total or abs(earned - branch.score_earned) > options["tolerance"]:
+                branch.score_earned, branch.score_total = earned, total
+                drifted.append(branch)
+
+        self.stdout.write(f"{alias}: {len(drifted)} branches drifted from their tasks and trackers")
+        if options["check"] or not drifted:
+            return
+
+        with transaction.atomic(using=alias):
+            Branch.objects.using(alias).bulk_update(
+                drifted, ["score_earned", "score_total"], batch_size=options["batch_size"]
+            )
+        self.stdout.write(self.style.SUCCESS(f"{alias}: rebuilt {len(drifted)} branches"))
@@ -0,0 +1,59 @@
+# Generated by Django 6.0 on 2026-10-19 14:10
+
+from django.db import migrations, models
+
+
+def contribution(tracker):
+    # Frozen copy of Tracker.get_contribution; historical models have no methods.
+    if not tracker.weight or tracker.target_type == "NONE" or tracker.target_value is None:
+        return 0.0, 0
+    weight = float(tracker.weight)
+    if tracker.target_type == "THRESHOLD":
+        return (weight if tracker.is_active else 0.0), tracker.weight
+    if tracker.target_value <= 0:
+        return weight, tracker.weight
+    progress = tracker.running_total / tracker.target_value
+    return max(0.0, min(progress * weight, weight)), tracker.weight
+
+
+def backfill_score_terms(apps, schema_editor):
+    Branch = apps.get_model("branches", "Branch")
+    Task = apps.get_model("tasks", "Task")
+    Tracker = apps.get_model("trackers", "Tracker")
+
+    terms = {}
+    for branch_id, weight, completed in Task.objects.values_list("branch_id", "weight", "completed").iterator():
+        earned, total = terms.get(branch_id, (0.0, 0))
+        terms[branch_id] = (earned + (weight if completed else 0), total + weight)
+    for tracker in Tracker.objects.iterator():
+        earned, total = terms.get(tracker.branch_id, (0.0, 0))
+        tracker_earned, tracker_total = contribution(tracker)
+        terms[tracker.branch_id] = (earned + tracker_earned, total + tracker_total)
+
+    branches = list(Branch.objects.filter(id__in=terms).only("id"))
+    for branch in branches:
+        branch.score_earned, branch.score_total = terms[branch.id]
+    Branch.objects.bulk_update(branches, ["score_earned", "score_total"], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('branches', '0001_initial'),
+        ('tasks', '0002_rename_end_datetime_task_end_at_and_more'),
+        ('trackers', '0006_tracker_running_total'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='branch',
+            name='score_earned',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='branch',
+            name='score_total',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_score_terms, migrations.RunPython.noop),
+    ]
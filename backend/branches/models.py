@@ -1,5 +1,13 @@
 from django.db import models, transaction
-from accounts.models import User
+from accounts.models import User, XpEvent
+
+
+def score_from_terms(earned, total):
+    """Commit score for (earned, total) weights, clamped to 0.0 .. 1.0."""
+    if not total:
+        return 0.0
+    return max(0.0, min(earned / total, 1.0))
+
 
 class Branch(models.Model):
     name = models.CharField(max_length=100)
@@ -9,29 +17,110 @@ class Branch(models.Model):
     base_xp = models.PositiveIntegerField(default=100)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    # Cached commit score terms, kept current by deltas (see branches.scoring).
+    score_earned = models.FloatField(default=0)
+    score_total = models.PositiveIntegerField(default=0)
+
     def __str__(self):
         return f"{self.name} ({self.owner.username})"
 
-    def calculate_commit_score(self):
-        """Return score between 0.0 and 1.0"""
+    @property
+    def commit_score(self):
+        """Cached score between 0.0 and 1.0"""
+        return score_from_terms(self.score_earned, self.score_total)
+
+    def calculate_score_terms(self):
+        """Return (earned, total) weights recomputed from scratch."""
         tasks = self.tasks.all()
-        trackers = self.trackers.all()
+        trackers = [tr for tr in self.trackers.all() if tr.is_scoring]
 
         total_weight = sum(t.weight for t in tasks) + sum(tr.weight for tr in trackers)
-        if total_weight == 0:
-            return 0.0
-
         completed_task_weight = sum(t.weight for t in tasks if t.completed)
         tracker_contribution = sum(tr.get_contribution() for tr in trackers)
 
-        return (completed_task_weight + tracker_contribution) / total_weight
+        return completed_task_weight + tracker_contribution, total_weight
+
+    def calculate_commit_score(self):
+        """Return score between 0.0 and 1.0"""
+        return score_from_terms(*self.calculate_score_terms())
 
     def pull_commit(self):
         if self.is_main:
             raise ValueError("Main branch cannot be pulled")
 
-        with transaction.atomic():
+        # Owner and XP rows are global; the branch may live on a shard.
+        with transaction.atomic(), transaction.atomic(using=self._state.db):
+            # Lock the owner row so concurrent pulls can't overwrite each other's XP.
+            owner = User.objects.select_for_update().get(pk=self.owner_id)
             score = self.calculate_commit_score()
             earned_xp = int(self.base_xp * score)
-            self.owner.add_xp(earned_xp)
+            old_level = owner.level
+
+            XpEvent.objects.create(
+                user=owner,
+                branch_id=self.id,
+                branch_name=self.name,
+                score=score,
+                amount=earned_xp,
+            )
+            owner.add_xp(earned_xp)
             self.delete()
+
+        return {
+            "score": score,
+            "xp_earned": earned_xp,
+            "new_xp": owner.xp,
+            "new_level": owner.level,
+            "leveled_up": owner.level > old_level,
+        }
+
+
+def pull_commits(branches):
+    """
+    Pull every non-main branch in the `branches` queryset as one bulk
+    operation: one XpEvent insert, one XP update for all owners and one
+    delete. Scores use the cached score terms with the formula pull_commit
+    uses (score_from_terms).
+    Returns (branches pulled, owners credited, XP awarded).
+    """
+    from accounts.backends import invalidate_user
+    from accounts.leaderboard import score_changed
+
+    branches = branches.filter(is_main=False)
+    with transaction.atomic(), transaction.atomic(using=branches.db):
+        # Owner locks first, in id order, as pull_commit takes them. Owner
+        # ids are fetched first: users and branches may be on different
+        # databases (core.sharding).
+        owner_ids = set(branches.values_list("owner_id", flat=True))
+        owners = {
+            owner.pk: owner
+            for owner in User.objects.select_for_update().filter(pk__in=owner_ids).order_by("pk")
+        }
+        rows = list(
+            branches.filter(owner_id__in=owners)
+            .order_by("id")
+            .values_list("id", "name", "owner_id", "base_xp", "score_earned", "score_total")
+        )
+        events, earned = [], {}
+        for branch_id, name, owner_id, base_xp, score_earned, score_total in rows:
+            score = score_from_terms(score_earned, score_total)
+            amount = int(base_xp * score)
+            events.append(XpEvent(
+                user_id=owner_id, branch_id=branch_id, branch_name=name, score=score, amount=amount,
+            ))
+            earned[owner_id] = earned.get(owner_id, 0) + amount
+        XpEvent.objects.bulk_create(events)
+
+        old_levels = {}
+        for owner_id, amount in earned.items():
+            old_levels[owner_id] = owners[owner_id].level
+            owners[owner_id].gain_xp(amount)
+        User.objects.bulk_update([owners[owner_id] for owner_id in earned], ["level", "xp"])
+        # Deleted through `branches`, on the database its rows were read from.
+        branches.filter(id__in=[row[0] for row in rows]).delete()
+
+    # bulk_update skips post_save, which drops cached session users.
+    for owner_id, old_level in old_levels.items():
+        invalidate_user(owner_id)
+        score_changed(owners[owner_id], old_level)
+    return len(rows), len(earned), sum(earned.values())
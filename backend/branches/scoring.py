@@ -0,0 +1,66 @@
+"""
+Incremental maintenance of Branch.score_earned / Branch.score_total.
+
+Every Task and Tracker remembers the (branch_id, earned, total) terms it
+contributed when it was loaded; after a save or delete only the difference
+is applied to the branch row with an F() update. Paths that bypass model
+signals (queryset updates, bulk_create) call apply_delta, apply_changes or
+recompute_branch directly.
+
+Tracker pushes keep the branch row out of their transaction: push_value
+and the ingest flush apply their deltas once the entries have committed,
+the flush as one UPDATE per branch. A crash in between leaves the branch
+off by those pushes until rebuild_scores runs.
+"""
+from collections import defaultdict
+
+from django.db.models import F
+
+from .models import Branch
+
+
+def task_terms(task):
+    return task.branch_id, float(task.weight if task.completed else 0), task.weight
+
+
+def tracker_terms(tracker):
+    if not tracker.is_scoring:
+        return tracker.branch_id, 0.0, 0
+    return tracker.branch_id, tracker.get_contribution(), tracker.weight
+
+
+def apply_delta(branch_id, earned, total):
+    if branch_id is None or (not earned and not total):
+        return
+    Branch.objects.filter(pk=branch_id).update(
+        score_earned=F("score_earned") + earned,
+        score_total=F("score_total") + total,
+    )
+
+
+def apply_change(old, new):
+    """Apply the move from `old` to `new` (branch_id, earned, total) terms."""
+    if old[0] == new[0]:
+        apply_delta(new[0], new[1] - old[1], new[2] - old[2])
+    else:
+        apply_delta(old[0], -old[1], -old[2])
+        apply_delta(new[0], new[1], new[2])
+
+
+def apply_changes(changes):
+    """apply_change for many (old, new) pairs: one UPDATE per branch, in id order."""
+    deltas = defaultdict(lambda: [0.0, 0])
+    for old, new in changes:
+        for (branch_id, earned, total), sign in ((old, -1), (new, 1)):
+            if branch_id is not None:
+                deltas[branch_id][0] += sign * earned
+                deltas[branch_id][1] += sign * total
+    for branch_id in sorted(deltas):
+        apply_delta(branch_id, *deltas[branch_id])
+
+
+def recompute_branch(branch):
+    earned, total = branch.calculate_score_terms()
+    Branch.objects.filter(pk=branch.pk).update(score_earned=earned, score_total=total)
+    branch.score_earned, branch.score_total = earned, total
+    return earned, total
@@ -2,6 +2,8 @@ from rest_framework import serializers
 from .models import Branch
 
 class BranchSerializer(serializers.ModelSerializer):
+    commit_score = serializers.FloatField(read_only=True)
+
     class Meta:
         model = Branch
         fields = [
@@ -11,4 +13,9 @@ class BranchSerializer(serializers.ModelSerializer):
             "is_main",
             "base_xp",
             "created_at",
+            "commit_score",
+            "score_earned",
+            "score_total",
         ]
+        read_only_fields = ["commit_score", "score_earned", "score_total"]
+        sparse_sources = {"commit_score": ["score_earned", "score_total"]}
@@ -0,0 +1,63 @@
+from django.db.models.signals import post_delete, post_init, post_save, pre_delete
+from django.dispatch import receiver
+
+from tasks.models import Task
+from trackers.models import Tracker
+
+from .models import Branch
+from .scoring import apply_change, recompute_branch, task_terms, tracker_terms
+
+EMPTY = (None, 0.0, 0)
+TERMS = {Task: task_terms, Tracker: tracker_terms}
+SCORE_FIELDS = {
+    Task: {"branch_id", "weight", "completed"},
+    Tracker: {"branch_id", "weight", "target_type", "target_value", "running_total", "is_active"},
+}
+
+
+@receiver(post_init, sender=Task)
+@receiver(post_init, sender=Tracker)
+def remember_score_terms(sender, instance, **kwargs):
+    if not instance.pk:
+        instance._score_terms = EMPTY
+    elif SCORE_FIELDS[sender] & instance.get_deferred_fields():
+        # Reading deferred fields here would cost a query per instance.
+        instance._score_terms = None
+    else:
+        instance._score_terms = TERMS[sender](instance)
+
+
+@receiver(post_save, sender=Task)
+@receiver(post_save, sender=Tracker)
+def update_branch_score(sender, instance, created, **kwargs):
+    new = TERMS[sender](instance)
+    old = EMPTY if created else instance._score_terms
+    if old == new:
+        return  # nothing score-relevant changed; no branch query
+    if old is None:
+        recompute_branch(instance.branch)
+    else:
+        apply_change(old, new)
+    instance._score_terms = new
+
+
+def _deleting_branch(origin):
+    return isinstance(origin, Branch) or getattr(origin, "model", None) is Branch
+
+
+@receiver(pre_delete, sender=Task)
+@receiver(pre_delete, sender=Tracker)
+def load_score_terms(sender, instance, origin=None, **kwargs):
+    # The instance may be stale (push_value updates trackers in SQL), so take
+    # the terms from the row itself while it still exists.
+    if not _deleting_branch(origin):
+        row = sender.objects.filter(pk=instance.pk).values(*SCORE_FIELDS[sender]).first()
+        instance._score_terms = TERMS[sender](sender(pk=instance.pk, **row)) if row else EMPTY
+
+
+@receiver(post_delete, sender=Task)
+@receiver(post_delete, sender=Tracker)
+def remove_branch_score(sender, instance, origin=None, **kwargs):
+    # Nothing to maintain when the branch itself is being deleted.
+    if not _deleting_branch(origin):
+        apply_change(instance._score_terms, EMPTY)
@@ -1,3 +1,250 @@
+import gzip
+import io
+import json
+
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
 from django.test import TestCase
 
-# Create your tests here.
+from accounts.backends import user_cache_key
+from accounts.models import User, XpEvent
+from core.sharding import using_owner
+from tasks.models import Task, TaskCompletion
+from tasks.services import completion_history, toggle_completion
+from trackers.models import Tracker, TrackerEntry
+from trackers.services import push_value
+
+from .importer import HistoryImporter
+from .models import Branch, pull_commits, score_from_terms
+
+
+class ScoreTermsTests(TestCase):
+    databases = "__all__"
+
+    def setUp(self):
+        self.user = User.objects.create_user("ada", password="pw")
+        self.branch = Branch.objects.create(name="feature", owner=self.user, base_xp=100)
+
+    def test_cached_terms_follow_task_changes(self):
+        done = Task.objects.create(title="a", branch=self.branch, weight=3, completed=True)
+        Task.objects.create(title="b", branch=self.branch, weight=1)
+        self.branch.refresh_from_db()
+        self.assertEqual((self.branch.score_earned, self.branch.score_total), (3.0, 4))
+        self.assertEqual(self.branch.commit_score, self.branch.calculate_commit_score())
+
+        done.delete()
+        self.branch.refresh_from_db()
+        self.assertEqual((self.branch.score_earned, self.branch.score_total), (0.0, 1))
+
+    def test_moving_a_task_moves_its_terms(self):
+        other = Branch.objects.create(name="other", owner=self.user)
+        task = Task.objects.create(title="a", branch=self.branch, weight=2, completed=True)
+        task.branch = other
+        task.save()
+        self.branch.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual((self.branch.score_total, other.score_earned, other.score_total), (0, 2.0, 2))
+
+    def test_tracker_pushes_update_the_cached_score(self):
+        tracker = Tracker.objects.create(name="Run", branch=self.branch, target_type="SUM", target_value=10, weight=4)
+        Task.objects.create(title="a", branch=self.branch, weight=4)
+        with self.captureOnCommitCallbacks() as callbacks:
+            push_value(tracker.id, self.user, 5)
+        # The branch row is left alone until the push commits.
+        self.branch.refresh_from_db()
+        self.assertEqual((self.branch.score_earned, self.branch.score_total), (0.0, 8))
+        for callback in callbacks:
+            callback()
+        self.branch.refresh_from_db()
+        self.assertEqual((self.branch.score_earned, self.branch.score_total), (2.0, 8))
+        self.assertEqual(self.branch.commit_score, self.branch.calculate_commit_score())
+
+        tracker.refresh_from_db()
+        tracker.delete()
+        self.branch.refresh_from_db()
+        self.assertEqual((self.branch.score_earned, self.branch.score_total), (0.0, 4))
+
+    def test_saves_that_keep_score_and_schedule_skip_branch_queries(self):
+        Task.objects.create(title="a", branch=self.branch, weight=2)
+        task = Task.objects.get(title="a")
+        task.title = "b"
+        with self.assertNumQueries(1):
+            task.save()
+        task.completed = True
+        with self.assertNumQueries(3):  # the save, the score delta, the schedule owner
+            task.save()
+
+    def test_rebuild_scores_repairs_drift(self):
+        Task.objects.create(title="a", branch=self.branch, weight=3, completed=True)
+        Branch.objects.filter(pk=self.branch.pk).update(score_earned=0, score_total=0)
+        out = io.StringIO()
+        call_command("rebuild_scores", "--check", stdout=out)
+        self.assertIn("1 branches drifted", out.getvalue())
+        call_command("rebuild_scores", stdout=io.StringIO())
+        self.branch.refresh_from_db()
+        self.assertEqual((self.branch.score_earned, self.branch.score_total), (3.0, 3))
+
+    def test_score_is_clamped(self):
+        self.assertEqual(score_from_terms(5, 4), 1.0)
+        self.assertEqual(score_from_terms(-1, 4), 0.0)
+        self.assertEqual(score_from_terms(1, 0), 0.0)
+
+
+class PullCommitsTests(TestCase):
+    databases = "__all__"
+
+    def setUp(self):
+        self.user = User.objects.create_user("ada", password="pw")
+
+    def make_branch(self, name, done, total):
+        branch = Branch.objects.create(name=name, owner=self.user, base_xp=100)
+        for index in range(total):
+            Task.objects.create(title=f"{name}{index}", branch=branch, completed=index < done)
+        return branch
+
+    def test_bulk_pull_scores_like_a_single_pull(self):
+        single = self.make_branch("single", 1, 4).pull_commit()
+        self.make_branch("bulk", 1, 4)
+        pull_commits(Branch.objects.filter(name="bulk"))
+        self.assertEqual(
+            list(XpEvent.objects.order_by("id").values_list("branch_name", "score", "amount")),
+            [("single", 0.25, 25), ("bulk", single["score"], single["xp_earned"])],
+        )
+
+    def test_bulk_pull_credits_owners_and_deletes_branches(self):
+        self.make_branch("a", 2, 2)
+        self.make_branch("b", 1, 2)
+        Branch.objects.create(name="main", owner=self.user, is_main=True)
+        self.assertEqual(pull_commits(Branch.objects.all()), (2, 1, 150))
+        self.user.refresh_from_db()
+        self.assertEqual((self.user.level, self.user.xp), (2, 50))
+        self.assertEqual(list(Branch.objects.values_list("name", flat=True)), ["main"])
+
+    def test_bulk_pull_drops_cached_session_users(self):
+        self.make_branch("a", 1, 1)
+        cache.set(user_cache_key(self.user.pk), self.user)
+        pull_commits(Branch.objects.all())
+        self.assertIsNone(cache.get(user_cache_key(self.user.pk)))
+
+
+class HistoryImporterTests(TestCase):
+    databases = "__all__"
+
+    def setUp(self):
+        self.user = User.objects.create_user("ada", password="pw")
+        self.branch = Branch.objects.create(name="feature", owner=self.user)
+
+    def totals(self):
+        rows = completion_history(self.user)
+        return sum(row["completions"] for row in rows), sum(row["weight"] for row in rows)
+
+    def test_imported_completions_are_logged_and_rolled_up(self):
+        old = Task.objects.create(title="old", branch=self.branch, weight=2)
+        toggle_completion(old.id, self.user)
+        stats = HistoryImporter(self.branch).run([
+            {"type": "task", "name": "new", "completed": "true", "weight": "3"},
+            {"type": "task", "name": "open", "completed": "false"},
+            {"type": "task", "name": "old", "completed": "false", "weight": "2"},
+        ])
+        self.assertEqual((stats.tasks_created, stats.tasks_updated), (2, 1))
+
+        new = Task.objects.get(title="new")
+        self.assertIsNotNone(new.completed_at)
+        self.assertIsNone(Task.objects.get(title="old").completed_at)
+        self.assertEqual(
+            list(TaskCompletion.objects.order_by("id").values_list("task__title", "completed", "weight")),
+            [("old", True, 2), ("new", True, 3), ("old", False, 2)],
+        )
+        self.assertEqual(self.totals(), (1, 3))
+
+        # Reopening an imported completion balances its rollup.
+        toggle_completion(new.id, self.user)
+        self.assertEqual(self.totals(), (0, 0))
+
+    def test_unchanged_tasks_are_not_logged(self):
+        HistoryImporter(self.branch).run([{"type": "task", "name": "a", "completed": "true"}])
+        HistoryImporter(self.branch).run([{"type": "task", "name": "a", "completed": "true", "weight": "4"}])
+        self.assertEqual(TaskCompletion.objects.count(), 1)
+        self.assertEqual(Task.objects.get(title="a").weight, 4)
+        self.branch.refresh_from_db()
+        self.assertEqual((self.branch.score_earned, self.branch.score_total), (4.0, 4))
+
+
+class ImportEndpointTests(TestCase):
+    databases = "__all__"
+    csv = (
+        "type,name,value,timestamp,completed,weight\n"
+        "entry,Run,2.5,2026-03-01T08:00:00Z,,\n"
+        "entry,Run,1.5,2026-03-02T08:00:00Z,,\n"
+        "task,Stretch,,,true,2\n"
+    )
+
+    def setUp(self):
+        self.user = User.objects.create_user("ada")
+        self.client.force_login(self.user)
+        with using_owner(self.user):
+            self.branch = Branch.objects.create(name="Health", owner=self.user)
+
+    def upload(self, content, name="history.csv", **data):
+        return self.client.post(
+            f"/api/branches/{self.branch.id}/import/", {"file": SimpleUploadedFile(name, content), **data}
+        )
+
+    def test_csv_import(self):
+        response = self.upload(self.csv.encode())
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(
+            (body["rows"], body["entries"], body["tasksCreated"], body["trackersCreated"], body["dryRun"]),
+            (3, 2, 1, ["Run"], False),
+        )
+        with using_owner(self.user):
+            tracker = Tracker.objects.get(branch=self.branch, name="Run")
+            self.assertEqual(tracker.running_total, 4.0)
+            self.assertEqual(TrackerEntry.objects.filter(tracker=tracker).count(), 2)
+            self.branch.refresh_from_db()
+            self.assertEqual((self.branch.score_earned, self.branch.score_total), (2.0, 2))
+
+    def test_gzipped_ndjson_import(self):
+        lines = [{"type": "entry", "name": "Run", "value": 3}, {"type": "task", "name": "Stretch", "completed": False}]
+        content = gzip.compress("\n".join(json.dumps(line) for line in lines).encode())
+        body = self.upload(content, "history.ndjson.gz").json()
+        self.assertEqual((body["entries"], body["tasksCreated"]), (1, 1))
+
+    def test_dry_run_writes_nothing(self):
+        body = self.upload(self.csv.encode(), dry_run="true").json()
+        self.assertEqual((body["rows"], body["dryRun"]), (3, True))
+        with using_owner(self.user):
+            self.assertFalse(Tracker.objects.exists())
+            self.assertFalse(Task.objects.exists())
+
+    def test_invalid_rows_are_reported(self):
+        response = self.upload(b"type,name,value\nentry,Run,abc\n")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("Row 1", response.json()["error"])
+        self.assertEqual(self.upload(b"type,name\nnote,x\n").status_code, 400)
+        self.assertEqual(self.client.post(f"/api/branches/{self.branch.id}/import/").status_code, 400)
+
+    def assertRejected(self, content, name, message):
+        response = self.upload(content, name)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn(message, response.json()["error"])
+
+    def test_malformed_uploads_are_rejected(self):
+        good = json.dumps({"type": "entry", "name": "Run", "value": 1})
+        self.assertRejected(f"{good}\n{{\"type\": \n".encode(), "history.ndjson", "Line 2: invalid JSON")
+        self.assertRejected(f"{good}\n\n[1, 2]\n".encode(), "history.ndjson", "Line 3: expected a JSON object")
+        self.assertRejected(b"type,name\n\xff\xfe\x00garbage\n", "history.csv", "not valid UTF-8")
+        self.assertRejected(b"type,name\n\"entry,Run", "history.csv", "Line 2")
+        self.assertRejected(b"not gzip", "history.csv.gz", "Line 1")
+        with using_owner(self.user):
+            self.assertFalse(TrackerEntry.objects.exists())
+
+    def test_threshold_trackers_without_a_target_stay_active(self):
+        with using_owner(self.user):
+            tracker = Tracker.objects.create(branch=self.branch, name="Run", target_type="THRESHOLD")
+        self.assertEqual(self.upload(self.csv.encode()).status_code, 200)
+        with using_owner(self.user):
+            tracker.refresh_from_db()
+        self.assertEqual((tracker.running_total, tracker.is_active), (4.0, True))
@@ -1,7 +1,8 @@
 from django.urls import path
-from .views import BranchListCreateView, pull_branch
+from .views import BranchListCreateView, import_history, pull_branch
 
 urlpatterns = [
     path("", BranchListCreateView.as_view()),
     path("<int:branch_id>/pull/", pull_branch),
+    path("<int:branch_id>/import/", import_history),
 ]
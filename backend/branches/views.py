@@ -3,9 +3,12 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework import status
 
+from core.fieldsets import list_response
+from core.throttling import WRITE_THROTTLES
+from .importer import HistoryImporter, HistoryImportError, open_rows
 from .models import Branch
 from .serializers import BranchSerializer
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, throttle_classes
 
 
 class BranchListCreateView(APIView):
@@ -13,8 +16,7 @@ class BranchListCreateView(APIView):
 
     def get(self, request):
         branches = Branch.objects.filter(owner=request.user).order_by("created_at")
-        serializer = BranchSerializer(branches, many=True)
-        return Response(serializer.data)
+        return list_response(request, branches, BranchSerializer)
 
     def post(self, request):
         serializer = BranchSerializer(data=request.data)
@@ -36,7 +38,30 @@ def pull_branch(request, branch_id):
     return Response({
         "score": result["score"],
         "xpEarned": result["xp_earned"],
-        "newXp": request.user.xp,
-        "newLevel": request.user.level,
+        "newXp": result["new_xp"],
+        "newLevel": result["new_level"],
         "leveledUp": result["leveled_up"],
     })
+
+
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+@throttle_classes(WRITE_THROTTLES)
+def import_history(request, branch_id):
+    branch = Branch.objects.get(id=branch_id, owner=request.user)
+
+    upload = request.FILES.get("file")
+    if upload is None:
+        return Response({"error": "file required"}, status=400)
+
+    fmt = request.data.get("format") or (
+        "ndjson" if upload.name.endswith((".ndjson", ".jsonl", ".ndjson.gz", ".jsonl.gz")) else "csv"
+    )
+    dry_run = str(request.data.get("dry_run", "")).lower() in ("1", "true", "yes")
+
+    try:
+        stats = HistoryImporter(branch, dry_run=dry_run).run(open_rows(upload, fmt, upload.name))
+    except HistoryImportError as exc:
+        return Response({"error": str(exc)}, status=400)
+
+    return Response({**stats.as_dict(), "dryRun": dry_run})
@@ -0,0 +1,169 @@
+"""
+In-process execution of batched API calls (POST /api/batch/).
+
+The batch request is authenticated once; every sub-request reuses its user and
+session, is resolved against ROOT_URLCONF and calls the view directly, so the
+middleware stack runs only for the outer request. Sub-requests run in order on
+the request's own DB connection. When every sub-request is safe and the client
+asks for "parallel", they fan out to a small thread pool instead; each worker
+uses its own connection, closed when it finishes.
+
+A call may carry an "idempotency_key", sent to its view as the
+Idempotency-Key header. Keyed calls that already succeeded (a replayed
+offline queue) are answered from one lookup of their keys, without running.
+"""
+import io
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import connections
+from django.urls import Resolver404, resolve
+
+from . import idempotency, metrics
+
+logger = logging.getLogger(__name__)
+
+SAFE_METHODS = ("GET", "HEAD")
+METHODS = SAFE_METHODS + ("POST", "PUT", "PATCH", "DELETE")
+PATH_PREFIX = "/api/"
+BATCH_PATH = "/api/batch/"
+
+
+class BatchError(ValueError):
+    pass
+
+
+def parse_calls(payload):
+    """Validate the batch body into a list of (id, method, path, query, body, key)."""
+    calls = payload.get("requests") if isinstance(payload, dict) else None
+    if not isinstance(calls, list) or not calls:
+        raise BatchError("requests must be a non-empty list")
+    if len(calls) > settings.BATCH_MAX_REQUESTS:
+        raise BatchError(f"at most {settings.BATCH_MAX_REQUESTS} requests per batch")
+
+    parsed = []
+    for index, call in enumerate(calls):
+        if not isinstance(call, dict):
+            raise BatchError(f"requests[{index}] must be an object")
+        method = str(call.get("method", "GET")).upper()
+        if method not in METHODS:
+            raise BatchError(f"requests[{index}]: unsupported method {method}")
+        url = urlsplit(str(call.get("path", "")))
+        if not url.path.startswith(PATH_PREFIX) or url.path.startswith(BATCH_PATH):
+            raise BatchError(f"requests[{index}]: path must be an API route")
+        key = call.get("idempotency_key")
+        if key is not None and (not isinstance(key, str) or len(key) > idempotency.MAX_KEY_LENGTH):
+            raise BatchError(f"requests[{index}]: idempotency_key must be a string of at most "
+                             f"{idempotency.MAX_KEY_LENGTH} characters")
+        parsed.append((call.get("id", index), method, url.path, url.query, call.get("body"), key))
+    return parsed
+
+
+def _sub_request(request, method, path, query, body, key):
+    data = b"" if body is None else json.dumps(body).encode()
+    environ = {
+        name: value for name, value in request.META.items()
+        if not name.startswith("wsgi.") and name not in ("CONTENT_TYPE", "CONTENT_LENGTH", "HTTP_IDEMPOTENCY_KEY")
+    }
+    if key:
+        environ["HTTP_IDEMPOTENCY_KEY"] = key
+    environ.update({
+        "REQUEST_METHOD": method,
+        "SCRIPT_NAME": "",
+        "PATH_INFO": path,
+        "QUERY_STRING": query,
+        "CONTENT_TYPE": "application/json",
+        "CONTENT_LENGTH": str(len(data)),
+        "wsgi.input": io.BytesIO(data),
+    })
+    sub = WSGIRequest(environ)
+    # The outer request already passed authentication and the CSRF check.
+    sub.user = request.user
+    sub.session = request.session
+    sub._dont_enforce_csrf_checks = True
+    return sub
+
+
+def _body(response):
+    if response.get("Content-Type", "").startswith("application/json"):
+        return json.loads(response.content or b"null")
+    return response.content.decode(response.charset or "utf-8")
+
+
+def execute(request, call):
+    """Run one sub-request and return its {id, status, body} result."""
+    call_id, method, path, query, body, key = call
+    try:
+        match = resolve(path)
+    except Resolver404:
+        return {"id": call_id, "status": 404, "body": {"error": "Not found"}}
+
+    sub = _sub_request(request, method, path, query, body, key)
+    sub.resolver_match = match
+    started = time.perf_counter()
+    try:
+        response = match.func(sub, *match.args, **match.kwargs)
+        if hasattr(response, "render"):
+            response = response.render()
+    except Exception:
+        logger.exception("Batched request failed", extra={"method": method, "path": path})
+        return {"id": call_id, "status": 500, "body": {"error": "Internal server error"}}
+
+    if settings.METRICS_ENABLED:
+        metrics.REQUEST_LATENCY.observe(
+            time.perf_counter() - started, method=method, route=match.route, status=response.status_code
+        )
+    if response.streaming:
+        return {"id": call_id, "status": 400, "body": {"error": "Streaming responses cannot be batched"}}
+    return {"id": call_id, "status": response.status_code, "body": _body(response)}
+
+
+def _execute_in_thread(request, call):
+    try:
+        return execute(request, call)
+    finally:
+        connections.close_all()
+
+
+def _replayed(request, calls):
+    """Results of keyed calls whose key already holds their response, by call index."""
+    digests = {
+        index: idempotency.key_digest(request.user.pk, call[5])
+        for index, call in enumerate(calls)
+        if call[5] and call[1] not in SAFE_METHODS
+    }
+    if not digests:
+        return {}
+    records = idempotency.lookup(digests.values())
+    results = {}
+    for index, digest in digests.items():
+        record = records.get(digest)
+        call_id, method, path, _, body, _ = calls[index]
+        if record is not None and bytes(record.fingerprint) == idempotency.fingerprint(method, path, body):
+            body = _body(idempotency.replay(record))
+            results[index] = {"id": call_id, "status": record.status, "body": body, "replayed": True}
+    return results
+
+
+def run_batch(request, calls, parallel=False):
+    replayed = _replayed(request, calls)
+    pending = [call for index, call in enumerate(calls) if index not in replayed]
+    results = iter(_run(request, pending, parallel))
+    return [replayed[index] if index in replayed else next(results) for index in range(len(calls))]
+
+
+def _run(request, calls, parallel):
+    if not parallel or len(calls) < 2 or any(call[1] not in SAFE_METHODS for call in calls):
+        return [execute(request, call) for call in calls]
+
+    workers = min(settings.BATCH_MAX_WORKERS, len(calls))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        # copy_context carries the replica and shard routing into the workers.
+        futures = [pool.submit(copy_context().run, _execute_in_thread, request, call) for call in calls]
+        return [future.result() for future in futures]
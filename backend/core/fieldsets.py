@@ -0,0 +1,122 @@
+"""
+Sparse fieldsets and compact encoding for list endpoints.
+
+    ?fields=id,title,completed   return only these fields
+    ?exclude=recurring_rule      return every field but these
+    ?compact=1                   [[header...], [row...], ...] instead of objects
+
+The SQL is narrowed to match: when every selected field maps straight onto a
+column, rows come from .values_list() and never become model instances;
+otherwise the queryset is limited with .only().
+"""
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework.relations import PrimaryKeyRelatedField
+from rest_framework.response import Response
+
+TRUE_VALUES = {"1", "true", "yes"}
+
+
+class FieldSelectionError(ValueError):
+    pass
+
+
+def _names(request, param):
+    raw = request.query_params.get(param, "")
+    return [name.strip() for name in raw.split(",") if name.strip()]
+
+
+def wants_compact(request):
+    return request.query_params.get("compact", "").lower() in TRUE_VALUES
+
+
+def select_fields(request, available):
+    """Names from `available` picked by ?fields= / ?exclude=, in their original order."""
+    fields, exclude = _names(request, "fields"), _names(request, "exclude")
+    unknown = sorted(set(fields + exclude) - set(available))
+    if unknown:
+        raise FieldSelectionError(f"Unknown fields: {', '.join(unknown)}")
+    return [name for name in available if (not fields or name in fields) and name not in exclude]
+
+
+def _column(field, model):
+    """The column behind a serializer field, or None if it needs the instance."""
+    if "." in field.source or field.source == "*":
+        return None
+    try:
+        model_field = model._meta.get_field(field.source)
+    except FieldDoesNotExist:
+        return None
+    if model_field.is_relation:
+        # A primary-key relation renders as the raw foreign key value.
+        if isinstance(field, PrimaryKeyRelatedField) and model_field.many_to_one:
+            return model_field.attname
+        return None
+    return model_field.attname
+
+
+def _model_fields(field, model, serializer_class):
+    column = _column(field, model)
+    if column is not None:
+        return [column]
+    # Computed fields list the model fields they read in Meta.sparse_sources.
+    return getattr(serializer_class.Meta, "sparse_sources", {}).get(field.field_name)
+
+
+def encode(names, rows):
+    """Dict rows as a header row followed by value rows."""
+    return [list(names)] + [[row[name] for name in names] for row in rows]
+
+
+def _value_rows(queryset, fields, columns):
+    converters = [
+        (lambda value: value) if isinstance(field, PrimaryKeyRelatedField) else field.to_representation
+        for field in fields
+    ]
+    for values in queryset.values_list(*columns).iterator():
+        yield [None if value is None else convert(value) for convert, value in zip(converters, values)]
+
+
+def list_response(request, queryset, serializer_class, context=None):
+    """Serialize a list queryset honouring ?fields=, ?exclude= and ?compact=."""
+    serializer = serializer_class(queryset, many=True, context={"request": request, **(context or {})})
+    readable = {name: field for name, field in serializer.child.fields.items() if not field.write_only}
+    try:
+        names = select_fields(request, list(readable))
+    except FieldSelectionError as exc:
+        return Response({"error": str(exc)}, status=400)
+
+    fields = [readable[name] for name in names]
+    model = queryset.model
+    columns = [_column(field, model) for field in fields]
+    if None not in columns:
+        rows = _value_rows(queryset, fields, columns)
+        if wants_compact(request):
+            return Response([names, *rows])
+        return Response([dict(zip(names, row)) for row in rows])
+
+    sources = [_model_fields(field, model, serializer_class) for field in fields]
+    if None not in sources:
+        queryset = queryset.only(*{column for source in sources for column in source})
+    serializer.instance = queryset
+    for name in set(serializer.child.fields) - set(names):
+        serializer.child.fields.pop(name)
+
+    if wants_compact(request):
+        return Response(encode(names, serializer.data))
+    return Response(serializer.data)
+
+
+def rows_response(request, rows):
+    """Apply ?fields=, ?exclude= and ?compact= to already-built dict rows."""
+    rows = list(rows)
+    available = list(rows[0]) if rows else []
+    try:
+        names = select_fields(request, available) if rows else []
+    except FieldSelectionError as exc:
+        return Response({"error": str(exc)}, status=400)
+
+    if wants_compact(request):
+        return Response(encode(names, rows))
+    if names != available:
+        rows = [{name: row[name] for name in names} for row in rows]
+    return Response(rows)
@@ -0,0 +1,178 @@
+"""
+Idempotency-Key support for retried writes.
+
+A view decorated with @idempotent runs, when the request carries an
+Idempotency-Key header, inside one transaction that first claims the key
+(an INSERT into the unique digest index) and finally stores the rendered
+response on it. A retry with the same key finds the stored row and replays
+its status and body byte for byte without running the view, marked
+"Idempotent-Replayed". A concurrent duplicate waits on the unique index
+until the first request commits, then replays it. If the view raises or
+answers 5xx, everything is rolled back, the key included, so the client can
+retry. Keys expire after IDEMPOTENCY_TTL seconds (purge_idempotency_keys
+deletes them).
+
+Views whose writes are committed elsewhere (buffered tracker pushes, which
+the ingest flush thread writes) pass atomic=False: the key is claimed and
+committed before the view runs, so no lock is held while the view waits on
+that writer, and its response is stored afterwards. A duplicate arriving in
+between is answered 409 with Retry-After. On 5xx the key is released, but
+the write may still land (a timed-out flush), so such a retry can repeat it.
+A claim left unfinished by a crashed worker can be taken over after
+PENDING_LEASE.
+
+core.batch replays the keyed calls of a whole batch (an offline queue)
+from one lookup before running the rest.
+"""
+from datetime import timedelta
+from functools import wraps
+import hashlib
+import json
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.http import HttpResponse, QueryDict
+from django.utils import timezone
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+from .sharding import current_alias
+
+HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+MAX_KEY_LENGTH = 255
+PENDING_LEASE = timedelta(minutes=2)
+
+
+def _digest(*parts):
+    return hashlib.sha256("\0".join(parts).encode()).digest()[:16]
+
+
+def key_digest(user_id, key):
+    return _digest(str(user_id), key)
+
+
+def fingerprint(method, path, data):
+    """Digest of a request; `data` is the parsed body (JSON or form)."""
+    if isinstance(data, QueryDict):
+        data = data.dict()
+    return _digest(method, path, json.dumps(data or {}, sort_keys=True, default=str))
+
+
+def lookup(digests):
+    """Stored, unexpired responses for `digests`, by digest, in one query."""
+    records = IdempotencyKey.objects.filter(
+        digest__in=list(digests), expires_at__gt=timezone.now(), status__isnull=False
+    )
+    return {bytes(record.digest): record for record in records}
+
+
+def replay(record):
+    response = HttpResponse(bytes(record.body or b""), status=record.status, content_type=record.content_type or None)
+    response[REPLAYED_HEADER] = "true"
+    return response
+
+
+def _rendered(request, response):
+    """Render a DRF response the way the view's dispatch would, once."""
+    if isinstance(response, Response) and not response.is_rendered:
+        response.accepted_renderer = request.accepted_renderer
+        response.accepted_media_type = request.accepted_media_type
+        response.renderer_context = {"request": request, **request.parser_context}
+        response.render()
+    return response
+
+
+def _store(digest, request, response):
+    response = _rendered(request, response)
+    IdempotencyKey.objects.filter(digest=digest).update(
+        status=response.status_code, body=response.content, content_type=response.get("Content-Type", "")
+    )
+    return response
+
+
+def _pending(record, now):
+    """Whether `record` is a claim whose request has not finished (yet)."""
+    if record.status is not None:
+        return False
+    claimed_at = record.expires_at - timedelta(seconds=settings.IDEMPOTENCY_TTL)
+    return claimed_at + PENDING_LEASE > now
+
+
+def _claim(digest, request_fingerprint):
+    """Insert the key; return None if claimed, else the existing record."""
+    now = timezone.now()
+    try:
+        with transaction.atomic(using=current_alias()):
+            IdempotencyKey.objects.create(
+                digest=digest,
+                fingerprint=request_fingerprint,
+                expires_at=now + timedelta(seconds=settings.IDEMPOTENCY_TTL),
+            )
+        return None
+    except IntegrityError:
+        record = IdempotencyKey.objects.get(digest=digest)
+        if record.expires_at > now and (record.status is not None or _pending(record, now)):
+            return record
+    # An expired key, or an abandoned claim, may be reused.
+    record.delete()
+    return _claim(digest, request_fingerprint)
+
+
+def _conflict(record, request_fingerprint):
+    if bytes(record.fingerprint) != request_fingerprint:
+        return Response({"error": f"{HEADER} was already used for a different request"}, status=422)
+    if record.status is None:
+        return Response(
+            {"error": f"A request with this {HEADER} is still in progress"}, status=409, headers={"Retry-After": "1"}
+        )
+    return replay(record)
+
+
+def idempotent(view_func=None, *, atomic=True):
+    """
+    Make a DRF function view replay its first response per Idempotency-Key.
+    `atomic` may be a callable, checked per request.
+    """
+    if view_func is None:
+        return lambda func: idempotent(func, atomic=atomic)
+
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key:
+            return view_func(request, *args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return Response({"error": f"{HEADER} is limited to {MAX_KEY_LENGTH} characters"}, status=400)
+
+        digest = key_digest(request.user.pk, key)
+        request_fingerprint = fingerprint(request.method, request.path, request.data)
+        if not (atomic() if callable(atomic) else atomic):
+            return _run_claimed(request, digest, request_fingerprint, view_func, args, kwargs)
+        with transaction.atomic(using=current_alias()):
+            record = _claim(digest, request_fingerprint)
+            if record is not None:
+                return _conflict(record, request_fingerprint)
+
+            response = view_func(request, *args, **kwargs)
+            if response.status_code >= 500:
+                transaction.set_rollback(True, using=current_alias())
+                return response
+            return _store(digest, request, response)
+
+    return wrapper
+
+
+def _run_claimed(request, digest, request_fingerprint, view_func, args, kwargs):
+    record = _claim(digest, request_fingerprint)
+    if record is not None:
+        return _conflict(record, request_fingerprint)
+    try:
+        response = view_func(request, *args, **kwargs)
+    except BaseException:
+        IdempotencyKey.objects.filter(digest=digest).delete()
+        raise
+    if response.status_code >= 500:
+        IdempotencyKey.objects.filter(digest=digest).delete()
+        return response
+    return _store(digest, request, response)
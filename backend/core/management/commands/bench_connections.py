@@ -0,0 +1,64 @@
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connections
+from django.db.backends.signals import connection_created
+
+
+class Command(BaseCommand):
+    help = (
+        "Simulate concurrent request cycles (query + end-of-request cleanup) and "
+        "report connects and latency under the current DATABASES settings."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--database", default="default")
+        parser.add_argument("--threads", type=int, default=16)
+        parser.add_argument("--requests", type=int, default=200, help="Requests per thread.")
+
+    def handle(self, *args, **options):
+        alias = options["database"]
+        settings_dict = connections[alias].settings_dict
+        connects = []
+        lock = threading.Lock()
+
+        def on_connect(sender, connection, **kwargs):
+            if connection.alias == alias:
+                with lock:
+                    connects.append(1)
+
+        def worker():
+            for _ in range(options["requests"]):
+                with connections[alias].cursor() as cursor:
+                    cursor.execute("SELECT 1")
+                close_old_connections()
+            connections.close_all()
+
+        connection_created.connect(on_connect)
+        try:
+            threads = [threading.Thread(target=worker) for _ in range(options["threads"])]
+            started = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - started
+        finally:
+            connection_created.disconnect(on_connect)
+
+        total = options["threads"] * options["requests"]
+        self.stdout.write(
+            f"pool={bool(settings_dict['OPTIONS'].get('pool'))} "
+            f"conn_max_age={settings_dict['CONN_MAX_AGE']} "
+            f"health_checks={settings_dict['CONN_HEALTH_CHECKS']}"
+        )
+        self.stdout.write(f"requests:        {total}")
+        self.stdout.write(f"connects:        {len(connects)}")
+        pool = getattr(connections[alias], "pool", None)
+        if pool:
+            # With a pool, connection_created fires per checkout; the pool's own
+            # counter reports the physical connections actually opened.
+            self.stdout.write(f"pool connects:   {pool.get_stats().get('connections_num', 0)}")
+        self.stdout.write(f"ms/request:      {elapsed * 1000 / total:.3f}")
+        self.stdout.write(f"requests/second: {total / elapsed:.0f}")
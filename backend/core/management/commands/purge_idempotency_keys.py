@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.models import IdempotencyKey
+from core.sharding import data_aliases
+
+
+class Command(BaseCommand):
+    help = "Delete expired Idempotency-Key records in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=10000)
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        deleted = 0
+        for alias in data_aliases():
+            keys = IdempotencyKey.objects.using(alias)
+            while True:
+                ids = list(
+                    keys.filter(expires_at__lte=now)
+                    .values_list("id", flat=True)[: options["batch_size"]]
+                )
+                if not ids:
+                    break
+                deleted += keys.filter(id__in=ids).delete()[0]
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} expired idempotency keys"))
@@ -0,0 +1,67 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+
+from branches.models import Branch
+from core import sharding
+from trackers.models import TrackerEntry
+
+
+class Command(BaseCommand):
+    help = (
+        "Show how owners are spread over the database shards, move one owner "
+        "(--user/--to), or move every owner that is not on its hashed shard (--rehash)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", type=int, help="Owner to move.")
+        parser.add_argument("--to", help="Target alias for --user, e.g. shard_1 or default.")
+        parser.add_argument(
+            "--rehash", action="store_true",
+            help="Move every owner whose data is not on its hashed shard, "
+            "including owners still on the default database.",
+        )
+        parser.add_argument("--dry-run", action="store_true")
+        parser.add_argument("--batch-size", type=int, default=sharding.MOVE_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        if not sharding.shard_count():
+            raise CommandError("Sharding is off; set DB_SHARDS")
+        User = get_user_model()
+
+        if options["user"] is not None:
+            if options["to"] not in sharding.data_aliases():
+                raise CommandError(f"--to must be one of {', '.join(sharding.data_aliases())}")
+            user = User.objects.filter(pk=options["user"]).first()
+            if user is None:
+                raise CommandError("Unknown user")
+            moves = [(user, options["to"])]
+        elif options["rehash"]:
+            moves = [
+                (user, f"{sharding.SHARD_PREFIX}{sharding.placement(user.pk)}")
+                for user in User.objects.order_by("pk")
+                if user.shard != sharding.placement(user.pk)
+            ]
+        else:
+            self.report()
+            return
+
+        for user, target in moves:
+            source = sharding.alias_for(user)
+            if options["dry_run"]:
+                self.stdout.write(f"Would move {user} ({user.pk}) from {source} to {target}")
+                continue
+            copied = sharding.move_owner(user, target, options["batch_size"])
+            summary = ", ".join(f"{count} {label}" for label, count in copied.items())
+            self.stdout.write(f"Moved {user} ({user.pk}) from {source} to {target}: {summary or 'nothing to move'}")
+        self.stdout.write(self.style.SUCCESS(f"{len(moves)} owners {'to move' if options['dry_run'] else 'moved'}"))
+
+    def report(self):
+        owners = dict(get_user_model().objects.values_list("shard").annotate(count=Count("pk")).order_by())
+        for alias in sharding.data_aliases():
+            branches = Branch.objects.using(alias).count()
+            entries = TrackerEntry.objects.using(alias).count()
+            self.stdout.write(
+                f"{alias}: {owners.get(sharding.shard_index(alias), 0)} owners, "
+                f"{branches} branches, {entries} entries"
+            )
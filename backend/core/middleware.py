@@ -0,0 +1,90 @@
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from . import metrics, routers, sharding
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+class MetricsMiddleware:
+    """Record per-route latency and database query counts."""
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        queries = {}
+
+        def count_query(execute, sql, params, many, context):
+            alias = context["connection"].alias
+            queries[alias] = queries.get(alias, 0) + 1
+            return execute(sql, params, many, context)
+
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(count_query))
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - started
+
+        match = getattr(request, "resolver_match", None)
+        route = match.route if match else "<unmatched>"
+        metrics.REQUEST_LATENCY.observe(
+            elapsed, method=request.method, route=route, status=response.status_code
+        )
+        for alias, count in queries.items():
+            metrics.DB_QUERIES.inc(count, route=route, alias=alias)
+        return response
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Serve safe requests from the read replica. After a successful write the
+    client is pinned to the primary for REPLICA_PIN_SECONDS so it reads its
+    own writes despite replication lag.
+    """
+
+    cookie_name = "db_pin"
+
+    def __init__(self, get_response):
+        if not routers.replica_configured():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        safe = request.method in SAFE_METHODS
+        use_replica = safe and self.cookie_name not in request.COOKIES
+
+        with routers.read_from_replica(use_replica):
+            response = self.get_response(request)
+
+        # Read-only batches (/api/batch/) are POSTs but write nothing.
+        wrote = not getattr(response, "read_only", False)
+        if not safe and wrote and response.status_code < 400:
+            response.set_cookie(
+                self.cookie_name,
+                "1",
+                max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True,
+                samesite=settings.SESSION_COOKIE_SAMESITE,
+            )
+        return response
+
+
+class ShardRoutingMiddleware:
+    """Route sharded models to the signed-in user's shard for the request."""
+
+    def __init__(self, get_response):
+        if not sharding.shard_count():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with sharding.using_owner(request.user):
+            return self.get_response(request)
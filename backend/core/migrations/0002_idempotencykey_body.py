@@ -0,0 +1,41 @@
+# Generated by Django 6.0 on 2026-10-19 14:57
+
+import json
+
+from django.db import migrations, models
+
+
+def render_stored_responses(apps, schema_editor):
+    # Keys stored before this migration kept the response data; render it as
+    # DRF's JSONRenderer would so they can still be replayed.
+    IdempotencyKey = apps.get_model("core", "IdempotencyKey")
+    keys = IdempotencyKey.objects.using(schema_editor.connection.alias).exclude(status=None)
+    for key in keys.iterator():
+        key.body = json.dumps(key.response, ensure_ascii=False, separators=(",", ":")).encode()
+        key.content_type = "application/json"
+        key.save(update_fields=["body", "content_type"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='idempotencykey',
+            name='body',
+            field=models.BinaryField(null=True),
+        ),
+        migrations.AddField(
+            model_name='idempotencykey',
+            name='content_type',
+            field=models.CharField(blank=True, max_length=100),
+        ),
+        migrations.RunPython(render_stored_responses, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='idempotencykey',
+            name='response',
+        ),
+    ]
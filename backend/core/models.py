@@ -0,0 +1,21 @@
+from django.db import models
+
+
+class IdempotencyKey(models.Model):
+    """Outcome of a write sent with an Idempotency-Key (see core.idempotency)."""
+
+    # First 16 bytes of sha256("<user id>:<key>"), so keys of any length and
+    # from any user share one compact unique index.
+    digest = models.BinaryField(max_length=16, unique=True)
+    # Same digest of method, path and body, to refuse a key reused for a
+    # different request.
+    fingerprint = models.BinaryField(max_length=16)
+    # Null while a non-atomic claim's request is still running.
+    status = models.PositiveSmallIntegerField(null=True)
+    # The rendered response body, replayed byte for byte.
+    body = models.BinaryField(null=True)
+    content_type = models.CharField(max_length=100, blank=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"{self.digest.hex()} -> {self.status}"
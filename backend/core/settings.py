@@ -14,6 +14,14 @@ from dotenv import load_dotenv
 load_dotenv()
 from pathlib import Path
 
+
+def env_bool(name, default=False):
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -43,14 +51,19 @@ INSTALLED_APPS = [
 EXTRA_APPS = [
     'corsheaders',
     'rest_framework',
+    'core',
     'accounts',
     'branches',
     'tasks',
     'trackers',
+    'streaks',
+    'search',
 ]
 INSTALLED_APPS += EXTRA_APPS
 
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',
+    'core.middleware.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'corsheaders.middleware.CorsMiddleware',
 
@@ -59,6 +72,7 @@ MIDDLEWARE = [
 
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.ShardRoutingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -134,23 +148,166 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    # Token buckets (core.throttling): "<burst>/<period>", refilled evenly.
+    'DEFAULT_THROTTLE_RATES': {
+        'write': os.getenv('THROTTLE_WRITE_RATE', '600/min'),
+        'write_tracker': os.getenv('THROTTLE_WRITE_TRACKER_RATE', '120/min'),
+        'analytics': os.getenv('THROTTLE_ANALYTICS_RATE', '120/min'),
+    },
+    'EXCEPTION_HANDLER': 'core.throttling.exception_handler',
 }
+THROTTLE_ENABLED = env_bool('THROTTLE_ENABLED', True)
+# THROTTLE_SERVE_STALE=1 answers throttled analytics reads with the last
+# response for the same URL (kept THROTTLE_STALE_TTL seconds) instead of 429.
+THROTTLE_SERVE_STALE = env_bool('THROTTLE_SERVE_STALE', False)
+THROTTLE_STALE_TTL = int(os.getenv('THROTTLE_STALE_TTL', '600'))
 # print(os.getenv('DB_NAME'))
+# DB_POOL=1 uses psycopg's connection pool (requires psycopg[pool]); otherwise
+# connections persist for DB_CONN_MAX_AGE seconds. Django rejects persistent
+# connections together with a pool, so CONN_MAX_AGE is forced to 0 there.
+DB_POOL = env_bool("DB_POOL", False)
+DB_OPTIONS = {}
+if DB_POOL:
+    DB_OPTIONS["pool"] = {
+        "min_size": int(os.getenv("DB_POOL_MIN_SIZE", "2")),
+        "max_size": int(os.getenv("DB_POOL_MAX_SIZE", "10")),
+        "timeout": float(os.getenv("DB_POOL_TIMEOUT", "10")),
+        "max_idle": float(os.getenv("DB_POOL_MAX_IDLE", "300")),
+    }
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': f"django.db.backends.{os.getenv('DB_ENGINE', 'postgresql')}",
         'NAME': os.getenv('DB_NAME'),
         'USER': os.getenv('DB_USER'),
         'PASSWORD': os.getenv('DB_PASSWORD'),
         'HOST': os.getenv('DB_HOST'),
         'PORT': os.getenv('DB_PORT'),
+        'CONN_MAX_AGE': 0 if DB_POOL else int(os.getenv("DB_CONN_MAX_AGE", "60")),
+        'CONN_HEALTH_CHECKS': env_bool("DB_CONN_HEALTH_CHECKS", True),
+        'OPTIONS': DB_OPTIONS,
     }
 }
 
+# Optional read replica: set DB_REPLICA_HOST (PostgreSQL) or DB_REPLICA_NAME
+# (e.g. a second SQLite file locally). Safe requests read from it; writers are
+# pinned to the primary for REPLICA_PIN_SECONDS afterwards.
+if os.getenv('DB_REPLICA_HOST') or os.getenv('DB_REPLICA_NAME'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': os.getenv('DB_REPLICA_NAME', DATABASES['default']['NAME']),
+        'HOST': os.getenv('DB_REPLICA_HOST', DATABASES['default']['HOST']),
+        'PORT': os.getenv('DB_REPLICA_PORT', DATABASES['default']['PORT']),
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_ROUTERS = ['core.routers.PrimaryReplicaRouter']
+
+# Owner sharding (core.sharding): DB_SHARDS=N keeps branch data on aliases
+# shard_0..shard_<N-1>. Each shard reads DB_SHARD_<i>_NAME/HOST/PORT/USER/
+# PASSWORD and falls back to the default database's values (so locally
+# DB_ENGINE=sqlite3 with one DB_SHARD_<i>_NAME file per shard). Migrate each
+# shard with `manage.py migrate --database shard_<i>`.
+DB_SHARDS = int(os.getenv('DB_SHARDS', '0'))
+for _index in range(DB_SHARDS):
+    _prefix = f'DB_SHARD_{_index}_'
+    DATABASES[f'shard_{_index}'] = {
+        **DATABASES['default'],
+        **{
+            key: os.getenv(_prefix + key)
+            for key in ('NAME', 'HOST', 'PORT', 'USER', 'PASSWORD')
+            if os.getenv(_prefix + key)
+        },
+    }
+if DB_SHARDS:
+    DATABASE_ROUTERS.insert(0, 'core.sharding.OwnerShardRouter')
+REPLICA_PIN_SECONDS = int(os.getenv('REPLICA_PIN_SECONDS', '5'))
+
+# Monthly range partitioning of tracker entries (PostgreSQL only). Raw months
+# older than the retention window are rolled up into daily aggregates and
+# dropped by `manage.py entry_partitions`; 0 keeps raw entries forever.
+TRACKER_ENTRY_PARTITIONING = env_bool('TRACKER_ENTRY_PARTITIONING', False)
+TRACKER_ENTRY_RETENTION_MONTHS = int(os.getenv('TRACKER_ENTRY_RETENTION_MONTHS', '0'))
+
+# Anomaly flags (trackers.anomalies): EWMA smoothing for entries, rolling
+# window for daily totals, |z| threshold and warm-up length.
+ANOMALY_ALPHA = float(os.getenv('ANOMALY_ALPHA', '0.1'))
+ANOMALY_WINDOW_DAYS = int(os.getenv('ANOMALY_WINDOW_DAYS', '28'))
+ANOMALY_Z = float(os.getenv('ANOMALY_Z', '4.0'))
+ANOMALY_MIN_POINTS = int(os.getenv('ANOMALY_MIN_POINTS', '20'))
+
+# Tracker forecasts (trackers.forecasting): days of history fitted, days
+# looked ahead for the target, and cache lifetime (seconds).
+FORECAST_WINDOW_DAYS = int(os.getenv('FORECAST_WINDOW_DAYS', '28'))
+FORECAST_HORIZON_DAYS = int(os.getenv('FORECAST_HORIZON_DAYS', '365'))
+FORECAST_CACHE_TTL = int(os.getenv('FORECAST_CACHE_TTL', '86400'))
+
+# INGEST_BUFFER=1 group-commits push_entry writes per worker (trackers.ingest):
+# a flush every INGEST_FLUSH_SIZE entries or INGEST_FLUSH_MS milliseconds.
+# INGEST_ACK=commit answers after the group commit, =log after the entry is
+# fsync'd to INGEST_LOG_DIR.
+INGEST_BUFFER = env_bool('INGEST_BUFFER', False)
+INGEST_FLUSH_SIZE = int(os.getenv('INGEST_FLUSH_SIZE', '500'))
+INGEST_FLUSH_MS = int(os.getenv('INGEST_FLUSH_MS', '20'))
+INGEST_ACK = os.getenv('INGEST_ACK', 'commit')
+INGEST_LOG_DIR = os.getenv('INGEST_LOG_DIR', str(BASE_DIR / 'var' / 'ingest'))
+# Queued entries per worker before push_entry answers 503 (0: unbounded).
+INGEST_MAX_PENDING = int(os.getenv('INGEST_MAX_PENDING', '10000'))
+
+
+# Cache & sessions
+# REDIS_URL shares the cache (and cached sessions) between workers; without it
+# each process keeps its own local-memory cache.
+REDIS_URL = os.getenv("REDIS_URL")
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# One of: db, cached_db, cache, signed_cookies
+SESSION_BACKEND = os.getenv("SESSION_BACKEND", "cached_db")
+SESSION_ENGINE = f"django.contrib.sessions.backends.{SESSION_BACKEND}"
+
+# Seconds the session user is served from the cache; 0 disables it.
+USER_CACHE_TTL = int(os.getenv("USER_CACHE_TTL", "30"))
+
+# Admin changelists for large tables (core.admin): above this many rows the
+# planner's estimate is shown instead of an exact COUNT(*).
+ADMIN_EXACT_COUNT_LIMIT = int(os.getenv("ADMIN_EXACT_COUNT_LIMIT", "10000"))
+
+# Seconds a stored Idempotency-Key response is replayed (core.idempotency).
+IDEMPOTENCY_TTL = int(os.getenv("IDEMPOTENCY_TTL", "86400"))
+
+# Leaderboard: size of the cached top-N snapshot and cache lifetime (seconds).
+LEADERBOARD_TOP_N = int(os.getenv("LEADERBOARD_TOP_N", "100"))
+LEADERBOARD_CACHE_TTL = int(os.getenv("LEADERBOARD_CACHE_TTL", "300"))
+# Bounds how long per-level counts stored by a read racing a level-up stay stale.
+LEADERBOARD_LEVELS_TTL = int(os.getenv("LEADERBOARD_LEVELS_TTL", "60"))
+
+# Task scheduling: length (minutes) of a SCHEDULED task's slot, and lifetime
+# of a cached per-user interval tree (task changes drop it immediately).
+SCHEDULE_POINT_MINUTES = int(os.getenv("SCHEDULE_POINT_MINUTES", "30"))
+SCHEDULE_CACHE_TTL = int(os.getenv("SCHEDULE_CACHE_TTL", "3600"))
+
+# /api/batch/: sub-requests per batch and threads for parallel read-only batches.
+BATCH_MAX_REQUESTS = int(os.getenv("BATCH_MAX_REQUESTS", "25"))
+BATCH_MAX_WORKERS = int(os.getenv("BATCH_MAX_WORKERS", "4"))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
 AUTH_USER_MODEL = 'accounts.User'
+AUTHENTICATION_BACKENDS = [
+    'accounts.backends.CachedModelBackend',
+]
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -183,3 +340,31 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/6.0/howto/static-files/
 
 STATIC_URL = 'static/'
+
+
+# Metrics & logging
+# Set LOG_LEVEL=OFF to silence application logging entirely.
+METRICS_ENABLED = env_bool("METRICS_ENABLED", True)
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+_log_level = 100 if LOG_LEVEL == "OFF" else LOG_LEVEL
+# The django loggers are routed to the JSON handler too, replacing Django's
+# plain-text console and admin-email handlers.
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "formatters": {
+        "json": {"()": "core.jsonlog.JsonFormatter"},
+    },
+    "handlers": {
+        "console": {"class": "logging.StreamHandler", "formatter": "json"},
+    },
+    "root": {
+        "handlers": ["console"],
+        "level": _log_level,
+    },
+    "loggers": {
+        "django": {"handlers": ["console"], "level": _log_level, "propagate": False},
+        "django.server": {"handlers": ["console"], "level": _log_level, "propagate": False},
+    },
+}
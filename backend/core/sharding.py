@@ -0,0 +1,264 @@
+"""
+Owner-sharded databases (DB_SHARDS=N).
+
+Branches and everything below them (tasks, completion history, trackers,
+entries, rollups, anomalies, streaks, search index rows, idempotency keys)
+live on one of the aliases shard_0 .. shard_<N-1>, chosen per owner; users,
+XP events, sessions and the other global tables stay on "default". User.shard records where an
+owner's data is. None means "default", which is where every owner's data was
+before sharding was enabled; rebalance_shards moves such owners out.
+
+Requests are routed by ShardRoutingMiddleware, which activates the signed-in
+user's shard for the rest of the request. Code running outside a request
+(commands, the ingest flush thread) wraps its work in using_owner() or
+using_alias(). Transactions and raw cursors over sharded tables must name the
+alias explicitly: transaction.atomic(using=current_alias()).
+
+Each shard allocates primary keys from its own range (SHARD_ID_RANGE ids per
+shard, set up after migrate), so ids stay unique across shards and an owner's
+rows keep their ids when moved. Each shard holds a stub accounts_user row per
+owner it stores (username only, unusable password) so owner foreign keys and
+owner joins keep working inside the shard; the real user row is always read
+from "default".
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+SHARD_PREFIX = "shard_"
+SHARDED_APPS = {"branches", "tasks", "trackers", "streaks", "search", "core"}
+# Shard i allocates ids from (i + 1) * SHARD_ID_RANGE; "default" keeps the
+# ids below the first range.
+SHARD_ID_RANGE = 10 ** 12
+
+# Sharded models in copy order, with the lookup selecting one owner's rows.
+OWNER_ROWS = (
+    ("branches.Branch", "owner_id"),
+    ("tasks.Task", "branch__owner_id"),
+    ("tasks.TaskCompletion", "user_id"),
+    ("tasks.TaskDailyRollup", "user_id"),
+    ("trackers.Tracker", "branch__owner_id"),
+    ("trackers.TrackerEntry", "tracker__branch__owner_id"),
+    ("trackers.TrackerDailyRollup", "tracker__branch__owner_id"),
+    ("trackers.TrackerAnomaly", "tracker__branch__owner_id"),
+    ("streaks.Streak", "user_id"),
+)
+MOVE_BATCH_SIZE = 5000
+
+_alias = ContextVar("shard_alias", default=DEFAULT_DB_ALIAS)
+
+
+def shard_count():
+    return settings.DB_SHARDS
+
+
+def shard_aliases():
+    return [f"{SHARD_PREFIX}{index}" for index in range(shard_count())]
+
+
+def data_aliases():
+    """Every alias that can hold owner data: "default", then the shards."""
+    return [DEFAULT_DB_ALIAS, *shard_aliases()]
+
+
+def shard_index(alias):
+    return int(alias[len(SHARD_PREFIX):]) if alias.startswith(SHARD_PREFIX) else None
+
+
+def alias_for(user):
+    """Alias holding `user`'s data."""
+    shard = getattr(user, "shard", None)
+    if shard is None or not shard_count():
+        return DEFAULT_DB_ALIAS
+    return f"{SHARD_PREFIX}{shard}"
+
+
+def placement(user_id):
+    """Shard index a new owner is placed on."""
+    return user_id % shard_count()
+
+
+def current_alias():
+    return _alias.get()
+
+
+@contextmanager
+def using_alias(alias):
+    """Route sharded models to `alias` inside the block."""
+    token = _alias.set(alias)
+    try:
+        yield alias
+    finally:
+        _alias.reset(token)
+
+
+def using_owner(user):
+    return using_alias(alias_for(user))
+
+
+def sharded_models():
+    return [
+        model
+        for app_label in SHARDED_APPS
+        for model in apps.get_app_config(app_label).get_models()
+        if model._meta.managed and not model._meta.proxy
+    ]
+
+
+def find(model, **lookup):
+    """First `model` row matching `lookup` on any data alias, or None."""
+    for alias in data_aliases():
+        obj = model._default_manager.using(alias).filter(**lookup).first()
+        if obj is not None:
+            return obj
+    return None
+
+
+def ensure_owner_row(user, alias):
+    """Create `user`'s stub row on shard `alias` if it is missing."""
+    if alias == DEFAULT_DB_ALIAS:
+        return
+    model = type(user)
+    stub = model(pk=user.pk, username=user.username, password=make_password(None))
+    model._default_manager.db_manager(alias).bulk_create([stub], ignore_conflicts=True)
+
+
+def place_owner(user):
+    """Assign a new user to a shard; no-op when sharding is off."""
+    if not shard_count() or user.shard is not None:
+        return
+    user.shard = placement(user.pk)
+    type(user)._default_manager.filter(pk=user.pk).update(shard=user.shard)
+    ensure_owner_row(user, alias_for(user))
+
+
+def _delete_owner_rows(user, alias):
+    # Deleting through Branch lets the score signals skip per-row work.
+    with using_alias(alias):
+        apps.get_model("branches", "Branch").objects.using(alias).filter(owner_id=user.pk).delete()
+        for label, owner_lookup in OWNER_ROWS:
+            if owner_lookup == "user_id":
+                apps.get_model(label).objects.using(alias).filter(user_id=user.pk).delete()
+        if alias != DEFAULT_DB_ALIAS:
+            type(user)._default_manager.using(alias).filter(pk=user.pk).delete()
+
+
+def drop_owner(user):
+    """Delete a deleted user's data and stub from their shard."""
+    alias = alias_for(user)
+    if alias != DEFAULT_DB_ALIAS:
+        _delete_owner_rows(user, alias)
+
+
+def _copy(queryset, target, batch_size):
+    model = queryset.model
+    manager = model._default_manager.db_manager(target)
+    copied, batch = 0, []
+    for row in queryset.order_by("pk").values().iterator(chunk_size=batch_size):
+        batch.append(model(**row))
+        if len(batch) == batch_size:
+            copied += len(manager.bulk_create(batch))
+            batch = []
+    if batch:
+        copied += len(manager.bulk_create(batch))
+    return copied
+
+
+def move_owner(user, target, batch_size=MOVE_BATCH_SIZE):
+    """
+    Move `user`'s data to alias `target`, keeping every id. Returns the rows
+    copied per model.
+
+    The owner's branches, tasks and trackers stay locked on the source until
+    the copy is committed and User.shard points at the target, so pushes and
+    toggles wait, then find their rows gone and fail; clients retry against
+    the new shard. Idempotency keys carry no owner and are not moved.
+    """
+    source = alias_for(user)
+    if source == target:
+        return {}
+    Branch = apps.get_model("branches", "Branch")
+    copied = {}
+    ensure_owner_row(user, target)
+    with transaction.atomic(using=source):
+        branches = Branch.objects.using(source).filter(owner_id=user.pk)
+        list(branches.select_for_update().values_list("pk", flat=True))
+        for label in ("tasks.Task", "trackers.Tracker"):
+            model = apps.get_model(label)
+            list(model.objects.using(source).select_for_update().filter(branch__in=branches).values_list("pk", flat=True))
+
+        with transaction.atomic(using=target):
+            for label, owner_lookup in OWNER_ROWS:
+                rows = apps.get_model(label).objects.using(source).filter(**{owner_lookup: user.pk})
+                copied[label] = _copy(rows, target, batch_size)
+
+        user.shard = shard_index(target)
+        user.save(update_fields=["shard"])
+        _delete_owner_rows(user, source)
+    return copied
+
+
+def reserve_id_range(alias):
+    """
+    Move every sharded table's id sequence on shard `alias` into the shard's
+    range. Sequences already past the start are left alone.
+    """
+    index = shard_index(alias)
+    if index is None:
+        return
+    start = (index + 1) * SHARD_ID_RANGE
+    connection = connections[alias]
+    with connection.cursor() as cursor:
+        for model in sharded_models():
+            if model._meta.auto_field is None:
+                continue
+            table = model._meta.db_table
+            column = model._meta.pk.column
+            if connection.vendor == "postgresql":
+                cursor.execute(
+                    f"SELECT setval(pg_get_serial_sequence(%s, %s), "
+                    f"GREATEST(%s, (SELECT COALESCE(MAX({column}), 0) FROM {table})))",
+                    [table, column, start - 1],
+                )
+            elif connection.vendor == "sqlite":
+                cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = %s", [table])
+                row = cursor.fetchone()
+                if row is None:
+                    cursor.execute("INSERT INTO sqlite_sequence (name, seq) VALUES (%s, %s)", [table, start - 1])
+                elif row[0] < start - 1:
+                    cursor.execute("UPDATE sqlite_sequence SET seq = %s WHERE name = %s", [start - 1, table])
+
+
+def reserve_id_ranges(sender, using=DEFAULT_DB_ALIAS, **kwargs):
+    """post_migrate handler: keep a freshly migrated shard's ids in range."""
+    reserve_id_range(using)
+
+
+class OwnerShardRouter:
+    """
+    Route sharded apps to the active owner's shard, or to the database of the
+    instance they were loaded from. Other apps fall through to the next
+    router. Every alias gets the full schema.
+    """
+
+    def _db(self, model, **hints):
+        if model._meta.app_label not in SHARDED_APPS:
+            return None
+        instance = hints.get("instance")
+        if instance is not None and instance._meta.app_label in SHARDED_APPS and instance._state.db:
+            return instance._state.db
+        return current_alias()
+
+    db_for_read = _db
+    db_for_write = _db
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if obj1._state.db == obj2._state.db:
+            return True
+        sharded = (obj1._meta.app_label in SHARDED_APPS, obj2._meta.app_label in SHARDED_APPS)
+        # Owner rows are global; sharded rows on different shards never relate.
+        return sharded[0] != sharded[1]
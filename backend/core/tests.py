@@ -0,0 +1,572 @@
+from datetime import timedelta
+import importlib.util
+import io
+import json
+import logging
+import os
+import tempfile
+from unittest import mock, skipIf, skipUnless
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connections
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.log import configure_logging
+
+from accounts.models import User, XpEvent
+from branches.models import Branch, pull_commits
+from tasks.models import Task, TaskCompletion
+from trackers.models import Tracker, TrackerEntry
+
+from . import idempotency, metrics, routers, sharding, throttling
+from .admin import estimated_count
+from .jsonlog import JsonFormatter
+from .middleware import ReplicaRoutingMiddleware
+from .models import IdempotencyKey
+from .settings import env_bool
+from .sharding import alias_for, using_owner
+
+
+class MetricsTests(TestCase):
+    databases = "__all__"
+
+    def test_counter_and_histogram_exposition(self):
+        counter = metrics.Counter("jobs_total", "Jobs.", ("queue",))
+        counter.inc(queue="fast")
+        counter.inc(2, queue="fast")
+        self.assertEqual(list(counter.collect()), ['jobs_total{queue="fast"} 3'])
+
+        histogram = metrics.Histogram("wait_seconds", "Wait.", buckets=(0.1, 1.0))
+        histogram.observe(0.05)
+        histogram.observe(0.5)
+        self.assertEqual(list(histogram.collect()), [
+            'wait_seconds_bucket{le="0.1"} 1',
+            'wait_seconds_bucket{le="1.0"} 2',
+            'wait_seconds_bucket{le="+Inf"} 2',
+            "wait_seconds_sum 0.55",
+            "wait_seconds_count 2",
+        ])
+
+    def test_requests_are_measured_and_exported(self):
+        user = User.objects.create_user("ada")
+        self.client.force_login(user)
+        self.client.get("/api/tasks/")
+        response = self.client.get("/metrics")
+        self.assertEqual(response.status_code, 200)
+        body = response.content.decode()
+        self.assertIn("# TYPE http_request_duration_seconds histogram", body)
+        self.assertIn('http_request_duration_seconds_count{method="GET",route="api/tasks/",status="200"}', body)
+        self.assertIn('db_queries_total{route="api/tasks/"', body)
+
+    def test_metrics_can_be_disabled(self):
+        with self.settings(METRICS_ENABLED=False):
+            self.assertEqual(self.client.get("/metrics").status_code, 404)
+
+
+class JsonFormatterTests(TestCase):
+    def test_records_are_one_json_object_with_extras(self):
+        record = logging.makeLogRecord({
+            "name": "tasks", "levelname": "INFO", "msg": "Toggled %s", "args": (3,), "task_id": 3,
+        })
+        payload = json.loads(JsonFormatter().format(record))
+        self.assertEqual(
+            {key: payload[key] for key in ("level", "logger", "message", "task_id")},
+            {"level": "INFO", "logger": "tasks", "message": "Toggled 3", "task_id": 3},
+        )
+
+
+class LoggingSettingsTests(SimpleTestCase):
+    def emitted(self, log_level):
+        path = os.path.join(os.path.dirname(__file__), "settings.py")
+        spec = importlib.util.spec_from_file_location("log_settings", path)
+        module = importlib.util.module_from_spec(spec)
+        with mock.patch.dict(os.environ, {"LOG_LEVEL": log_level}):
+            spec.loader.exec_module(module)
+
+        stream = io.StringIO()
+        self.addCleanup(configure_logging, settings.LOGGING_CONFIG, settings.LOGGING)
+        with mock.patch("sys.stderr", stream):
+            configure_logging(settings.LOGGING_CONFIG, module.LOGGING)
+            logging.getLogger("django.request").warning("Not Found: /nope")
+            logging.getLogger("django.server").warning("GET /nope 404")
+            logging.getLogger("tasks").warning("Toggled")
+        return stream.getvalue().splitlines()
+
+    def test_off_silences_django_loggers_too(self):
+        self.assertEqual(self.emitted("OFF"), [])
+
+    def test_django_records_are_logged_once_as_json(self):
+        lines = self.emitted("INFO")
+        self.assertEqual(
+            [json.loads(line)["logger"] for line in lines], ["django.request", "django.server", "tasks"]
+        )
+
+
+class ConnectionSettingsTests(TransactionTestCase):
+    def test_env_bool(self):
+        with mock.patch.dict(os.environ, {"FLAG_ON": " Yes ", "FLAG_OFF": "0"}):
+            self.assertTrue(env_bool("FLAG_ON"))
+            self.assertFalse(env_bool("FLAG_OFF", True))
+            self.assertTrue(env_bool("FLAG_MISSING", True))
+
+    def test_bench_connections_reports_connects(self):
+        out = io.StringIO()
+        call_command("bench_connections", threads=2, requests=3, stdout=out)
+        report = dict(line.split(":", 1) for line in out.getvalue().splitlines()[1:])
+        self.assertEqual(int(report["requests"]), 6)
+        # Persistent connections: one per thread, not one per request.
+        self.assertLessEqual(int(report["connects"]), 2)
+
+
+class ReplicaRoutingTests(SimpleTestCase):
+    def setUp(self):
+        databases = {**settings.DATABASES, routers.REPLICA_ALIAS: settings.DATABASES["default"]}
+        override = self.settings(DATABASES=databases)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.router = routers.PrimaryReplicaRouter()
+        self.factory = RequestFactory()
+
+    def serve(self, request, response=None):
+        seen = {}
+
+        def get_response(request):
+            seen["read"] = self.router.db_for_read(User)
+            seen["write"] = self.router.db_for_write(User)
+            return response or HttpResponse()
+
+        return ReplicaRoutingMiddleware(get_response)(request), seen
+
+    def test_safe_requests_read_from_the_replica(self):
+        response, seen = self.serve(self.factory.get("/api/tasks/"))
+        self.assertEqual(seen, {"read": routers.REPLICA_ALIAS, "write": "default"})
+        self.assertNotIn(ReplicaRoutingMiddleware.cookie_name, response.cookies)
+        self.assertEqual(self.router.db_for_read(User), "default")
+
+    def test_writes_pin_the_client_to_the_primary(self):
+        response, seen = self.serve(self.factory.post("/api/tasks/"))
+        self.assertEqual(seen["read"], "default")
+        self.assertIn(ReplicaRoutingMiddleware.cookie_name, response.cookies)
+
+        request = self.factory.get("/api/tasks/")
+        request.COOKIES[ReplicaRoutingMiddleware.cookie_name] = "1"
+        self.assertEqual(self.serve(request)[1]["read"], "default")
+
+    def test_failed_and_read_only_posts_do_not_pin(self):
+        self.assertNotIn(
+            ReplicaRoutingMiddleware.cookie_name,
+            self.serve(self.factory.post("/api/tasks/"), HttpResponse(status=400))[0].cookies,
+        )
+        read_only = HttpResponse()
+        read_only.read_only = True
+        self.assertNotIn(ReplicaRoutingMiddleware.cookie_name, self.serve(self.factory.post("/api/batch/"), read_only)[0].cookies)
+
+
+class BatchTests(TestCase):
+    databases = "__all__"
+
+    def setUp(self):
+        self.user = User.objects.create_user("ada")
+        self.client.force_login(self.user)
+        with using_owner(self.user):
+            self.branch = Branch.objects.create(name="feature", owner=self.user)
+            self.task = Task.objects.create(title="write", branch=self.branch)
+
+    def batch(self, *calls, **options):
+        return self.client.post("/api/batch/", {"requests": list(calls), **options}, content_type="application/json")
+
+    def test_calls_run_in_order(self):
+        response = self.batch(
+            {"id": "toggle", "method": "PATCH", "path": f"/api/tasks/{self.task.id}/toggle/"},
+            {"id": "list", "path": f"/api/tasks/?branch={self.branch.id}"},
+            {"id": "missing", "path": "/api/nothing/"},
+        )
+        toggle, listing, missing = response.json()["responses"]
+        self.assertEqual((toggle["id"], toggle["status"], toggle["body"]["completed"]), ("toggle", 200, True))
+        self.assertTrue(listing["body"][0]["completed"])
+        self.assertEqual(missing["status"], 404)
+
+    def test_read_only_batches_do_not_pin_to_the_primary(self):
+        response = self.batch({"path": "/api/tasks/"}, {"path": "/api/trackers/"})
+        self.assertEqual([result["status"] for result in response.json()["responses"]], [200, 200])
+        self.assertNotIn("db_pin", response.cookies)
+
+    def test_invalid_batches_are_rejected(self):
+        for calls in (
+            [],
+            [{"method": "TRACE", "path": "/api/tasks/"}],
+            [{"path": "/admin/"}],
+            [{"path": "/api/batch/"}],
+            [{"path": "/api/tasks/", "method": "POST", "idempotency_key": 5}],
+            [{"path": "/api/tasks/"}] * 26,
+        ):
+            with self.subTest(calls=calls[:1]):
+                self.assertEqual(self.batch(*calls).status_code, 400)
+
+
+class ParallelBatchTests(TransactionTestCase):
+    databases = "__all__"
+
+    def test_read_only_calls_fan_out(self):
+        user = User.objects.create_user("ada")
+        self.client.force_login(user)
+        with using_owner(user):
+            Branch.objects.create(name="feature", owner=user)
+        calls = [{"id": index, "path": "/api/branches/"} for index in range(6)]
+        response = self.client.post(
+            "/api/batch/", {"requests": calls, "parallel": True}, content_type="application/json"
+        )
+        results = response.json()["responses"]
+        self.assertEqual([result["id"] for result in results], list(range(6)))
+        self.assertTrue(all(result["body"][0]["name"] == "feature" for result in results))
+
+
+class SparseFieldsetTests(TestCase):
+    databases = "__all__"
+
+    def setUp(self):
+        self.user = User.objects.create_user("ada")
+        self.client.force_login(self.user)
+        with using_owner(self.user):
+            self.branch = Branch.objects.create(name="feature", owner=self.user)
+            self.task = Task.objects.create(title="write", branch=self.branch, weight=2, completed=True)
+            Branch.objects.filter(pk=self.branch.pk).update(score_earned=1, score_total=4)
+
+    def get(self, path, **params):
+        return self.client.get(path, params)
+
+    def test_fields_and_exclude(self):
+        rows = self.get("/api/tasks/", fields="id,title,branch").json()
+        self.assertEqual(rows, [{"id": self.task.id, "title": "write", "branch": self.branch.id}])
+        row = self.get("/api/tasks/", exclude="recurring_rule,created_at").json()[0]
+        self.assertNotIn("recurring_rule", row)
+        self.assertEqual(row["weight"], 2)
+
+    def test_compact_rows(self):
+        rows = self.get("/api/tasks/", fields="title,completed", compact="1").json()
+        self.assertEqual(rows, [["title", "completed"], ["write", True]])
+
+    def test_computed_fields_read_their_sources(self):
+        rows = self.get("/api/branches/", fields="name,commit_score").json()
+        self.assertEqual(rows, [{"name": "feature", "commit_score": 0.25}])
+
+    def test_unknown_fields_are_rejected(self):
+        response = self.get("/api/tasks/", fields="id,secret")
+        self.assertEqual((response.status_code, response.json()["error"]), (400, "Unknown fields: secret"))
+
+
+class IdempotencyTests(TestCase):
+    databases = "__all__"
+
+    def setUp(self):
+        self.user = User.objects.create_user("ada", password="pw")
+        self.client.force_login(self.user)
+        with using_owner(self.user):
+            branch = Branch.objects.create(name="feature", owner=self.user)
+            self.task = Task.objects.create(title="write", branch=branch)
+
+    def toggle(self, key, data=None):
+        return self.client.patch(
+            f"/api/tasks/{self.task.id}/toggle/", data or {}, content_type="application/json",
+            headers={"Idempotency-Key": key},
+        )
+
+    def completed(self):
+        with using_owner(self.user):
+            return Task.objects.get(id=self.task.id).completed
+
+    def test_retry_replays_the_same_bytes(self):
+        first = self.toggle("k1")
+        retry = self.toggle("k1")
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual((retry.status_code, retry.content), (first.status_code, first.content))
+        self.assertEqual(retry["Content-Type"], first["Content-Type"])
+        self.assertEqual(retry["Idempotent-Replayed"], "true")
+        self.assertNotIn("Idempotent-Replayed", first)
+        # completed_at keeps its microseconds.
+        self.assertIn(first.json()["completed_at"], first.content.decode())
+        self.assertTrue(self.completed())
+
+    def test_new_key_runs_again(self):
+        self.toggle("k1")
+        self.toggle("k2")
+        self.assertFalse(self.completed())
+
+    def test_key_reused_for_a_different_request_is_refused(self):
+        self.toggle("k1")
+        self.assertEqual(self.toggle("k1", {"other": 1}).status_code, 422)
+        self.assertEqual(self.toggle("x" * 256).status_code, 400)
+
+    def test_batch_replays_stored_responses(self):
+        first = self.toggle("k1")
+        response = self.client.post("/api/batch/", {"requests": [
+            {"id": "a", "method": "PATCH", "path": f"/api/tasks/{self.task.id}/toggle/", "idempotency_key": "k1"},
+        ]}, content_type="application/json")
+        [result] = response.json()["responses"]
+        self.assertEqual((result["status"], result["body"], result["replayed"]), (200, first.json(), True))
+        self.assertTrue(self.completed())
+
+    def test_expired_keys_are_reused(self):
+        self.toggle("k1")
+        with using_owner(self.user):
+            IdempotencyKey.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertNotIn("Idempotent-Replayed", self.toggle("k1"))
+        self.assertFalse(self.completed())
+
+    def test_server_errors_release_the_key(self):
+        with mock.patch("tasks.services.toggle_completion", side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                self.toggle("k1")
+        self.assertEqual(self.toggle("k1").status_code, 200)
+        self.assertTrue(self.completed())
+
+
+class NonAtomicClaimTests(TestCase):
+    databases = "__all__"
+
+    def setUp(self):
+        self.user = User.objects.create_user("ada", password="pw")
+        self.digest = idempotency.key_digest(self.user.pk, "k1")
+        self.fingerprint = idempotency.fingerprint("POST", "/x/", {})
+
+    def test_unfinished_claims_answer_conflict_until_the_lease_ends(self):
+        self.assertIsNone(idempotency._claim(self.digest, self.fingerprint))
+        record = idempotency._claim(self.digest, self.fingerprint)
+        response = idempotency._conflict(record, self.fingerprint)
+        self.assertEqual((response.status_code, response["Retry-After"]), (409, "1"))
+
+        IdempotencyKey.objects.update(expires_at=timezone.now() - idempotency.PENDING_LEASE + timedelta(hours=1))
+        with self.settings(IDEMPOTENCY_TTL=3600):
+            self.assertIsNone(idempotency._claim(self.digest, self.fingerprint))
+
+
+class LargeTableAdminTests(TestCase):
+    databases = "__all__"
+    url = "/admin/trackers/trackerentry/"
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser("root", None)
+        self.client.force_login(self.admin)
+        with using_owner(self.admin):
+            branch = Branch.objects.create(name="Health", owner=self.admin)
+            self.trackers = [Tracker.objects.create(name=f"t{i}", branch=branch) for i in range(5)]
+            TrackerEntry.objects.bulk_create(
+                TrackerEntry(tracker=self.trackers[i % 5], value=i) for i in range(150)
+            )
+            self.ids = list(TrackerEntry.objects.order_by("-id").values_list("id", flat=True))
+
+    def changelist(self, **params):
+        queries = [CaptureQueriesContext(connections[alias]) for alias in {"default", alias_for(self.admin)}]
+        for context in queries:
+            context.__enter__()
+        try:
+            response = self.client.get(self.url, params)
+        finally:
+            for context in queries:
+                context.__exit__(None, None, None)
+        self.assertEqual(response.status_code, 200)
+        return response, sum(len(context) for context in queries)
+
+    def test_keyset_pages_with_a_fixed_number_of_queries(self):
+        self.changelist()  # loads the signed-in user into the user cache
+        first, first_queries = self.changelist()
+        cl = first.context["cl"]
+        self.assertTrue(cl.keyset)
+        self.assertEqual([entry.id for entry in cl.result_list], self.ids[:100])
+        self.assertEqual(cl.next_cursor, self.ids[99])
+        self.assertContains(first, f"?after={self.ids[99]}")
+
+        second, second_queries = self.changelist(after=self.ids[99])
+        cl = second.context["cl"]
+        self.assertEqual([entry.id for entry in cl.result_list], self.ids[100:])
+        self.assertIsNone(cl.next_cursor)
+        self.assertEqual(second_queries, first_queries)
+        # One count and one page query; no per-row tracker lookups.
+        self.assertLessEqual(first_queries, 3)
+
+    def test_autocomplete_filter_and_other_orderings(self):
+        tracker = self.trackers[2]
+        response, _ = self.changelist(**{"tracker__id__exact": tracker.id})
+        cl = response.context["cl"]
+        self.assertEqual({entry.tracker_id for entry in cl.result_list}, {tracker.id})
+        self.assertEqual(cl.result_count, 30)
+
+        response, _ = self.changelist(o="2")
+        self.assertFalse(response.context["cl"].keyset)
+
+    def test_bad_cursor_is_rejected(self):
+        response = self.client.get(self.url, {"after": "x"})
+        self.assertEqual(response.status_code, 302)
+        self.assertIn("e=1", response["Location"])
+
+    def test_estimated_count_is_exact_below_the_limit(self):
+        with using_owner(self.admin):
+            self.assertEqual(estimated_count(TrackerEntry.objects.all()), 150)
+
+
+class ThrottleTests(TestCase):
+    databases = "__all__"
+    rates = {"write": "100/min", "write_tracker": "3/min", "analytics": "1/min"}
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user("ada")
+        self.client.force_login(self.user)
+        with using_owner(self.user):
+            branch = Branch.objects.create(name="Health", owner=self.user)
+            self.trackers = [Tracker.objects.create(name=name, branch=branch) for name in ("a", "b")]
+
+        self.clock = mock.Mock()
+        self.clock.time.return_value = 1000.0
+        for patcher in (
+            mock.patch.object(throttling, "time", self.clock),
+            mock.patch.object(throttling.TokenBucketThrottle, "THROTTLE_RATES", self.rates),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def push(self, tracker):
+        return self.client.post(
+            f"/api/trackers/{tracker.id}/push/", {"value": 1}, content_type="application/json"
+        ).status_code
+
+    def test_tracker_bucket_allows_a_burst_then_refills(self):
+        first, second = self.trackers
+        self.assertEqual([self.push(first) for _ in range(3)], [201] * 3)
+        response = self.client.post(f"/api/trackers/{first.id}/push/", {"value": 1}, content_type="application/json")
+        self.assertEqual((response.status_code, response["Retry-After"]), (429, "20"))
+        # Each tracker has its own bucket.
+        self.assertEqual(self.push(second), 201)
+
+        self.clock.time.return_value += 20
+        self.assertEqual([self.push(first), self.push(first)], [201, 429])
+
+    @override_settings(THROTTLE_ENABLED=False)
+    def test_disabled_throttles_let_everything_through(self):
+        self.assertEqual({self.push(self.trackers[0]) for _ in range(5)}, {201})
+
+    @override_settings(THROTTLE_SERVE_STALE=True)
+    def test_throttled_analytics_reads_are_served_stale(self):
+        url = "/api/trackers/forecast/"
+        fresh = self.client.get(url)
+        self.assertEqual(fresh.status_code, 200)
+
+        self.clock.time.return_value += 5
+        stale = self.client.get(url)
+        self.assertEqual((stale.status_code, stale["Age"]), (200, "5"))
+        self.assertIn("Stale", stale["Warning"])
+        self.assertEqual(stale.json(), fresh.json())
+        # Nothing is stored for another URL.
+        self.assertEqual(self.client.get(url, {"method": "linear"}).status_code, 429)
+
+
+@skipUnless(settings.DB_SHARDS >= 2, "needs DB_SHARDS=2")
+class ShardMoveTests(TestCase):
+    databases = "__all__"
+
+    def setUp(self):
+        self.user = User.objects.create_user("ada")
+        self.client.force_login(self.user)
+        self.source = sharding.alias_for(self.user)
+        self.target = next(alias for alias in sharding.shard_aliases() if alias != self.source)
+        with using_owner(self.user):
+            self.branch = Branch.objects.create(name="Health", owner=self.user)
+            self.task = Task.objects.create(title="Run", branch=self.branch)
+            self.tracker = Tracker.objects.create(name="Water", branch=self.branch)
+        self.assertEqual(self.client.patch(f"/api/tasks/{self.task.id}/toggle/").status_code, 200)
+        for value in (1, 2):
+            self.assertEqual(self.push(value), 201)
+
+    def push(self, value):
+        return self.client.post(
+            f"/api/trackers/{self.tracker.id}/push/", {"value": value}, content_type="application/json"
+        ).status_code
+
+    def rows(self, alias):
+        return {
+            label: sorted(apps.get_model(label).objects.using(alias).filter(**{lookup: self.user.pk})
+                          .values_list("pk", flat=True))
+            for label, lookup in sharding.OWNER_ROWS
+        }
+
+    def test_new_owners_get_ids_from_their_shard_range(self):
+        start = (sharding.shard_index(self.source) + 1) * sharding.SHARD_ID_RANGE
+        self.assertGreaterEqual(self.branch.id, start)
+        self.assertTrue(User.objects.using(self.source).filter(pk=self.user.pk).exists())
+
+    def test_move_keeps_ids_and_empties_the_source(self):
+        before = self.rows(self.source)
+        copied = sharding.move_owner(self.user, self.target, batch_size=1)
+        self.assertEqual(copied["trackers.TrackerEntry"], 2)
+        self.assertEqual(copied["tasks.TaskCompletion"], 1)
+
+        self.assertEqual(self.rows(self.target), before)
+        self.assertFalse(any(self.rows(self.source).values()))
+        self.assertFalse(User.objects.using(self.source).filter(pk=self.user.pk).exists())
+        self.assertEqual(User.objects.get(pk=self.user.pk).shard, sharding.shard_index(self.target))
+        self.assertEqual(sharding.move_owner(self.user, self.target), {})
+
+    def test_api_follows_the_owner_after_a_move(self):
+        sharding.move_owner(self.user, self.target)
+        self.assertEqual(self.push(3), 201)
+        self.assertEqual(self.client.patch(f"/api/tasks/{self.task.id}/toggle/").status_code, 200)
+        self.assertEqual(TrackerEntry.objects.using(self.target).filter(tracker=self.tracker.id).count(), 3)
+        self.assertEqual(TaskCompletion.objects.using(self.target).filter(task=self.task.id).count(), 2)
+
+    def test_rehash_moves_owners_left_on_default(self):
+        sharding.move_owner(self.user, "default")
+        self.assertIsNone(User.objects.get(pk=self.user.pk).shard)
+        out = io.StringIO()
+        call_command("rebalance_shards", rehash=True, dry_run=True, stdout=out)
+        self.assertIn(f"Would move ada ({self.user.pk}) from default to {self.source}", out.getvalue())
+        self.assertTrue(Branch.objects.using("default").filter(owner=self.user.pk).exists())
+
+        call_command("rebalance_shards", rehash=True, stdout=io.StringIO())
+        self.assertEqual(User.objects.get(pk=self.user.pk).shard, sharding.shard_index(self.source))
+        self.assertFalse(Branch.objects.using("default").filter(owner=self.user.pk).exists())
+        self.assertEqual(self.rows(self.source)["branches.Branch"], [self.branch.id])
+
+    def test_pull_commits_deletes_on_the_branches_shard(self):
+        self.assertEqual(sharding.current_alias(), "default")
+        pulled, owners, _ = pull_commits(Branch.objects.using(self.source).filter(owner_id=self.user.pk))
+        self.assertEqual((pulled, owners), (1, 1))
+        self.assertFalse(Branch.objects.using(self.source).filter(id=self.branch.id).exists())
+        self.assertTrue(XpEvent.objects.filter(user=self.user, branch_id=self.branch.id).exists())
+
+    def test_maintenance_commands_cover_every_shard(self):
+        Branch.objects.using(self.source).filter(id=self.branch.id).update(score_total=99)
+        out = io.StringIO()
+        call_command("rebuild_scores", stdout=out)
+        self.assertIn(f"{self.source}: rebuilt 1 branches", out.getvalue())
+        self.assertEqual(Branch.objects.using(self.source).get(id=self.branch.id).score_total, 1)
+
+        out = io.StringIO()
+        call_command("score_anomalies", stdout=out)
+        self.assertIn("Scored 1 trackers", out.getvalue())
+
+        with self.assertRaises(CommandError):
+            call_command("export_entries", "out.csv.gz", format="csv", stdout=io.StringIO())
+        with tempfile.TemporaryDirectory() as directory:
+            out = io.StringIO()
+            call_command("export_entries", f"{directory}/out.csv.gz", format="csv", user="ada", stdout=out)
+        self.assertIn("Exported 2 rows", out.getvalue())
+
+    def test_deleting_a_user_drops_their_shard_data(self):
+        self.user.delete()
+        self.assertFalse(any(self.rows(self.source).values()))
+
+
+@skipIf(settings.DB_SHARDS, "sharding is on")
+class UnshardedTests(TestCase):
+    def test_owners_stay_on_default(self):
+        user = User.objects.create_user("ada")
+        self.assertIsNone(user.shard)
+        self.assertEqual(sharding.alias_for(user), "default")
+        with self.assertRaises(CommandError):
+            call_command("rebalance_shards", stdout=io.StringIO())
@@ -0,0 +1,129 @@
+"""
+Token-bucket throttles kept in the Django cache.
+
+Rates use DRF's "<count>/<period>" syntax from REST_FRAMEWORK's
+DEFAULT_THROTTLE_RATES. A bucket holds <count> tokens (the allowed burst)
+and refills at <count>/<period> per second. A request spends one token, and
+a rejected request gets Retry-After set to the time until the next token.
+Buckets live in the shared cache, so every worker sees the same budget.
+Like DRF's own throttles they read and write without a lock, so concurrent
+requests can slightly overspend a bucket.
+
+Scopes:
+
+    write           per user, every write to tracker entries
+    write_tracker   per user and tracker, so one device loop cannot use up
+                    the user's whole write budget
+    analytics       per user, expensive reads (stats, heatmaps, series...)
+
+With THROTTLE_SERVE_STALE, an analytics request that runs out of tokens is
+answered with the last response stored for the same user and URL by
+@keep_stale, marked with Age and Warning headers. A 429 is sent only when
+nothing is stored.
+"""
+from functools import wraps
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.exceptions import Throttled
+from rest_framework.response import Response
+from rest_framework.throttling import SimpleRateThrottle
+from rest_framework.views import exception_handler as drf_exception_handler
+
+from core import metrics
+
+THROTTLED = metrics.register(metrics.Counter(
+    "api_throttled_total",
+    "Requests that ran out of throttle tokens, by scope and outcome (rejected, stale).",
+    ["scope", "outcome"],
+))
+
+
+class TokenBucketThrottle(SimpleRateThrottle):
+    cache_format = "throttle:%(scope)s:%(ident)s"
+
+    def get_cache_key(self, request, view):
+        ident = request.user.pk if request.user.is_authenticated else self.get_ident(request)
+        return self.cache_format % {"scope": self.scope, "ident": ident}
+
+    def allow_request(self, request, view):
+        if self.rate is None or not settings.THROTTLE_ENABLED:
+            return True
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        capacity, refill = self.num_requests, self.num_requests / self.duration
+        now = time.time()
+        tokens, stamp = self.cache.get(self.key, (capacity, now))
+        tokens = min(capacity, tokens + (now - stamp) * refill)
+        if tokens < 1:
+            self._wait = (1 - tokens) / refill
+            request.throttled_scope = self.scope
+            return False
+        # Once the bucket would be full again the key can simply expire.
+        self.cache.set(self.key, (tokens - 1, now), math.ceil((capacity - tokens + 1) / refill) + 1)
+        return True
+
+    def wait(self):
+        return self._wait
+
+
+class WriteThrottle(TokenBucketThrottle):
+    scope = "write"
+
+
+class TrackerWriteThrottle(TokenBucketThrottle):
+    scope = "write_tracker"
+
+    def get_cache_key(self, request, view):
+        tracker_id = view.kwargs.get("tracker_id")
+        if tracker_id is None:
+            return None
+        # Keyed by user too, so other users cannot drain someone's tracker.
+        return self.cache_format % {"scope": self.scope, "ident": f"{request.user.pk}:{tracker_id}"}
+
+
+class AnalyticsThrottle(TokenBucketThrottle):
+    scope = "analytics"
+
+
+WRITE_THROTTLES = [WriteThrottle, TrackerWriteThrottle]
+ANALYTICS_THROTTLES = [AnalyticsThrottle]
+
+
+def _stale_key(request):
+    return f"stale:{request.user.pk}:{request.get_full_path()}"
+
+
+def keep_stale(view_func):
+    """Store the view's successful responses for THROTTLE_SERVE_STALE."""
+
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        response = view_func(request, *args, **kwargs)
+        if settings.THROTTLE_SERVE_STALE and response.status_code == 200 and hasattr(response, "data"):
+            cache.set(_stale_key(request), (time.time(), response.data), settings.THROTTLE_STALE_TTL)
+        return response
+
+    return wrapper
+
+
+def exception_handler(exc, context):
+    """DRF's handler, except throttled analytics reads may be served stale."""
+    if isinstance(exc, Throttled):
+        request = context["request"]
+        scope = getattr(request, "throttled_scope", "")
+        serve_stale = settings.THROTTLE_SERVE_STALE and request.method == "GET"
+        stale = cache.get(_stale_key(request)) if serve_stale else None
+        if stale is not None:
+            stored_at, data = stale
+            THROTTLED.inc(scope=scope, outcome="stale")
+            response = Response(data)
+            response["Age"] = str(int(time.time() - stored_at))
+            response["Warning"] = '110 - "Response is Stale"'
+            return response
+        THROTTLED.inc(scope=scope, outcome="rejected")
+    return drf_exception_handler(exc, context)
@@ -0,0 +1,22 @@
+from datetime import datetime, time
+
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils.timezone import is_naive, make_aware
+
+
+def parse_time_range(request):
+    """Read optional ?from=&to= (ISO date or datetime) query params; raises ValueError."""
+    bounds = []
+    for key in ("from", "to"):
+        raw = request.query_params.get(key)
+        if not raw:
+            bounds.append(None)
+            continue
+        value = parse_datetime(raw)
+        if value is None:
+            day = parse_date(raw)
+            if day is None:
+                raise ValueError(f"invalid '{key}' value")
+            value = datetime.combine(day, time.min)
+        bounds.append(make_aware(value) if is_naive(value) else value)
+    return bounds
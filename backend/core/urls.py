@@ -17,8 +17,14 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 
+from .views import batch_view, metrics_view
+
 urlpatterns = [
     path("admin/", admin.site.urls),
+    path("metrics", metrics_view),
+
+    # Batched API calls
+    path("api/batch/", batch_view),
 
     # Auth APIs
     path("api/auth/", include("accounts.urls")),
@@ -29,4 +35,8 @@ urlpatterns = [
     path("api/trackers/", include("trackers.urls")),
     # Branch APIs
     path("api/branches/", include("branches.urls")),
+    # Streak APIs
+    path("api/streaks/", include("streaks.urls")),
+    # Search APIs
+    path("api/search/", include("search.urls")),
 ]
@@ -0,0 +1,36 @@
+from django.conf import settings
+from django.http import Http404, HttpResponse
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from . import batch, metrics, routers
+from .middleware import ReplicaRoutingMiddleware
+
+
+def metrics_view(request):
+    if not settings.METRICS_ENABLED:
+        raise Http404
+    return HttpResponse(
+        metrics.render(),
+        content_type="text/plain; version=0.0.4; charset=utf-8",
+    )
+
+
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+def batch_view(request):
+    try:
+        calls = batch.parse_calls(request.data)
+    except batch.BatchError as exc:
+        return Response({"error": str(exc)}, status=400)
+
+    # An all-read batch may use the replica like any GET would.
+    read_only = all(call[1] in batch.SAFE_METHODS for call in calls)
+    use_replica = read_only and ReplicaRoutingMiddleware.cookie_name not in request.COOKIES
+    with routers.read_from_replica(use_replica):
+        responses = batch.run_batch(request, calls, parallel=bool(request.data.get("parallel")))
+
+    response = Response({"responses": responses})
+    response.read_only = read_only
+    return response
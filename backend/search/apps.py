@@ -0,0 +1,11 @@
+from django.apps import AppConfig
+from django.db.models.signals import post_migrate
+
+
+class SearchConfig(AppConfig):
+    name = 'search'
+
+    def ready(self):
+        from .indexes import restore_sqlite_triggers
+
+        post_migrate.connect(restore_sqlite_triggers, sender=self)
@@ -0,0 +1,151 @@
+"""
+Search indexes, created by this app's migrations.
+
+PostgreSQL: per searchable model, a GIN index on the tsvector expression that
+search.services queries with (document()), and a pg_trgm GIN index on
+UPPER(label) that serves substring matches (and the admin's icontains
+search_fields).
+
+SQLite (local runs): one FTS5 table, search_index, kept in sync by triggers.
+Its rowid encodes the source row (id * 3 + kind code) so updates and deletes
+touch a single index row. Rebuilding a table drops its triggers, so they are
+restored after every migrate (restore_sqlite_triggers).
+"""
+from django.apps import apps as global_apps
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVector
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models import TextField
+from django.db.models.functions import Cast, Upper
+
+CONFIG = "simple"
+FTS_TABLE = "search_index"
+
+# kind -> (app label, model, label field, extra document fields)
+SOURCES = {
+    "task": ("tasks", "Task", "title", ()),
+    "tracker": ("trackers", "Tracker", "name", ()),
+    "branch": ("branches", "Branch", "name", ("description",)),
+}
+KIND_CODES = {"task": 0, "tracker": 1, "branch": 2}
+
+
+def document(kind):
+    """tsvector over a kind's label (weight A) and extra fields (weight B)."""
+    _, _, label, extra = SOURCES[kind]
+    vector = SearchVector(label, config=CONFIG, weight="A")
+    for field in extra:
+        vector = vector + SearchVector(field, config=CONFIG, weight="B")
+    return vector
+
+
+def _postgres_indexes(kind):
+    _, model, label, _ = SOURCES[kind]
+    prefix = model.lower()
+    return [
+        GinIndex(document(kind), name=f"search_{prefix}_document_idx"),
+        GinIndex(
+            OpClass(Upper(Cast(label, TextField())), name="gin_trgm_ops"),
+            name=f"search_{prefix}_label_trgm_idx",
+        ),
+    ]
+
+
+def _sqlite_insert(apps, kind, row):
+    """
+    INSERT ... SELECT copying `row` into the FTS table: NEW inside a trigger,
+    or "src", which reads every existing row, for the backfill.
+    """
+    app_label, model_name, label, extra = SOURCES[kind]
+    opts = apps.get_model(app_label, model_name)._meta
+    branches = apps.get_model("branches", "Branch")._meta.db_table
+    body = " || ' ' || ".join(f"COALESCE({row}.{opts.get_field(f).column}, '')" for f in extra) or "''"
+
+    if kind == "branch":
+        owner, branch = f"{row}.owner_id", f"{row}.id"
+        source = "" if row == "NEW" else f" FROM {opts.db_table} AS {row}"
+    else:
+        owner, branch = "b.owner_id", f"{row}.branch_id"
+        if row == "NEW":
+            source = f" FROM {branches} AS b WHERE b.id = NEW.branch_id"
+        else:
+            source = f" FROM {opts.db_table} AS {row} JOIN {branches} AS b ON b.id = {row}.branch_id"
+    return (
+        f"INSERT INTO {FTS_TABLE} (rowid, kind, object_id, owner_id, branch_id, label, body) "
+        f"SELECT {row}.id * 3 + {KIND_CODES[kind]}, '{kind}', {row}.id, {owner}, {branch}, "
+        f"{row}.{opts.get_field(label).column}, {body}{source}"
+    )
+
+
+def create_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        for kind, (app_label, model_name, _, _) in SOURCES.items():
+            model = apps.get_model(app_label, model_name)
+            for index in _postgres_indexes(kind):
+                schema_editor.add_index(model, index)
+    elif schema_editor.connection.vendor == "sqlite":
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+            "kind UNINDEXED, object_id UNINDEXED, owner_id UNINDEXED, branch_id UNINDEXED, "
+            "label, body, prefix='2 3')"
+        )
+        for kind in SOURCES:
+            _create_sqlite_triggers(apps, schema_editor.execute, kind)
+            schema_editor.execute(_sqlite_insert(apps, kind, "src"))
+
+
+def _create_sqlite_triggers(apps, execute, kind):
+    app_label, model_name, label, extra = SOURCES[kind]
+    opts = apps.get_model(app_label, model_name)._meta
+    table = opts.db_table
+    # Only searched columns: running totals and cached scores update often.
+    watched = ", ".join(
+        opts.get_field(name).column
+        for name in (label, *extra, "owner" if kind == "branch" else "branch")
+    )
+    insert = _sqlite_insert(apps, kind, "NEW")
+    delete = f"DELETE FROM {FTS_TABLE} WHERE rowid = OLD.id * 3 + {KIND_CODES[kind]}"
+    execute(f"CREATE TRIGGER search_{kind}_ai AFTER INSERT ON {table} BEGIN {insert}; END")
+    execute(f"CREATE TRIGGER search_{kind}_ad AFTER DELETE ON {table} BEGIN {delete}; END")
+    execute(
+        f"CREATE TRIGGER search_{kind}_au AFTER UPDATE OF {watched} ON {table} "
+        f"BEGIN {delete}; {insert}; END"
+    )
+
+
+def restore_sqlite_triggers(sender, apps=global_apps, using=DEFAULT_DB_ALIAS, **kwargs):
+    """
+    post_migrate handler. SQLite drops a table's triggers whenever a
+    migration rebuilds the table (AddField with a default, AlterField...),
+    so after every migrate each kind with a missing trigger gets its
+    triggers re-created and its index rows rebuilt.
+    """
+    connection = connections[using]
+    if connection.vendor != "sqlite" or FTS_TABLE not in connection.introspection.table_names():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")
+        existing = {name for (name,) in cursor.fetchall()}
+        for kind in SOURCES:
+            names = [f"search_{kind}_{suffix}" for suffix in ("ai", "ad", "au")]
+            if all(name in existing for name in names):
+                continue
+            for name in names:
+                cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE kind = %s", [kind])
+            _create_sqlite_triggers(apps, cursor.execute, kind)
+            cursor.execute(_sqlite_insert(apps, kind, "src"))
+
+
+def drop_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        for kind, (app_label, model_name, _, _) in SOURCES.items():
+            model = apps.get_model(app_label, model_name)
+            for index in _postgres_indexes(kind):
+                schema_editor.remove_index(model, index)
+    elif schema_editor.connection.vendor == "sqlite":
+        for kind in SOURCES:
+            for suffix in ("ai", "ad", "au"):
+                schema_editor.execute(f"DROP TRIGGER IF EXISTS search_{kind}_{suffix}")
+        schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
@@ -0,0 +1,26 @@
+from django.db import migrations
+
+
+def create_indexes(apps, schema_editor):
+    from search.indexes import create_indexes
+
+    create_indexes(apps, schema_editor)
+
+
+def drop_indexes(apps, schema_editor):
+    from search.indexes import drop_indexes
+
+    drop_indexes(apps, schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('branches', '0002_branch_score_terms'),
+        ('tasks', '0002_rename_end_datetime_task_end_at_and_more'),
+        ('trackers', '0006_tracker_running_total'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
@@ -0,0 +1,3 @@
+# No models: the app's tables come from search.indexes. This module exists
+# because Django only sends post_migrate to apps that have one, and
+# restore_sqlite_triggers runs on it.
@@ -0,0 +1,85 @@
+"""
+Owner-scoped typeahead search over task titles, tracker names and branch
+names/descriptions.
+
+Every word of the query is matched as a prefix ("wor ru" finds "Workout
+run"). On PostgreSQL each kind is one query over its GIN indexes: the
+tsvector prefix match, or a substring match served by the trigram index,
+ranked by ts_rank plus trigram similarity. Elsewhere the FTS5 table from
+search.indexes is queried and ranked by bm25.
+"""
+import heapq
+import re
+
+from django.apps import apps
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramSimilarity
+from django.db import connections
+from django.db.models import F, Q
+
+from core.sharding import current_alias
+
+from .indexes import CONFIG, FTS_TABLE, SOURCES, document
+
+KINDS = tuple(SOURCES)
+MAX_TERMS = 8
+WORD = re.compile(r"\w+", re.UNICODE)
+
+
+def terms(text):
+    return WORD.findall(text.lower())[:MAX_TERMS]
+
+
+def _owner_filter(kind, user):
+    return Q(owner=user) if kind == "branch" else Q(branch__owner=user)
+
+
+def _search_postgres(user, text, words, kinds, limit):
+    query = SearchQuery(" & ".join(f"{word}:*" for word in words), search_type="raw", config=CONFIG)
+    results = []
+    for kind in kinds:
+        app_label, model_name, label, _ = SOURCES[kind]
+        rows = (
+            apps.get_model(app_label, model_name).objects
+            .filter(_owner_filter(kind, user))
+            .annotate(document=document(kind))
+            .filter(Q(document=query) | Q(**{f"{label}__icontains": text}))
+            .annotate(
+                rank=SearchRank(F("document"), query) + TrigramSimilarity(label, text),
+                label=F(label),
+                **({"branch_id": F("id")} if kind == "branch" else {}),
+            )
+            .order_by("-rank")
+            .values_list("id", "label", "branch_id", "rank")[:limit]
+        )
+        results.extend(
+            {"kind": kind, "id": object_id, "label": name, "branch": branch_id, "rank": rank}
+            for object_id, name, branch_id, rank in rows
+        )
+    return heapq.nlargest(limit, results, key=lambda row: row["rank"])
+
+
+def _search_sqlite(user, words, kinds, limit):
+    match = " ".join(f'"{word}"*' for word in words)
+    placeholders = ", ".join(["%s"] * len(kinds))
+    sql = (
+        # bm25 is lower-is-better; weight label hits over description hits.
+        f"SELECT kind, object_id, label, branch_id, -bm25({FTS_TABLE}, 0, 0, 0, 0, 10.0, 1.0) AS rank "
+        f"FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s AND owner_id = %s AND kind IN ({placeholders}) "
+        f"ORDER BY rank DESC LIMIT %s"
+    )
+    with connections[current_alias()].cursor() as cursor:
+        cursor.execute(sql, [match, user.pk, *kinds, limit])
+        return [
+            {"kind": kind, "id": object_id, "label": label, "branch": branch_id, "rank": rank}
+            for kind, object_id, label, branch_id, rank in cursor.fetchall()
+        ]
+
+
+def search(user, text, kinds=KINDS, limit=10):
+    """Best matches for `text` among `user`'s objects, highest rank first."""
+    words = terms(text)
+    if not words:
+        return []
+    if connections[current_alias()].vendor == "postgresql":
+        return _search_postgres(user, text.strip(), words, kinds, limit)
+    return _search_sqlite(user, words, kinds, limit)
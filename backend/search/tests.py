@@ -0,0 +1,72 @@
+from django.test import TestCase
+
+from accounts.models import User
+from branches.models import Branch
+from core.sharding import using_owner
+from tasks.models import Task
+from trackers.models import Tracker
+
+from . import services
+
+
+class SearchTests(TestCase):
+    databases = "__all__"
+
+    def setUp(self):
+        self.user = User.objects.create_user("ada")
+        self.other = User.objects.create_user("bob")
+        self.client.force_login(self.user)
+        with self.owner():
+            self.branch = Branch.objects.create(name="Fitness", description="Workout plans", owner=self.user)
+            self.task = Task.objects.create(title="Workout run", branch=self.branch)
+            self.tracker = Tracker.objects.create(name="Running distance", branch=self.branch)
+        with using_owner(self.other):
+            branch = Branch.objects.create(name="Workout", owner=self.other)
+            Task.objects.create(title="Workout run", branch=branch)
+
+    def owner(self):
+        return using_owner(self.user)
+
+    def found(self, text, **kwargs):
+        with self.owner():
+            return {(hit["kind"], hit["id"]) for hit in services.search(self.user, text, **kwargs)}
+
+    def test_every_word_matches_as_a_prefix(self):
+        self.assertEqual(self.found("wor ru"), {("task", self.task.id)})
+        self.assertEqual(
+            self.found("run"), {("task", self.task.id), ("tracker", self.tracker.id)}
+        )
+
+    def test_descriptions_match_and_labels_rank_first(self):
+        with self.owner():
+            hits = services.search(self.user, "workout")
+        self.assertEqual(hits[0]["kind"], "task")
+        self.assertIn(("branch", self.branch.id), {(hit["kind"], hit["id"]) for hit in hits})
+
+    def test_results_are_scoped_to_the_owner(self):
+        for hit in self.client.get("/api/search/", {"q": "workout"}).json():
+            self.assertIn((hit["kind"], hit["id"]), {("task", self.task.id), ("branch", self.branch.id)})
+
+    def test_kinds_filter(self):
+        self.assertEqual(self.found("run", kinds=["tracker"]), {("tracker", self.tracker.id)})
+
+    def test_index_follows_renames_and_deletes(self):
+        with self.owner():
+            Task.objects.filter(id=self.task.id).update(title="Stretching")
+        self.assertEqual(self.found("stre"), {("task", self.task.id)})
+        self.assertEqual(self.found("wor ru"), set())
+
+        with self.owner():
+            self.tracker.delete()
+        self.assertEqual(self.found("running"), set())
+
+    def test_blank_query_returns_nothing(self):
+        self.assertEqual(self.found("  !! "), set())
+
+    def test_endpoint_validates_parameters(self):
+        response = self.client.get("/api/search/", {"q": "run", "types": "task,note"})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get("/api/search/", {"q": "run", "limit": "many"})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get("/api/search/", {"q": "run", "types": "task", "limit": "1"})
+        self.assertEqual([hit["id"] for hit in response.json()], [self.task.id])
@@ -0,0 +1,22 @@
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from .services import KINDS, search as run_search
+
+MAX_LIMIT = 50
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def search(request):
+    text = request.query_params.get("q", "")
+    kinds = [kind for kind in request.query_params.get("types", ",".join(KINDS)).split(",") if kind]
+    if not set(kinds) <= set(KINDS):
+        return Response({"error": f"types must be among {', '.join(KINDS)}"}, status=400)
+    try:
+        limit = min(int(request.query_params.get("limit", 10)), MAX_LIMIT)
+    except ValueError:
+        return Response({"error": "limit must be an integer"}, status=400)
+
+    return Response(run_search(request.user, text, kinds or KINDS, max(limit, 1)))
@@ -0,0 +1,17 @@
+from django.contrib import admin
+from .models import Streak
+
+
+@admin.register(Streak)
+class StreakAdmin(admin.ModelAdmin):
+    list_display = (
+        "user",
+        "task",
+        "tracker",
+        "current",
+        "longest",
+        "last_day",
+    )
+
+    list_select_related = ("user", "task", "tracker")
+    raw_id_fields = ("user", "task", "tracker")
@@ -0,0 +1,37 @@
+# Generated by Django 6.0 on 2026-10-19 14:07
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('tasks', '0002_rename_end_datetime_task_end_at_and_more'),
+        ('trackers', '0005_trackerentry_timestamp_default'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Streak',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('interval_days', models.PositiveSmallIntegerField(default=1)),
+                ('current', models.PositiveIntegerField(default=0)),
+                ('longest', models.PositiveIntegerField(default=0)),
+                ('last_day', models.DateField(blank=True, null=True)),
+                ('history', models.BigIntegerField(default=0)),
+                ('active_days', models.PositiveIntegerField(default=0)),
+                ('task', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='streak', to='tasks.task')),
+                ('tracker', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='streak', to='trackers.tracker')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='streaks', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.CheckConstraint(condition=models.Q(('task__isnull', True), ('tracker__isnull', True), _connector='XOR'), name='streak_exactly_one_item')],
+            },
+        ),
+    ]
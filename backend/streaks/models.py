@@ -0,0 +1,36 @@
+from django.db import models
+from accounts.models import User
+from tasks.models import Task
+from trackers.models import Tracker
+
+
+class Streak(models.Model):
+    """
+    Incrementally maintained streak state for one recurring task or tracker.
+
+    `history` is a bitmask of active days: bit i is set when the item was
+    active on `last_day - i`, so rolling completion rates are a shift and a
+    popcount instead of a scan over the item's history.
+    """
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="streaks")
+    task = models.OneToOneField(Task, on_delete=models.CASCADE, null=True, blank=True, related_name="streak")
+    tracker = models.OneToOneField(Tracker, on_delete=models.CASCADE, null=True, blank=True, related_name="streak")
+
+    interval_days = models.PositiveSmallIntegerField(default=1)
+    current = models.PositiveIntegerField(default=0)
+    longest = models.PositiveIntegerField(default=0)
+    last_day = models.DateField(null=True, blank=True)
+    history = models.BigIntegerField(default=0)
+    active_days = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.CheckConstraint(
+                condition=models.Q(task__isnull=True) ^ models.Q(tracker__isnull=True),
+                name="streak_exactly_one_item",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.task or self.tracker}: {self.current}"
@@ -0,0 +1,218 @@
+from datetime import datetime, timedelta, timezone
+import math
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from django.db import transaction
+
+from core.sharding import current_alias
+from trackers.models import TrackerEntry
+
+from .models import Streak
+
+HISTORY_DAYS = 63
+HISTORY_MASK = (1 << HISTORY_DAYS) - 1
+WEEKLY_RULES = {"weekend", "weekly"}
+
+
+def user_zone(user):
+    try:
+        return ZoneInfo(user.user_timezone or "UTC")
+    except (ZoneInfoNotFoundError, ValueError):
+        return timezone.utc
+
+
+def local_day(user, when=None):
+    """The calendar day of `when` (default: now) in the user's timezone."""
+    return (when or datetime.now(timezone.utc)).astimezone(user_zone(user)).date()
+
+
+def task_interval(task):
+    """Days allowed between completions before a recurring task's streak breaks."""
+    rule = task.recurring_rule or {}
+    if not isinstance(rule, dict):
+        return 1
+    if rule.get("type") in WEEKLY_RULES:
+        return 7
+    try:
+        return max(int(rule.get("days") or 1), 1)
+    except (TypeError, ValueError):
+        return 1
+
+
+def _runs(history, interval):
+    """
+    [length, oldest offset] of each run in `history`, newest first. Days in
+    a run are at most `interval` days apart.
+    """
+    runs, previous = [], None
+    for offset in range(HISTORY_DAYS):
+        if not history >> offset & 1:
+            continue
+        if previous is not None and offset - previous <= interval:
+            runs[-1][0] += 1
+            runs[-1][1] = offset
+        else:
+            runs.append([1, offset])
+        previous = offset
+    return runs
+
+
+def _run_lengths(streak, hidden):
+    """Run lengths in the streak's history, the oldest run credited with the
+    `hidden` days from before the history if it reaches that far back."""
+    runs = _runs(streak.history, streak.interval_days)
+    lengths = [length for length, _ in runs]
+    if hidden and runs and runs[-1][1] + streak.interval_days >= HISTORY_DAYS:
+        lengths[-1] += hidden
+    return lengths
+
+
+def _hidden_days(streak):
+    """Days of the current run older than the history (current counts them)."""
+    runs = _runs(streak.history, streak.interval_days)
+    if not runs or runs[0][1] + streak.interval_days < HISTORY_DAYS:
+        return 0
+    return max(streak.current - runs[0][0], 0)
+
+
+def record_activity(streak, day):
+    if streak.last_day is None:
+        streak.history, streak.current, streak.last_day = 1, 1, day
+        streak.active_days += 1
+    elif day > streak.last_day:
+        gap = (day - streak.last_day).days
+        streak.history = ((streak.history << gap) | 1) & HISTORY_MASK if gap < HISTORY_DAYS else 1
+        streak.current = streak.current + 1 if gap <= streak.interval_days else 1
+        streak.last_day = day
+        streak.active_days += 1
+    else:
+        # Same day, or a late/backfilled day: set its bit; a backfilled day
+        # can join runs, so the current run is measured again.
+        offset = (streak.last_day - day).days
+        if offset < HISTORY_DAYS and not streak.history >> offset & 1:
+            hidden = _hidden_days(streak)
+            streak.history |= 1 << offset
+            streak.active_days += 1
+            streak.current = _run_lengths(streak, hidden)[0]
+    streak.longest = max(streak.longest, streak.current)
+
+
+def retract_activity(streak, day):
+    """
+    Undo record_activity for `day` (e.g. a task toggled back to incomplete).
+    current and longest are measured again from the history. A record held
+    by a run that ended before the history is kept; a tie with one is not
+    known, so such a record can drop to the best run left in the history.
+    """
+    if streak.last_day is None:
+        return
+    offset = (streak.last_day - day).days
+    if offset < 0 or offset >= HISTORY_DAYS or not streak.history >> offset & 1:
+        return
+
+    hidden = _hidden_days(streak)
+    best_before = max(_run_lengths(streak, hidden))
+    streak.history &= ~(1 << offset)
+    streak.active_days = max(streak.active_days - 1, 0)
+    if not streak.history:
+        streak.current, streak.last_day = 0, None
+        if streak.longest <= best_before:
+            streak.longest = 0
+        return
+
+    # Keep bit 0 on last_day.
+    shift = (streak.history & -streak.history).bit_length() - 1
+    streak.history >>= shift
+    streak.last_day -= timedelta(days=shift)
+    lengths = _run_lengths(streak, hidden)
+    streak.current = lengths[0]
+    if streak.longest <= best_before:
+        streak.longest = max(lengths)
+
+
+def summarize(streak, today):
+    """Streak figures as of `today`; stale streaks read as broken."""
+    current = streak.current
+    history = 0
+    if streak.last_day is not None:
+        idle = (today - streak.last_day).days
+        if idle > streak.interval_days:
+            current = 0
+        history = streak.history << idle if 0 <= idle < HISTORY_DAYS else 0
+
+    return {
+        "current": current,
+        "longest": streak.longest,
+        "lastDay": streak.last_day,
+        "activeDays": streak.active_days,
+        "rate7": _rate(history, 7, streak.interval_days),
+        "rate30": _rate(history, 30, streak.interval_days),
+    }
+
+
+def _rate(history, days, interval):
+    """Share of the activity expected over the last `days` days: one active
+    day per `interval` days is a full rate."""
+    active = bin(history & ((1 << days) - 1)).count("1")
+    return min(active / math.ceil(days / interval), 1.0)
+
+
+def _locked_streak(user, **item):
+    streak, _ = Streak.objects.select_for_update().get_or_create(user=user, **item)
+    return streak
+
+
+def on_task_toggled(task, user, day=None):
+    """
+    Record a recurring task's completion on `day` (default: today), or take
+    back the completion of `day` when the task was reopened. Reopening
+    without a known completion day leaves the streak alone.
+    """
+    if task.time_type != "RECURRING":
+        return
+    if task.completed:
+        day = day or local_day(user)
+    elif day is None:
+        return
+    with transaction.atomic(using=current_alias()):
+        streak = _locked_streak(user, task=task)
+        streak.interval_days = task_interval(task)
+        if task.completed:
+            record_activity(streak, day)
+        else:
+            retract_activity(streak, day)
+        streak.save()
+
+
+def on_entry_pushed(entry, user):
+    with transaction.atomic(using=current_alias()):
+        streak = _locked_streak(user, tracker_id=entry.tracker_id)
+        record_activity(streak, local_day(user, entry.timestamp))
+        streak.save()
+
+
+def rebuild_tracker_streaks(tracker_ids, user):
+    """Recompute tracker streaks from their full entry history (bulk imports)."""
+    zone = user_zone(user)
+    for tracker_id in tracker_ids:
+        days = sorted({
+            ts.astimezone(zone).date()
+            for ts in TrackerEntry.objects.filter(tracker_id=tracker_id)
+            .values_list("timestamp", flat=True)
+            .iterator(chunk_size=10_000)
+        })
+        streak = Streak(user=user, tracker_id=tracker_id)
+        for day in days:
+            record_activity(streak, day)
+        streak.active_days = len(days)
+        Streak.objects.update_or_create(
+            tracker_id=tracker_id,
+            defaults={
+                "user": user,
+                "current": streak.current,
+                "longest": streak.longest,
+                "last_day": streak.last_day,
+                "history": streak.history,
+                "active_days": streak.active_days,
+            },
+        )
@@ -0,0 +1,196 @@
+from datetime import date, datetime, time, timedelta, timezone
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase
+
+from accounts.models import User
+from branches.models import Branch
+from core.sharding import using_owner
+from tasks.models import Task
+from trackers.models import Tracker, TrackerEntry
+
+from .models import Streak
+from .services import (
+    HISTORY_DAYS,
+    local_day,
+    rebuild_tracker_streaks,
+    record_activity,
+    retract_activity,
+    summarize,
+)
+
+TODAY = date(2026, 10, 19)
+
+
+def streak_of(*days_ago, interval=1):
+    streak = Streak(interval_days=interval)
+    for ago in sorted(days_ago, reverse=True):
+        record_activity(streak, TODAY - timedelta(days=ago))
+    return streak
+
+
+class RecordActivityTests(SimpleTestCase):
+    def test_consecutive_days_extend_the_run(self):
+        streak = streak_of(2, 1, 0)
+        self.assertEqual((streak.current, streak.longest, streak.active_days), (3, 3, 3))
+        self.assertEqual(streak.last_day, TODAY)
+        self.assertEqual(streak.history, 0b111)
+
+    def test_gap_longer_than_interval_starts_a_new_run(self):
+        streak = streak_of(5, 4, 3, 0)
+        self.assertEqual((streak.current, streak.longest), (1, 3))
+
+    def test_weekly_interval_tolerates_gaps(self):
+        streak = streak_of(14, 7, 0, interval=7)
+        self.assertEqual(streak.current, 3)
+
+    def test_same_day_is_counted_once(self):
+        streak = streak_of(0)
+        record_activity(streak, TODAY)
+        self.assertEqual((streak.current, streak.active_days), (1, 1))
+
+    def test_backfilled_day_joins_runs(self):
+        streak = streak_of(4, 3, 1, 0)
+        self.assertEqual(streak.current, 2)
+        record_activity(streak, TODAY - timedelta(days=2))
+        self.assertEqual((streak.current, streak.longest, streak.active_days), (5, 5, 5))
+        self.assertEqual(streak.last_day, TODAY)
+
+    def test_history_is_bounded(self):
+        streak = streak_of(*range(HISTORY_DAYS + 10))
+        self.assertEqual(streak.current, HISTORY_DAYS + 10)
+        self.assertEqual(streak.history, (1 << HISTORY_DAYS) - 1)
+
+
+class RetractActivityTests(SimpleTestCase):
+    def test_retracting_latest_day_shortens_the_run(self):
+        streak = streak_of(2, 1, 0)
+        retract_activity(streak, TODAY)
+        self.assertEqual((streak.current, streak.longest, streak.active_days), (2, 2, 2))
+        self.assertEqual(streak.last_day, TODAY - timedelta(days=1))
+
+    def test_retracting_a_middle_day_splits_the_run(self):
+        streak = streak_of(4, 3, 2, 1, 0)
+        retract_activity(streak, TODAY - timedelta(days=2))
+        self.assertEqual((streak.current, streak.longest, streak.active_days), (2, 2, 4))
+        self.assertEqual(streak.last_day, TODAY)
+
+    def test_retracting_a_lone_latest_day_restores_the_previous_run(self):
+        streak = streak_of(5, 4, 3, 0)
+        retract_activity(streak, TODAY)
+        self.assertEqual((streak.current, streak.longest), (3, 3))
+        self.assertEqual(streak.last_day, TODAY - timedelta(days=3))
+
+    def test_longest_survives_a_tie_with_an_earlier_run(self):
+        streak = streak_of(6, 5, 4, 2, 1, 0)
+        self.assertEqual((streak.current, streak.longest), (3, 3))
+        retract_activity(streak, TODAY)
+        self.assertEqual((streak.current, streak.longest), (2, 3))
+
+    def test_record_older_than_the_history_is_kept(self):
+        streak = streak_of(0)
+        streak.longest = 40
+        retract_activity(streak, TODAY)
+        self.assertEqual((streak.current, streak.longest, streak.last_day), (0, 40, None))
+
+    def test_days_before_the_history_stay_counted(self):
+        streak = streak_of(*range(HISTORY_DAYS + 10))
+        retract_activity(streak, TODAY - timedelta(days=5))
+        self.assertEqual((streak.current, streak.longest), (5, HISTORY_DAYS + 4))
+
+    def test_retracting_an_inactive_day_changes_nothing(self):
+        streak = streak_of(2, 0)
+        retract_activity(streak, TODAY - timedelta(days=1))
+        self.assertEqual((streak.current, streak.active_days, streak.history), (1, 2, 0b101))
+
+    def test_retracting_the_only_day_clears_the_streak(self):
+        streak = streak_of(0)
+        retract_activity(streak, TODAY)
+        self.assertEqual((streak.current, streak.longest, streak.last_day, streak.history), (0, 0, None, 0))
+
+
+class SummarizeTests(SimpleTestCase):
+    def test_rates_and_stale_streaks(self):
+        streak = streak_of(6, 4, 2, 0)
+        summary = summarize(streak, TODAY)
+        self.assertEqual(summary["current"], 1)
+        self.assertAlmostEqual(summary["rate7"], 4 / 7)
+        self.assertEqual(summarize(streak, TODAY + timedelta(days=2))["current"], 0)
+
+    def test_rates_expect_one_active_day_per_interval(self):
+        every_other = streak_of(*range(0, 30, 2), interval=2)
+        summary = summarize(every_other, TODAY)
+        self.assertEqual((summary["rate7"], summary["rate30"]), (1.0, 1.0))
+        weekly = streak_of(0, 7, 14, 21, interval=7)
+        summary = summarize(weekly, TODAY)
+        self.assertEqual(summary["rate7"], 1.0)
+        self.assertAlmostEqual(summary["rate30"], 4 / 5)
+
+
+class StreakEndpointTests(TestCase):
+    databases = "__all__"
+
+    def setUp(self):
+        self.user = User.objects.create_user("ada")
+        self.client.force_login(self.user)
+        with self.owner():
+            branch = Branch.objects.create(name="Health", owner=self.user)
+            self.daily = Task.objects.create(
+                title="Stretch", branch=branch, time_type="RECURRING", recurring_rule={"type": "daily"}
+            )
+            self.once = Task.objects.create(title="Sign up", branch=branch)
+            self.tracker = Tracker.objects.create(name="Water", branch=branch)
+
+    def owner(self):
+        return using_owner(self.user)
+
+    def streaks(self):
+        response = self.client.get("/api/streaks/")
+        self.assertEqual(response.status_code, 200)
+        return {(row["type"], row["id"]): row for row in response.json()}
+
+    def toggle(self, task):
+        self.assertEqual(self.client.patch(f"/api/tasks/{task.id}/toggle/").status_code, 200)
+
+    def test_recurring_task_completions_count_and_retract(self):
+        self.toggle(self.daily)
+        self.toggle(self.once)
+        streaks = self.streaks()
+        self.assertEqual(set(streaks), {("task", self.daily.id)})
+        self.assertEqual(streaks["task", self.daily.id]["current"], 1)
+
+        self.toggle(self.daily)
+        row = self.streaks()["task", self.daily.id]
+        self.assertEqual((row["current"], row["longest"], row["activeDays"]), (0, 0, 0))
+
+    def test_reopening_takes_back_the_completion_day(self):
+        yesterday = datetime.now(timezone.utc) - timedelta(days=1)
+        with mock.patch("tasks.services.timezone.now", return_value=yesterday):
+            self.toggle(self.daily)
+        row = self.streaks()["task", self.daily.id]
+        self.assertEqual((row["current"], row["lastDay"]), (1, local_day(self.user, yesterday).isoformat()))
+
+        self.toggle(self.daily)
+        row = self.streaks()["task", self.daily.id]
+        self.assertEqual((row["current"], row["longest"], row["activeDays"], row["lastDay"]), (0, 0, 0, None))
+
+    def test_pushes_and_rebuilds_follow_entry_days(self):
+        response = self.client.post(
+            f"/api/trackers/{self.tracker.id}/push/", {"value": 1}, content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.streaks()["tracker", self.tracker.id]["current"], 1)
+
+        today = local_day(self.user)
+        with self.owner():
+            TrackerEntry.objects.bulk_create(
+                TrackerEntry(
+                    tracker=self.tracker, value=1,
+                    timestamp=datetime.combine(today - timedelta(days=ago), time(12), tzinfo=timezone.utc),
+                )
+                for ago in (1, 2, 5, 6, 7, 8)
+            )
+            rebuild_tracker_streaks([self.tracker.id], self.user)
+        row = self.streaks()["tracker", self.tracker.id]
+        self.assertEqual((row["current"], row["longest"], row["activeDays"]), (3, 4, 7))
+        self.assertAlmostEqual(row["rate7"], 5 / 7)
@@ -0,0 +1,6 @@
+from django.urls import path
+from .views import streak_list
+
+urlpatterns = [
+    path("", streak_list),
+]
@@ -0,0 +1,23 @@
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
+
+from core.fieldsets import rows_response
+
+from .models import Streak
+from .services import local_day, summarize
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def streak_list(request):
+    today = local_day(request.user)
+    streaks = Streak.objects.filter(user=request.user)
+
+    return rows_response(request, [
+        {
+            "type": "task" if streak.task_id else "tracker",
+            "id": streak.task_id or streak.tracker_id,
+            **summarize(streak, today),
+        }
+        for streak in streaks
+    ])
@@ -1,9 +1,11 @@
 from django.contrib import admin
+
+from core.admin import AutocompleteFilter, LargeTableAdminMixin
 from .models import Task
 
 
 @admin.register(Task)
-class TaskAdmin(admin.ModelAdmin):
+class TaskAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     list_display = (
         "title",
         "branch",
@@ -11,5 +13,8 @@ class TaskAdmin(admin.ModelAdmin):
         "weight",
     )
 
-    list_filter = ("completed", "branch")
+    list_filter = ("completed", ("branch", AutocompleteFilter))
+    list_select_related = ("branch__owner",)
     search_fields = ("title",)
+    autocomplete_fields = ("branch",)
+    ordering = ("-id",)
@@ -0,0 +1,53 @@
+# Generated by Django 6.0 on 2026-10-19 14:40
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0002_rename_end_datetime_task_end_at_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='completed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='TaskCompletion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('branch_id', models.BigIntegerField()),
+                ('completed', models.BooleanField()),
+                ('weight', models.PositiveIntegerField()),
+                ('day', models.DateField()),
+                ('timestamp', models.DateTimeField(default=django.utils.timezone.now)),
+                ('task', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='completions', to='tasks.task')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='task_completions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['task', '-timestamp'], name='taskcompletion_task_ts_idx'), models.Index(fields=['user', 'timestamp'], name='taskcompletion_user_ts_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='TaskDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('branch_id', models.BigIntegerField()),
+                ('day', models.DateField()),
+                ('completions', models.IntegerField(default=0)),
+                ('weight', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='task_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'day'], name='taskrollup_user_day_idx')],
+                'constraints': [models.UniqueConstraint(fields=('user', 'branch_id', 'day'), name='taskrollup_user_branch_day_uniq')],
+            },
+        ),
+    ]
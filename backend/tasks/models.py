@@ -1,4 +1,7 @@
 from django.db import models
+from django.utils import timezone
+
+from accounts.models import User
 from branches.models import Branch
 
 
@@ -14,6 +17,8 @@ class Task(models.Model):
     branch = models.ForeignKey(Branch, on_delete=models.CASCADE, related_name="tasks")
 
     completed = models.BooleanField(default=False)
+    # When the task was last completed; cleared when it is reopened.
+    completed_at = models.DateTimeField(null=True, blank=True)
     weight = models.PositiveIntegerField(default=1)
 
     time_type = models.CharField(max_length=20, choices=TIME_TYPE_CHOICES, default="NONE")
@@ -28,3 +33,51 @@ class Task(models.Model):
 
     def __str__(self):
         return self.title
+
+
+class TaskCompletion(models.Model):
+    """
+    Append-only log of task toggles. A completion adds one to its day's
+    rollup; a reopen (completed=False) takes back the completion it undoes,
+    with that completion's day and weight. Branch ids are plain columns, as
+    on XpEvent, so history outlives pulled branches.
+    """
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="task_completions")
+    task = models.ForeignKey(Task, on_delete=models.SET_NULL, null=True, blank=True, related_name="completions")
+    branch_id = models.BigIntegerField()
+    completed = models.BooleanField()
+    weight = models.PositiveIntegerField()
+    # Local day (user's timezone) whose rollup this event changed.
+    day = models.DateField()
+    timestamp = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["task", "-timestamp"], name="taskcompletion_task_ts_idx"),
+            models.Index(fields=["user", "timestamp"], name="taskcompletion_user_ts_idx"),
+        ]
+
+    def __str__(self):
+        return f"{'Completed' if self.completed else 'Reopened'} task {self.task_id} @ {self.timestamp}"
+
+
+class TaskDailyRollup(models.Model):
+    """Net completions and completed weight per user, branch and local day."""
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="task_rollups")
+    branch_id = models.BigIntegerField()
+    day = models.DateField()
+    completions = models.IntegerField(default=0)
+    weight = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "branch_id", "day"], name="taskrollup_user_branch_day_uniq"),
+        ]
+        indexes = [
+            models.Index(fields=["user", "day"], name="taskrollup_user_day_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id}/{self.branch_id} @ {self.day}: {self.completions}"
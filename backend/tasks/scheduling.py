@@ -0,0 +1,210 @@
+"""
+Conflict detection and free-slot search over a user's timed tasks.
+
+A task occupies time as follows:
+
+    SCHEDULED  [scheduled_at, scheduled_at + SCHEDULE_POINT_MINUTES)
+    RANGE      [start_at, end_at)
+    RECURRING  the RANGE (or SCHEDULED) time of its first occurrence, repeated
+               per recurring_rule: every `days` days, every 7 for "weekly",
+               Saturday and Sunday (user's timezone) for "weekend"
+
+Untimed tasks and recurring tasks without an anchor time never block time.
+The occurrences inside a window are kept in a static interval tree, cached
+per user and hour-aligned window until one of the user's tasks changes;
+requests for windows inside it are served from a trimmed copy.
+"""
+from bisect import bisect_left
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+import heapq
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+
+from core import metrics
+from streaks.services import WEEKLY_RULES, user_zone
+
+from .models import Task
+
+TIMED_TYPES = ("SCHEDULED", "RANGE", "RECURRING")
+# Cached trees cover whole hours, so windows starting "now" share entries.
+CACHE_ALIGN = timedelta(hours=1)
+SATURDAY, SUNDAY = 5, 6
+
+
+@dataclass(frozen=True, order=True)
+class Interval:
+    start: datetime
+    end: datetime
+    task_id: int
+
+
+class IntervalTree:
+    """
+    Static interval tree. Intervals are sorted by start; the implicit balanced
+    tree over that array stores, per node, the largest end in its subtree, so
+    an overlap query visits O(log n + k) nodes.
+    """
+
+    def __init__(self, intervals):
+        self.intervals = sorted(intervals)
+        self.starts = [interval.start for interval in self.intervals]
+        self._max_end = [None] * len(self.intervals)
+        self._build(0, len(self.intervals))
+
+    def __len__(self):
+        return len(self.intervals)
+
+    def _build(self, lo, hi):
+        if lo >= hi:
+            return None
+        mid = (lo + hi) // 2
+        ends = [self.intervals[mid].end, self._build(lo, mid), self._build(mid + 1, hi)]
+        self._max_end[mid] = max(end for end in ends if end is not None)
+        return self._max_end[mid]
+
+    def overlapping(self, start, end):
+        """Intervals intersecting [start, end), ordered by start."""
+        found = []
+        self._collect(0, len(self.intervals), start, bisect_left(self.starts, end), found)
+        return found
+
+    def _collect(self, lo, hi, start, limit, found):
+        if lo >= hi or lo >= limit:
+            return
+        mid = (lo + hi) // 2
+        if self._max_end[mid] <= start:
+            return
+        self._collect(lo, mid, start, limit, found)
+        if mid < limit and self.intervals[mid].end > start:
+            found.append(self.intervals[mid])
+        self._collect(mid + 1, hi, start, limit, found)
+
+
+def _base_interval(task):
+    if task.start_at and task.end_at and task.end_at > task.start_at:
+        return task.start_at, task.end_at
+    if task.scheduled_at:
+        return task.scheduled_at, task.scheduled_at + timedelta(minutes=settings.SCHEDULE_POINT_MINUTES)
+    return None
+
+
+def _rule(task):
+    rule = task.recurring_rule if isinstance(task.recurring_rule, dict) else {}
+    if rule.get("type") == "weekend":
+        return "weekend", 7
+    if rule.get("type") in WEEKLY_RULES:
+        return "step", 7
+    return "step", max(int(rule.get("days") or 1), 1)
+
+
+def _recurrences(task, start, end, window_start, zone):
+    kind, period = _rule(task)
+    length = end - start
+    # Jump whole periods to the window instead of walking from the anchor.
+    # Steps are taken in local time so occurrences keep their wall-clock time.
+    skipped = max((window_start - end) // timedelta(days=period), 0)
+    day = start.astimezone(zone) + timedelta(days=period * skipped)
+    while True:
+        if kind == "step" or day.weekday() in (SATURDAY, SUNDAY):
+            yield day, day + length
+        day += timedelta(days=1 if kind == "weekend" else period)
+
+
+def task_intervals(task, window_start, window_end, zone):
+    """Occurrences of `task` intersecting [window_start, window_end)."""
+    base = _base_interval(task)
+    if base is None:
+        return
+    if task.time_type != "RECURRING":
+        if base[0] < window_end and base[1] > window_start:
+            yield Interval(base[0], base[1], task.id)
+        return
+    for start, end in _recurrences(task, *base, window_start, zone):
+        if start >= window_end:
+            return
+        if end > window_start:
+            yield Interval(start, end, task.id)
+
+
+def build_tree(user, window_start, window_end):
+    zone = user_zone(user)
+    tasks = Task.objects.filter(
+        branch__owner=user, completed=False, time_type__in=TIMED_TYPES
+    ).only("id", "time_type", "scheduled_at", "start_at", "end_at", "recurring_rule")
+
+    intervals = []
+    for task in tasks:
+        try:
+            intervals.extend(task_intervals(task, window_start, window_end, zone))
+        except (TypeError, ValueError):
+            continue  # malformed recurring_rule
+    return IntervalTree(intervals)
+
+
+def _version_key(user_id):
+    return f"schedule:version:{user_id}"
+
+
+def invalidate(user_id):
+    cache.delete(_version_key(user_id))
+
+
+def _align(window_start, window_end):
+    """The smallest CACHE_ALIGN-aligned window holding the given one."""
+    epoch = datetime(2000, 1, 1, tzinfo=timezone.utc)
+    start = window_start - (window_start - epoch) % CACHE_ALIGN
+    end = window_end + (epoch - window_end) % CACHE_ALIGN
+    return start, end
+
+
+def get_tree(user, window_start, window_end):
+    version = cache.get(_version_key(user.pk))
+    if version is None:
+        version = uuid.uuid4().hex
+        cache.set(_version_key(user.pk), version, None)
+    start, end = _align(window_start, window_end)
+    key = f"schedule:tree:{user.pk}:{version}:{start.isoformat()}:{end.isoformat()}"
+    tree = cache.get(key)
+    if tree is None:
+        metrics.cache_miss("schedule")
+        tree = build_tree(user, start, end)
+        cache.set(key, tree, settings.SCHEDULE_CACHE_TTL)
+    else:
+        metrics.cache_hit("schedule")
+    if (start, end) != (window_start, window_end):
+        tree = IntervalTree(tree.overlapping(window_start, window_end))
+    return tree
+
+
+def find_conflicts(tree):
+    """Pairs of overlapping intervals from different tasks (sweep over starts)."""
+    conflicts, active = [], []
+    for interval in tree.intervals:
+        while active and active[0][0] <= interval.start:
+            heapq.heappop(active)
+        conflicts.extend(
+            (other, interval) for _, other in active if other.task_id != interval.task_id
+        )
+        heapq.heappush(active, (interval.end, interval))
+    return conflicts
+
+
+def free_slots(tree, window_start, window_end, duration, count):
+    """
+    The first `count` gaps of at least `duration` in [window_start, window_end),
+    as (start, start + duration, gap_end) tuples.
+    """
+    slots = []
+    cursor = window_start
+    for interval in tree.overlapping(window_start, window_end):
+        if interval.start - cursor >= duration:
+            slots.append((cursor, cursor + duration, interval.start))
+            if len(slots) == count:
+                return slots
+        cursor = max(cursor, interval.end)
+    if window_end - cursor >= duration:
+        slots.append((cursor, cursor + duration, window_end))
+    return slots[:count]
@@ -21,6 +21,7 @@ class TaskSerializer(serializers.ModelSerializer):
             "branch",
             "branchId",
             "completed",
+            "completed_at",
             "weight",
             "time_type",
             "scheduled_at",
@@ -29,7 +30,7 @@ class TaskSerializer(serializers.ModelSerializer):
             "recurring_rule",
             "created_at",
         ]
-        read_only_fields = ["id", "completed", "created_at"]
+        read_only_fields = ["id", "completed", "completed_at", "created_at"]
 
     def validate(self, data):
         time_type = data.get("time_type", "NONE")
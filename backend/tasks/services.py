@@ -0,0 +1,161 @@
+"""
+Task completion history.
+
+toggle_completion flips a task and, in the same transaction, appends a
+TaskCompletion row and adjusts the TaskDailyRollup of the affected day, so
+completion charts read the small rollup table instead of the log.
+log_completions does the same for tasks flipped in bulk (history imports).
+Days are local to the owner's timezone.
+"""
+from datetime import time, timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum
+from django.db.models.functions import TruncWeek
+from django.utils import timezone
+
+from core.sharding import current_alias
+from streaks.services import local_day, on_task_toggled, user_zone
+
+from .models import Task, TaskCompletion, TaskDailyRollup
+
+RESOLUTIONS = ("day", "week")
+
+
+def _bump_rollup(user, branch_id, day, completions, weight):
+    rows = TaskDailyRollup.objects.filter(user=user, branch_id=branch_id, day=day)
+    changes = {"completions": F("completions") + completions, "weight": F("weight") + weight}
+    if rows.update(**changes):
+        return
+    try:
+        with transaction.atomic(using=current_alias()):
+            TaskDailyRollup.objects.create(
+                user=user, branch_id=branch_id, day=day, completions=completions, weight=weight
+            )
+    except IntegrityError:
+        # Another toggle created the day's row first.
+        rows.update(**changes)
+
+
+def toggle_completion(task_id, user):
+    """
+    Flip one of `user`'s tasks and record the change. Reopening takes back
+    the last logged completion (tasks completed before the log existed have
+    none). Raises Task.DoesNotExist.
+    """
+    now = timezone.now()
+    with transaction.atomic(using=current_alias()):
+        task = Task.objects.select_for_update(of=("self",)).get(id=task_id, branch__owner=user)
+        if task.completed:
+            last = (
+                TaskCompletion.objects.filter(task=task, completed=True)
+                .order_by("-timestamp")
+                .values_list("day", "weight")
+                .first()
+            )
+            completed_at = task.completed_at
+            task.completed, task.completed_at = False, None
+        else:
+            last = None
+            task.completed, task.completed_at = True, now
+        task.save()
+
+        # The streak takes back the day of the completion being undone.
+        if task.completed:
+            day, weight, sign = local_day(user, now), task.weight, 1
+            streak_day = day
+        elif last is not None:
+            (day, weight), sign = last, -1
+            streak_day = day
+        else:
+            day, weight, sign = local_day(user, now), 0, 0
+            streak_day = local_day(user, completed_at) if completed_at else None
+        TaskCompletion.objects.create(
+            user=user, task=task, branch_id=task.branch_id, completed=task.completed,
+            weight=weight, day=day, timestamp=now,
+        )
+        if sign:
+            _bump_rollup(user, task.branch_id, day, sign, sign * weight)
+        on_task_toggled(task, user, streak_day)
+    return task
+
+
+def log_completions(user, tasks, now=None):
+    """
+    Record completion changes for tasks flipped in bulk, as toggle_completion
+    does for one: sets completed_at on the in-memory `tasks` (the caller
+    saves them), appends the TaskCompletion rows and adjusts the rollups.
+    `tasks` maps each task to its completed state before the change; tasks
+    whose state did not change are skipped. Runs inside the caller's
+    transaction.
+    """
+    now = now or timezone.now()
+    today = local_day(user, now)
+    flipped = [task for task, was_completed in tasks.items() if task.completed != was_completed]
+    reopened = [task.id for task in flipped if not task.completed]
+    last = {}
+    if reopened:
+        rows = (
+            TaskCompletion.objects.filter(task_id__in=reopened, completed=True)
+            .order_by("task_id", "-timestamp")
+            .values_list("task_id", "day", "weight")
+        )
+        for task_id, day, weight in rows:
+            last.setdefault(task_id, (day, weight))
+
+    log, rollups = [], {}
+    for task in flipped:
+        if task.completed:
+            task.completed_at = now
+            (day, weight), sign = (today, task.weight), 1
+        else:
+            task.completed_at = None
+            if task.id in last:
+                (day, weight), sign = last[task.id], -1
+            else:
+                (day, weight), sign = (today, 0), 0
+        log.append(TaskCompletion(
+            user=user, task=task, branch_id=task.branch_id, completed=task.completed,
+            weight=weight, day=day, timestamp=now,
+        ))
+        if sign:
+            completions, total = rollups.get((task.branch_id, day), (0, 0))
+            rollups[task.branch_id, day] = (completions + sign, total + sign * weight)
+    TaskCompletion.objects.bulk_create(log)
+    for (branch_id, day), (completions, weight) in rollups.items():
+        _bump_rollup(user, branch_id, day, completions, weight)
+
+
+def local_days(user, start=None, end=None):
+    """
+    The local days covering the instants [start, end), as (first day,
+    exclusive last day): a day counts when it starts before `end`, matching
+    the ?from=&to= ranges of the other endpoints (core.timerange).
+    """
+    first = local_day(user, start) if start is not None else None
+    last = None
+    if end is not None:
+        last = local_day(user, end)
+        if end.astimezone(user_zone(user)).time() != time.min:
+            last += timedelta(days=1)
+    return first, last
+
+
+def completion_history(user, start=None, end=None, resolution="day", branch_id=None):
+    """
+    Net completions and completed weight per day (or ISO week, keyed by its
+    Monday) for the local days from `start` up to, not including, `end`.
+    """
+    rollups = TaskDailyRollup.objects.filter(user=user).exclude(completions=0, weight=0)
+    if start is not None:
+        rollups = rollups.filter(day__gte=start)
+    if end is not None:
+        rollups = rollups.filter(day__lt=end)
+    if branch_id is not None:
+        rollups = rollups.filter(branch_id=branch_id)
+    period = TruncWeek("day") if resolution == "week" else F("day")
+    return list(
+        rollups.values(period=period)
+        .annotate(completions=Sum("completions"), weight=Sum("weight"))
+        .order_by("period")
+    )
@@ -0,0 +1,42 @@
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from branches.models import Branch
+
+from . import scheduling
+from .models import Task
+
+# Fields build_tree reads; saves that change none of them keep the cache.
+SCHEDULE_FIELDS = ("branch_id", "completed", "time_type", "scheduled_at", "start_at", "end_at", "recurring_rule")
+
+
+def _schedule_state(task):
+    return tuple(getattr(task, name) for name in SCHEDULE_FIELDS)
+
+
+@receiver(post_init, sender=Task)
+def remember_schedule_state(sender, instance, **kwargs):
+    if not instance.pk or set(SCHEDULE_FIELDS) & instance.get_deferred_fields():
+        # Reading deferred fields here would cost a query per instance.
+        instance._schedule_state = None
+    else:
+        instance._schedule_state = _schedule_state(instance)
+
+
+@receiver(post_save, sender=Task)
+@receiver(post_delete, sender=Task)
+def drop_cached_schedule(sender, instance, origin=None, created=False, **kwargs):
+    if kwargs["signal"] is post_save:
+        state = _schedule_state(instance)
+        unchanged = not created and instance._schedule_state == state
+        instance._schedule_state = state
+        if unchanged:
+            return
+    if isinstance(origin, Branch):
+        owner_id = origin.owner_id
+    elif Task.branch.is_cached(instance):
+        owner_id = instance.branch.owner_id
+    else:
+        owner_id = Branch.objects.filter(pk=instance.branch_id).values_list("owner_id", flat=True).first()
+    if owner_id is not None:
+        scheduling.invalidate(owner_id)
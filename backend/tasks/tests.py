@@ -1,3 +1,133 @@
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+
+from django.core.cache import cache
 from django.test import TestCase
 
-# Create your tests here.
+from accounts.models import User
+from branches.importer import HistoryImporter
+from branches.models import Branch
+from core.sharding import using_owner
+
+from . import scheduling
+from .models import Task, TaskCompletion, TaskDailyRollup
+
+
+class CompletionHistoryTests(TestCase):
+    databases = "__all__"
+
+    def setUp(self):
+        self.user = User.objects.create_user("ada", password="pw")
+        self.client.force_login(self.user)
+        with self.owner():
+            self.branch = Branch.objects.create(name="feature", owner=self.user)
+            self.task = Task.objects.create(title="write", branch=self.branch, weight=3)
+
+    def owner(self):
+        return using_owner(self.user)
+
+    def toggle(self):
+        response = self.client.patch(f"/api/tasks/{self.task.id}/toggle/")
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def history(self, **params):
+        response = self.client.get("/api/tasks/completions/", params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_toggles_are_logged_and_rolled_up(self):
+        self.toggle()
+        with self.owner():
+            task = Task.objects.get(id=self.task.id)
+            self.assertTrue(task.completed)
+            self.assertIsNotNone(task.completed_at)
+        [row] = self.history()
+        self.assertEqual((row["completions"], row["weight"]), (1, 3))
+
+        self.toggle()
+        self.assertEqual(self.history(), [])
+        with self.owner():
+            self.assertEqual(
+                list(TaskCompletion.objects.order_by("id").values_list("completed", "weight")),
+                [(True, 3), (False, 3)],
+            )
+            self.assertEqual(TaskDailyRollup.objects.get().completions, 0)
+
+    def test_reopening_an_unlogged_completion_changes_no_rollup(self):
+        with self.owner():
+            Task.objects.filter(id=self.task.id).update(completed=True)
+        self.toggle()
+        self.assertEqual(self.history(), [])
+        with self.owner():
+            self.assertFalse(TaskDailyRollup.objects.exists())
+
+    def test_to_is_exclusive_like_other_ranges(self):
+        self.toggle()
+        today = datetime.now(timezone.utc).date()
+        tomorrow = today + timedelta(days=1)
+        self.assertEqual(self.history(to=today.isoformat()), [])
+        self.assertEqual(len(self.history(**{"from": today.isoformat(), "to": tomorrow.isoformat()})), 1)
+        noon = datetime.combine(today, datetime.min.time(), tzinfo=timezone.utc) + timedelta(hours=12)
+        # A day that starts before `to` is included.
+        self.assertEqual(len(self.history(to=noon.isoformat())), 1)
+
+    def test_weekly_resolution_and_validation(self):
+        self.toggle()
+        [row] = self.history(resolution="week")
+        self.assertEqual(row["completions"], 1)
+        response = self.client.get("/api/tasks/completions/", {"resolution": "month"})
+        self.assertEqual(response.status_code, 400)
+
+
+class ScheduleTests(TestCase):
+    databases = "__all__"
+    start = datetime(2026, 3, 2, 9, 0, 0, 123456, tzinfo=timezone.utc)
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user("ada", password="pw")
+        self.client.force_login(self.user)
+        with using_owner(self.user):
+            self.branch = Branch.objects.create(name="feature", owner=self.user)
+            self.meeting = self.add("meeting", self.start + timedelta(hours=1), self.start + timedelta(hours=3))
+            self.review = self.add("review", self.start + timedelta(hours=2), self.start + timedelta(hours=4))
+
+    def add(self, title, start_at, end_at):
+        return Task.objects.create(
+            title=title, branch=self.branch, time_type="RANGE", start_at=start_at, end_at=end_at
+        )
+
+    def tree(self, start, end):
+        with using_owner(self.user):
+            return scheduling.get_tree(self.user, start, end)
+
+    def test_conflicts_and_free_slots(self):
+        window = {"from": self.start.isoformat(), "to": (self.start + timedelta(hours=6)).isoformat()}
+        [conflict] = self.client.get("/api/tasks/schedule/conflicts/", window).json()
+        self.assertEqual(sorted(item["task"] for item in conflict["tasks"]), [self.meeting.id, self.review.id])
+
+        slots = self.client.get("/api/tasks/schedule/free/", {**window, "duration": 60, "count": 5}).json()
+        self.assertEqual(len(slots), 2)
+        self.assertEqual(slots[1]["freeUntil"], window["to"].replace("+00:00", "Z"))
+
+    def test_windows_in_the_same_hours_share_a_cached_tree(self):
+        with mock.patch.object(scheduling, "build_tree", wraps=scheduling.build_tree) as build:
+            first = self.tree(self.start, self.start + timedelta(days=7))
+            later = self.start + timedelta(minutes=20)
+            second = self.tree(later, later + timedelta(days=7))
+        self.assertEqual(build.call_count, 1)
+        self.assertEqual(len(first), len(second), 2)
+        # Trimmed to the requested window.
+        self.assertEqual(len(self.tree(self.start + timedelta(hours=3, minutes=30), self.start + timedelta(days=1))), 1)
+
+    def test_task_changes_and_imports_drop_cached_trees(self):
+        end = self.start + timedelta(days=1)
+        self.assertEqual(len(self.tree(self.start, end)), 2)
+        with using_owner(self.user):
+            self.review.delete()
+        self.assertEqual(len(self.tree(self.start, end)), 1)
+
+        with using_owner(self.user):
+            HistoryImporter(self.branch).run([{"type": "task", "name": "meeting", "completed": "true"}])
+        self.assertEqual(len(self.tree(self.start, end)), 0)
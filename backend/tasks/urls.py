@@ -4,10 +4,16 @@ from .views import (
     toggle_task,
     reschedule_task,
     remove_task_date,
+    schedule_conflicts,
+    schedule_free_slots,
+    completion_history,
 )
 
 urlpatterns = [
     path("", TaskListCreateView.as_view()),
+    path("schedule/conflicts/", schedule_conflicts),
+    path("schedule/free/", schedule_free_slots),
+    path("completions/", completion_history),
     path("<int:task_id>/toggle/", toggle_task),
     path("<int:task_id>/reschedule/", reschedule_task),
     path("<int:task_id>/remove-date/", remove_task_date),
@@ -1,3 +1,5 @@
+import logging
+
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
@@ -5,53 +7,51 @@ from rest_framework import status
 
 from .models import Task
 from .serializers import TaskSerializer
+from . import services
 from branches.models import Branch
-from rest_framework.decorators import api_view, permission_classes
+from core.fieldsets import list_response
+from core.idempotency import idempotent
+from core.throttling import ANALYTICS_THROTTLES, keep_stale
+from rest_framework.decorators import api_view, permission_classes, throttle_classes
 
+logger = logging.getLogger(__name__)
 
 class TaskListCreateView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
         branch_id = request.query_params.get("branch")
-        print("Branch ID from query params:", branch_id)
+        logger.debug("Listing tasks", extra={"branch_id": branch_id})
         tasks = Task.objects.filter(branch__owner=request.user)
 
         if branch_id:
             tasks = tasks.filter(branch_id=branch_id)
         # print("Filtered Tasks:", tasks)
-        serializer = TaskSerializer(tasks, many=True)
-        return Response(serializer.data)
+        return list_response(request, tasks, TaskSerializer)
 
     def post(self, request):
         serializer = TaskSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        print(request.data)
-        print(serializer.validated_data)
         branch = Branch.objects.get(
             id=request.data.get("branchId"),
             owner=request.user,
         )
 
         task = serializer.save(branch=branch)
-        print(task)
+        logger.debug("Task created", extra={"task_id": task.id, "branch_id": branch.id})
         return Response(TaskSerializer(task).data, status=status.HTTP_201_CREATED)
 
 
 @api_view(["PATCH"])
 @permission_classes([IsAuthenticated])
+@idempotent
 def toggle_task(request, task_id):
-    task = Task.objects.get(
-        id=task_id,
-        branch__owner=request.user,
-    )
-
-    task.completed = not task.completed
-    task.save()
+    task = services.toggle_completion(task_id, request.user)
 
     return Response({
         "id": task.id,
         "completed": task.completed,
+        "completed_at": task.completed_at,
     })
 
 @api_view(["PATCH"])
@@ -90,3 +90,104 @@ def remove_task_date(request, task_id):
     task.save()
 
     return Response(TaskSerializer(task).data)
+
+
+from rest_framework.fields import DateTimeField
+from datetime import timedelta
+from django.utils.timezone import now
+
+from core.timerange import parse_time_range
+from . import scheduling
+
+SCHEDULE_DEFAULT_DAYS = 7
+SCHEDULE_MAX_DAYS = 92
+DATETIME = DateTimeField()
+
+
+def _schedule_window(request):
+    start, end = parse_time_range(request)
+    start = start or now()
+    end = end or start + timedelta(days=SCHEDULE_DEFAULT_DAYS)
+    if end <= start:
+        raise ValueError("'to' must be after 'from'")
+    if end - start > timedelta(days=SCHEDULE_MAX_DAYS):
+        raise ValueError(f"window is limited to {SCHEDULE_MAX_DAYS} days")
+    return start, end
+
+
+def _interval_data(interval):
+    return {
+        "task": interval.task_id,
+        "start": DATETIME.to_representation(interval.start),
+        "end": DATETIME.to_representation(interval.end),
+    }
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def schedule_conflicts(request):
+    try:
+        start, end = _schedule_window(request)
+    except ValueError as exc:
+        return Response({"error": str(exc)}, status=400)
+
+    tree = scheduling.get_tree(request.user, start, end)
+    return Response([
+        {
+            "start": DATETIME.to_representation(max(a.start, b.start)),
+            "end": DATETIME.to_representation(min(a.end, b.end)),
+            "tasks": [_interval_data(a), _interval_data(b)],
+        }
+        for a, b in scheduling.find_conflicts(tree)
+    ])
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def schedule_free_slots(request):
+    try:
+        start, end = _schedule_window(request)
+        duration = int(request.query_params.get("duration", 60))
+        count = int(request.query_params.get("count", 5))
+    except ValueError as exc:
+        return Response({"error": str(exc)}, status=400)
+    if not 1 <= duration <= 24 * 60 or not 1 <= count <= 100:
+        return Response({"error": "duration must be 1-1440 minutes and count 1-100"}, status=400)
+
+    tree = scheduling.get_tree(request.user, start, end)
+    slots = scheduling.free_slots(tree, start, end, timedelta(minutes=duration), count)
+    return Response([
+        {
+            "start": DATETIME.to_representation(slot_start),
+            "end": DATETIME.to_representation(slot_end),
+            "freeUntil": DATETIME.to_representation(free_until),
+        }
+        for slot_start, slot_end, free_until in slots
+    ])
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+@throttle_classes(ANALYTICS_THROTTLES)
+@keep_stale
+def completion_history(request):
+    try:
+        start, end = parse_time_range(request)
+        branch_id = request.query_params.get("branch")
+        branch_id = int(branch_id) if branch_id else None
+    except ValueError as exc:
+        return Response({"error": str(exc)}, status=400)
+
+    resolution = request.query_params.get("resolution", "day")
+    if resolution not in services.RESOLUTIONS:
+        return Response({"error": f"resolution must be one of {', '.join(services.RESOLUTIONS)}"}, status=400)
+
+    first, last = services.local_days(request.user, start, end)
+    rows = services.completion_history(
+        request.user,
+        start=first,
+        end=last,
+        resolution=resolution,
+        branch_id=branch_id,
+    )
+    return Response(rows)
@@ -1,5 +1,7 @@
 from django.contrib import admin
-from .models import Tracker, TrackerEntry
+
+from core.admin import AutocompleteFilter, LargeTableAdminMixin
+from .models import Tracker, TrackerAnomaly, TrackerEntry
 
 
 @admin.register(Tracker)
@@ -13,15 +15,39 @@ class TrackerAdmin(admin.ModelAdmin):
     )
 
     list_filter = ("is_active",)
+    list_select_related = ("branch__owner",)
     search_fields = ("name",)
+    autocomplete_fields = ("branch",)
+    # Autocomplete lookups page through this admin too.
+    ordering = ("-id",)
 
 
 @admin.register(TrackerEntry)
-class TrackerEntryAdmin(admin.ModelAdmin):
+class TrackerEntryAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     list_display = (
         "tracker",
         "value",
         "timestamp",
     )
 
-    list_filter = ("tracker",)
+    list_filter = (("tracker", AutocompleteFilter),)
+    list_select_related = ("tracker",)
+    autocomplete_fields = ("tracker",)
+    # Primary-key order keeps keyset paging on (id, timestamp) on partitions.
+    ordering = ("-id",)
+
+
+@admin.register(TrackerAnomaly)
+class TrackerAnomalyAdmin(admin.ModelAdmin):
+    list_display = (
+        "tracker",
+        "resolution",
+        "timestamp",
+        "value",
+        "expected",
+        "score",
+    )
+
+    list_filter = ("resolution",)
+    list_select_related = ("tracker",)
+    raw_id_fields = ("tracker",)
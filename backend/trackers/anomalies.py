@@ -0,0 +1,204 @@
+"""
+Anomaly detection over tracker series.
+
+Raw entries are scored against an exponentially weighted mean and variance
+(EWMA, smoothing ANOMALY_ALPHA) kept on the Tracker row. push_value advances
+that state inside its own UPDATE, so scoring a push costs no extra query; an
+entry is flagged when |value - mean| / std before it reaches ANOMALY_Z, once
+ANOMALY_MIN_POINTS values have been seen.
+
+Daily totals (raw entries plus rollups) are scored with a rolling z-score
+over the previous ANOMALY_WINDOW_DAYS observed days.
+
+Batch rescoring (score_anomalies, bulk imports) streams entries in chunks and
+runs the same EWMA recurrence vectorized with NumPy, carrying the state
+between chunks, so memory stays bounded by the chunk size.
+"""
+from datetime import datetime, time, timezone
+
+import numpy as np
+from django.conf import settings
+from django.db.models import Case, F, FloatField, Value, When
+
+from .downsampling import CHUNK_SIZE, iter_series_chunks
+from .models import Tracker, TrackerAnomaly, TrackerEntry
+
+# Sub-block length for the vectorized recurrence; keeps (1 - alpha) ** -BLOCK
+# well inside float64 range for any alpha up to 0.9.
+BLOCK = 64
+MIN_VARIANCE = 1e-12
+
+
+def ewma_update(value):
+    """Field updates advancing a tracker's EWMA state by `value` (for .update())."""
+    alpha = settings.ANOMALY_ALPHA
+    value = Value(float(value), output_field=FloatField())
+    error = value - F("ewma_mean")
+    return {
+        "ewma_count": F("ewma_count") + 1,
+        "ewma_mean": Case(
+            When(ewma_count=0, then=value),
+            default=F("ewma_mean") + alpha * error,
+            output_field=FloatField(),
+        ),
+        "ewma_var": Case(
+            When(ewma_count=0, then=Value(0.0)),
+            default=(1 - alpha) * (F("ewma_var") + alpha * error * error),
+            output_field=FloatField(),
+        ),
+    }
+
+
+def state_before(count, mean, var, value):
+    """Invert one ewma_update step: the (count, mean, var) a push started from."""
+    if count <= 1:
+        return 0, 0.0, 0.0
+    alpha = settings.ANOMALY_ALPHA
+    prev_mean = (mean - alpha * value) / (1 - alpha)
+    prev_var = var / (1 - alpha) - alpha * (value - prev_mean) ** 2
+    return count - 1, prev_mean, max(prev_var, 0.0)
+
+
+def zscore(count, mean, var, value):
+    """z of `value` against a prior EWMA state, or None while warming up."""
+    if count < settings.ANOMALY_MIN_POINTS or var <= MIN_VARIANCE:
+        return None
+    return (value - mean) / np.sqrt(var)
+
+
+def flag_pushed(entry, count, mean, var):
+    """Record `entry` as an anomaly if it deviates from the state before it."""
+    count, mean, var = state_before(count, mean, var, entry.value)
+    score = zscore(count, mean, var, entry.value)
+    if score is None or abs(score) < settings.ANOMALY_Z:
+        return None
+    anomaly, _ = TrackerAnomaly.objects.get_or_create(
+        tracker_id=entry.tracker_id,
+        resolution="raw",
+        timestamp=entry.timestamp,
+        defaults={"value": entry.value, "expected": mean, "score": score},
+    )
+    return anomaly
+
+
+def _linear_recurrence(decay, start, inputs):
+    """s_k = decay * s_(k-1) + inputs_k for every k, vectorized in blocks."""
+    out = np.empty_like(inputs)
+    for offset in range(0, len(inputs), BLOCK):
+        block = inputs[offset:offset + BLOCK]
+        k = np.arange(1, len(block) + 1)
+        powers = decay ** k
+        out[offset:offset + len(block)] = powers * (start + np.cumsum(block / powers))
+        start = out[offset + len(block) - 1]
+    return out
+
+
+def ewma_scan(values, count=0, mean=0.0, var=0.0):
+    """
+    Run the EWMA over `values` from the given state. Returns the per-value
+    (count, mean, var) before each value, and the state after the last one.
+    """
+    alpha = settings.ANOMALY_ALPHA
+    values = np.asarray(values, dtype=np.float64)
+    n = len(values)
+    counts = count + np.arange(n)
+    if n == 0:
+        return counts, np.empty(0), np.empty(0), (count, mean, var)
+    if count == 0:
+        # The first value seeds the mean; the rest follow the recurrence.
+        rest = ewma_scan(values[1:], 1, values[0], 0.0)
+        return (
+            counts,
+            np.concatenate(([0.0], rest[1])),
+            np.concatenate(([0.0], rest[2])),
+            rest[3],
+        )
+
+    decay = 1 - alpha
+    means_after = _linear_recurrence(decay, mean, alpha * values)
+    means = np.concatenate(([mean], means_after[:-1]))
+    errors = values - means
+    vars_after = _linear_recurrence(decay, var, decay * alpha * errors * errors)
+    variances = np.concatenate(([var], vars_after[:-1]))
+    return counts, means, np.maximum(variances, 0.0), (count + n, means_after[-1], max(vars_after[-1], 0.0))
+
+
+def ewma_flags(values, count=0, mean=0.0, var=0.0):
+    """Vectorized flagging: (indices, expected, scores, final state)."""
+    counts, means, variances, state = ewma_scan(values, count, mean, var)
+    values = np.asarray(values, dtype=np.float64)
+    ready = (counts >= settings.ANOMALY_MIN_POINTS) & (variances > MIN_VARIANCE)
+    scores = np.zeros_like(values)
+    scores[ready] = (values[ready] - means[ready]) / np.sqrt(variances[ready])
+    flagged = np.flatnonzero(ready & (np.abs(scores) >= settings.ANOMALY_Z))
+    return flagged, means[flagged], scores[flagged], state
+
+
+def rolling_zscores(values, window):
+    """z of each value against the mean/std of the `window` values before it."""
+    values = np.asarray(values, dtype=np.float64)
+    n = len(values)
+    scores = np.full(n, np.nan)
+    means = np.full(n, np.nan)
+    if n <= window:
+        return means, scores
+    sums = np.concatenate(([0.0], np.cumsum(values)))
+    squares = np.concatenate(([0.0], np.cumsum(values * values)))
+    idx = np.arange(window, n)
+    mean = (sums[idx] - sums[idx - window]) / window
+    var = (squares[idx] - squares[idx - window]) / window - mean * mean
+    std = np.sqrt(np.maximum(var, 0.0))
+    ok = std > np.sqrt(MIN_VARIANCE)
+    means[idx] = mean
+    scores[idx[ok]] = (values[idx[ok]] - mean[ok]) / std[ok]
+    return means, scores
+
+
+def rescore_raw(tracker_id, chunk_size=CHUNK_SIZE):
+    """Rebuild a tracker's raw anomalies and EWMA state from its full history."""
+    TrackerAnomaly.objects.filter(tracker_id=tracker_id, resolution="raw").delete()
+    state = (0, 0.0, 0.0)
+    flagged_total = 0
+    entries = TrackerEntry.objects.filter(tracker_id=tracker_id)
+    for x, y in iter_series_chunks(entries, chunk_size):
+        flagged, expected, scores, state = ewma_flags(y, *state)
+        TrackerAnomaly.objects.bulk_create(
+            [
+                TrackerAnomaly(
+                    tracker_id=tracker_id,
+                    resolution="raw",
+                    timestamp=datetime.fromtimestamp(x[i], tz=timezone.utc),
+                    value=float(y[i]),
+                    expected=float(e),
+                    score=float(s),
+                )
+                for i, e, s in zip(flagged, expected, scores)
+            ],
+            ignore_conflicts=True,
+        )
+        flagged_total += len(flagged)
+    count, mean, var = state
+    Tracker.objects.filter(id=tracker_id).update(ewma_count=count, ewma_mean=mean, ewma_var=var)
+    return flagged_total
+
+
+def rescore_daily(tracker_id, daily_totals):
+    """Rebuild a tracker's daily anomalies from [{"day", "total"}] rows."""
+    TrackerAnomaly.objects.filter(tracker_id=tracker_id, resolution="daily").delete()
+    if not daily_totals:
+        return 0
+    totals = np.fromiter((row["total"] for row in daily_totals), dtype=np.float64, count=len(daily_totals))
+    means, scores = rolling_zscores(totals, settings.ANOMALY_WINDOW_DAYS)
+    flagged = np.flatnonzero(np.abs(np.nan_to_num(scores)) >= settings.ANOMALY_Z)
+    TrackerAnomaly.objects.bulk_create([
+        TrackerAnomaly(
+            tracker_id=tracker_id,
+            resolution="daily",
+            timestamp=datetime.combine(daily_totals[i]["day"], time.min, tzinfo=timezone.utc),
+            value=float(totals[i]),
+            expected=float(means[i]),
+            score=float(scores[i]),
+        )
+        for i in flagged
+    ])
+    return len(flagged)
@@ -0,0 +1,97 @@
+"""
+Server-side downsampling of tracker series for charts.
+
+Values are streamed from the database in fixed-size chunks into NumPy
+arrays, so the response size depends on the requested number of points
+rather than on the length of the tracker's history.
+"""
+from itertools import islice
+
+import numpy as np
+
+CHUNK_SIZE = 50_000
+
+
+def iter_series_chunks(queryset, chunk_size=CHUNK_SIZE):
+    """Yield (epoch_seconds, values) float64 array pairs ordered by timestamp."""
+    rows = queryset.order_by("timestamp").values_list("timestamp", "value").iterator(
+        chunk_size=chunk_size
+    )
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        x = np.fromiter((ts.timestamp() for ts, _ in chunk), dtype=np.float64, count=len(chunk))
+        y = np.fromiter((value for _, value in chunk), dtype=np.float64, count=len(chunk))
+        yield x, y
+
+
+def lttb(x, y, threshold):
+    """Largest-Triangle-Three-Buckets: return indices of the points to keep."""
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    every = (n - 2) / (threshold - 2)
+    keep = np.empty(threshold, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, n)
+
+        avg_x = x[end:next_end].mean() if next_end > end else x[-1]
+        avg_y = y[end:next_end].mean() if next_end > end else y[-1]
+
+        bx, by = x[start:end], y[start:end]
+        area = np.abs((x[a] - avg_x) * (by - y[a]) - (x[a] - bx) * (avg_y - y[a]))
+        a = start + int(area.argmax())
+        keep[i + 1] = a
+    return keep
+
+
+def lttb_series(queryset, threshold):
+    chunks = list(iter_series_chunks(queryset))
+    if not chunks:
+        return []
+    x = np.concatenate([c[0] for c in chunks])
+    y = np.concatenate([c[1] for c in chunks])
+    keep = lttb(x, y, threshold)
+    return [
+        {"t": int(t * 1000), "v": float(v)}
+        for t, v in zip(x[keep], y[keep])
+    ]
+
+
+def bucket_series(queryset, start, end, buckets):
+    """
+    Per-bucket min/max/avg/count over equal time buckets in [start, end).
+    Chunks are folded into fixed-size accumulators, so memory is O(buckets).
+    """
+    lo, hi = start.timestamp(), end.timestamp()
+    width = (hi - lo) / buckets if hi > lo else 1.0
+
+    mins = np.full(buckets, np.inf)
+    maxs = np.full(buckets, -np.inf)
+    sums = np.zeros(buckets)
+    counts = np.zeros(buckets, dtype=np.int64)
+
+    for x, y in iter_series_chunks(queryset):
+        idx = np.clip(((x - lo) / width).astype(np.int64), 0, buckets - 1)
+        np.minimum.at(mins, idx, y)
+        np.maximum.at(maxs, idx, y)
+        np.add.at(sums, idx, y)
+        np.add.at(counts, idx, 1)
+
+    filled = np.nonzero(counts)[0]
+    return [
+        {
+            "t": int((lo + i * width) * 1000),
+            "min": float(mins[i]),
+            "max": float(maxs[i]),
+            "avg": float(sums[i] / counts[i]),
+            "count": int(counts[i]),
+        }
+        for i in filled
+    ]
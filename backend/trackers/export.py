@@ -0,0 +1,172 @@
+"""
+Bulk export of tracker history.
+
+Entries are read in (timestamp, id) order through a server-side cursor and
+written batch by batch, so memory stays bounded by the batch size. Each
+batch ends with a resume cursor ("<timestamp>|<id>") that continues the
+export exactly after the last row written.
+"""
+import csv
+import io
+import zlib
+from datetime import timezone
+from itertools import islice
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+from .models import TrackerEntry
+from .services import filter_time_range
+
+COLUMNS = [
+    "entry_id",
+    "timestamp",
+    "value",
+    "tracker_id",
+    "tracker_name",
+    "target_type",
+    "target_value",
+    "branch_id",
+    "branch_name",
+    "owner_id",
+]
+FIELDS = [
+    "id",
+    "timestamp",
+    "value",
+    "tracker_id",
+    "tracker__name",
+    "tracker__target_type",
+    "tracker__target_value",
+    "tracker__branch_id",
+    "tracker__branch__name",
+    "tracker__branch__owner_id",
+]
+BATCH_SIZE = 50_000
+
+
+def encode_cursor(row):
+    return f"{row[1].isoformat()}|{row[0]}"
+
+
+def export_queryset(owner=None, start=None, end=None, cursor=None):
+    qs = filter_time_range(TrackerEntry.objects.all(), start, end)
+    if owner is not None:
+        qs = qs.filter(tracker__branch__owner=owner)
+    if cursor:
+        raw_ts, _, raw_id = cursor.rpartition("|")
+        ts = parse_datetime(raw_ts)
+        if ts is None or not raw_id.isdigit():
+            raise ValueError("invalid cursor")
+        qs = qs.filter(Q(timestamp__gt=ts) | Q(timestamp=ts, id__gt=int(raw_id)))
+    return qs.order_by("timestamp", "id").values_list(*FIELDS)
+
+
+def iter_batches(qs, batch_size=BATCH_SIZE):
+    rows = qs.iterator(chunk_size=batch_size)
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def _csv_chunk(batch, header=False):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(COLUMNS)
+    writer.writerows(
+        (row[0], row[1].isoformat(), *row[2:]) for row in batch
+    )
+    return buffer.getvalue().encode()
+
+
+def iter_csv_gzip(batches):
+    """Yield gzip-compressed CSV bytes, one compressed block per batch."""
+    compressor = zlib.compressobj(wbits=31)
+    header = True
+    for batch in batches:
+        yield compressor.compress(_csv_chunk(batch, header))
+        header = False
+    if header:
+        yield compressor.compress(_csv_chunk([], header=True))
+    yield compressor.flush()
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet  # noqa: F401
+    except ImportError as exc:
+        raise ImportError("Arrow/Parquet export requires the pyarrow package.") from exc
+    return pyarrow
+
+
+def arrow_schema(pa):
+    return pa.schema([
+        ("entry_id", pa.int64()),
+        ("timestamp", pa.timestamp("us", tz="UTC")),
+        ("value", pa.float64()),
+        ("tracker_id", pa.int64()),
+        ("tracker_name", pa.string()),
+        ("target_type", pa.string()),
+        ("target_value", pa.float64()),
+        ("branch_id", pa.int64()),
+        ("branch_name", pa.string()),
+        ("owner_id", pa.int64()),
+    ])
+
+
+def to_record_batch(pa, schema, batch):
+    columns = list(zip(*batch))
+    columns[1] = [ts.astimezone(timezone.utc) for ts in columns[1]]
+    return pa.RecordBatch.from_arrays(
+        [pa.array(col, type=field.type) for col, field in zip(columns, schema)],
+        schema=schema,
+    )
+
+
+def iter_arrow_stream(batches):
+    """Return an iterator over an Arrow IPC stream, flushed after every record batch."""
+    pa = _pyarrow()
+    return _arrow_stream(pa, batches)
+
+
+def _arrow_stream(pa, batches):
+    schema = arrow_schema(pa)
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(sink, schema) as writer:
+        for batch in batches:
+            writer.write_batch(to_record_batch(pa, schema, batch))
+            yield sink.getvalue()
+            sink.seek(0)
+            sink.truncate()
+    yield sink.getvalue()
+
+
+def write_export(batches, path, fmt, on_batch=None):
+    """Write batches to `path` as csv (gzip), arrow or parquet; returns rows written."""
+    total = 0
+
+    def counted():
+        nonlocal total
+        for batch in batches:
+            yield batch
+            total += len(batch)
+            if on_batch:
+                on_batch(batch, total)
+
+    if fmt == "parquet":
+        pa = _pyarrow()
+        schema = arrow_schema(pa)
+        with pa.parquet.ParquetWriter(path, schema, compression="zstd") as writer:
+            for batch in counted():
+                writer.write_batch(to_record_batch(pa, schema, batch))
+        return total
+
+    stream = iter_arrow_stream(counted()) if fmt == "arrow" else iter_csv_gzip(counted())
+    with open(path, "wb") as out:
+        for chunk in stream:
+            out.write(chunk)
+    return total
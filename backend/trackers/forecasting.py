@@ -0,0 +1,209 @@
+"""
+Time-to-target forecasts for a user's VALUE, SUM and THRESHOLD trackers.
+
+Each tracker's last FORECAST_WINDOW_DAYS days become one row of a matrix:
+daily totals (SUM, THRESHOLD; empty days count as 0) or the daily mean
+carried over empty days (VALUE), starting at the tracker's first entry in
+the window. One pass fits every row at once, with Holt's linear exponential
+smoothing ("holt") or a least-squares line ("linear"), giving a level and a
+daily trend. The forecast is rolled forward FORECAST_HORIZON_DAYS days to
+find the first day the target is met:
+
+    VALUE      the value reaches target_value (from above for DECREMENT
+               trackers, from below otherwise)
+    SUM        the trailing 7-day sum reaches target_value
+    THRESHOLD  running_total reaches target_value
+
+Results are cached per user under a key built from the trackers' entry
+counters (ewma_count moves with every stored entry), targets and the current
+day, so new entries or target edits are picked up without invalidation hooks.
+"""
+from datetime import datetime, time, timedelta
+import hashlib
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Avg, OuterRef, Subquery, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from core import metrics
+
+from .models import Tracker, TrackerEntry
+
+METHODS = ("holt", "linear")
+TARGET_TYPES = ("VALUE", "SUM", "THRESHOLD")
+# Same trailing window as get_tracker_current_value for SUM targets.
+SUM_DAYS = 7
+# Holt smoothing for level and trend.
+ALPHA = 0.5
+BETA = 0.2
+# Days with entries needed before a tracker gets a forecast.
+MIN_DAYS = 3
+
+STATE_FIELDS = (
+    "id", "name", "tracker_type", "target_type", "target_value",
+    "running_total", "is_active", "ewma_count",
+)
+
+
+def carry_forward(values, observed):
+    """Replace unobserved cells with the previous observed one in their row
+    (or the first observed one, before it)."""
+    columns = np.arange(values.shape[1])
+    last = np.maximum.accumulate(np.where(observed, columns, 0), axis=1)
+    last = np.maximum(last, observed.argmax(axis=1)[:, None])
+    return np.take_along_axis(values, last, axis=1)
+
+
+def holt(series, first):
+    """Holt smoothing over every row from its `first` day; (level, trend) after the last day."""
+    level = series[np.arange(len(series)), first]
+    trend = np.zeros(len(series))
+    for day in range(1, series.shape[1]):
+        started = day > first
+        previous = level
+        level = np.where(started, ALPHA * series[:, day] + (1 - ALPHA) * (previous + trend), level)
+        trend = np.where(started, BETA * (level - previous) + (1 - BETA) * trend, trend)
+    return level, trend
+
+
+def linear(series, first):
+    """Least-squares line through every row from its `first` day; (value on the last day, slope)."""
+    x = np.arange(series.shape[1], dtype=np.float64)
+    weights = (x >= first[:, None]).astype(np.float64)
+    count = weights.sum(axis=1)
+    x_mean = weights @ x / count
+    y_mean = (weights * series).sum(axis=1) / count
+    dx = x - x_mean[:, None]
+    spread = (weights * dx * dx).sum(axis=1)
+    slope = np.divide(
+        (weights * dx * (series - y_mean[:, None])).sum(axis=1), spread,
+        out=np.zeros(len(series)), where=spread > 0,
+    )
+    return y_mean + slope * (x[-1] - x_mean), slope
+
+
+def project(level, trend, horizon):
+    """Forecast for days 1..horizon after the last one, one row per tracker."""
+    return level[:, None] + trend[:, None] * np.arange(1, horizon + 1)
+
+
+def _window(state, first_day, since, width):
+    """Daily totals, daily means and observed-day masks for the trackers in `state`."""
+    position = {row[0]: i for i, row in enumerate(state)}
+    totals = np.zeros((len(state), width))
+    means = np.zeros((len(state), width))
+    observed = np.zeros((len(state), width), dtype=bool)
+    rows = (
+        TrackerEntry.objects.filter(tracker_id__in=position, timestamp__gte=since)
+        .annotate(day=TruncDate("timestamp"))
+        .values("tracker_id", "day")
+        .annotate(total=Sum("value"), mean=Avg("value"))
+        .values_list("tracker_id", "day", "total", "mean")
+        .order_by()
+    )
+    for tracker_id, day, total, mean in rows:
+        column = (day - first_day).days
+        if 0 <= column < width:
+            i = position[tracker_id]
+            totals[i, column], means[i, column], observed[i, column] = total, mean, True
+    return totals, means, observed
+
+
+def _last_values(tracker_ids, since):
+    latest = (
+        TrackerEntry.objects.filter(tracker=OuterRef("pk"), timestamp__gte=since)
+        .order_by("-timestamp")
+        .values("value")[:1]
+    )
+    return dict(
+        Tracker.objects.filter(id__in=tracker_ids)
+        .annotate(last_value=Subquery(latest))
+        .values_list("id", "last_value")
+    )
+
+
+def compute_forecasts(state, today, method="holt"):
+    """Forecast every tracker in `state` (rows of STATE_FIELDS) in one pass."""
+    width, horizon = settings.FORECAST_WINDOW_DAYS, settings.FORECAST_HORIZON_DAYS
+    first_day = today - timedelta(days=width - 1)
+    since = timezone.make_aware(datetime.combine(first_day, time.min))
+
+    ids, names, tracker_types, target_types, targets, running, active, _ = map(np.array, zip(*state))
+    targets = targets.astype(np.float64)
+    totals, means, observed = _window(state, first_day, since, width)
+
+    is_value = target_types == "VALUE"
+    is_sum = target_types == "SUM"
+    series = np.where(is_value[:, None], carry_forward(means, observed), totals)
+    level, trend = (holt if method == "holt" else linear)(series, observed.argmax(axis=1))
+    forecast = project(level, trend, horizon)
+
+    # Progress towards the target, now and on each forecast day.
+    current = running.astype(np.float64)
+    path = current[:, None] + np.cumsum(forecast, axis=1)
+    recent = np.concatenate((totals[:, 1 - SUM_DAYS:], forecast), axis=1)
+    windows = np.cumsum(np.concatenate((np.zeros((len(ids), 1)), recent), axis=1), axis=1)
+    current = np.where(is_sum, totals[:, -SUM_DAYS:].sum(axis=1), current)
+    path = np.where(is_sum[:, None], windows[:, SUM_DAYS:] - windows[:, :-SUM_DAYS], path)
+    if is_value.any():
+        last = _last_values(ids[is_value].tolist(), since)
+        current[is_value] = [last.get(i) or 0.0 for i in ids[is_value].tolist()]
+        path[is_value] = forecast[is_value]
+
+    # DECREMENT trackers with a VALUE target are heading down to it.
+    sign = np.where(is_value & (tracker_types == "DECREMENT"), -1.0, 1.0)
+    reached = sign * (current - targets) >= 0
+    reached |= (target_types == "THRESHOLD") & ~active.astype(bool)
+    hits = sign[:, None] * (path - targets[:, None]) >= 0
+    days = np.where(hits.any(axis=1), hits.argmax(axis=1) + 1, 0)
+    enough = observed.sum(axis=1) >= MIN_DAYS
+
+    results = []
+    for i, tracker_id in enumerate(ids.tolist()):
+        if reached[i]:
+            status, eta = "reached", None
+        elif not enough[i]:
+            status, eta = "insufficient_data", None
+        elif days[i]:
+            status, eta = "on_track", int(days[i])
+        else:
+            status, eta = "off_track", None
+        results.append({
+            "tracker": tracker_id,
+            "name": str(names[i]),
+            "target_type": str(target_types[i]),
+            "target_value": float(targets[i]),
+            "current": float(current[i]),
+            "level": float(level[i]) if enough[i] else None,
+            "trend": float(trend[i]) if enough[i] else None,
+            "status": status,
+            "days": eta,
+            "eta": today + timedelta(days=eta) if eta else None,
+        })
+    return results
+
+
+def forecast_trackers(user, method="holt"):
+    """Cached forecasts for all of `user`'s trackers with a target."""
+    state = list(
+        Tracker.objects.filter(
+            branch__owner=user, target_type__in=TARGET_TYPES, target_value__isnull=False
+        ).order_by("id").values_list(*STATE_FIELDS)
+    )
+    if not state:
+        return []
+
+    today = timezone.localdate()
+    fingerprint = hashlib.sha1(repr(state).encode()).hexdigest()
+    key = f"forecast:{user.pk}:{method}:{today.isoformat()}:{fingerprint}"
+    results = cache.get(key)
+    if results is None:
+        metrics.cache_miss("forecast")
+        results = compute_forecasts(state, today, method)
+        cache.set(key, results, settings.FORECAST_CACHE_TTL)
+    else:
+        metrics.cache_hit("forecast")
+    return results
@@ -0,0 +1,416 @@
+"""
+Per-worker group-commit buffer for push_entry (INGEST_BUFFER=1).
+
+Pushes are validated and queued in memory; a background thread stores them
+with one bulk_create and one commit every INGEST_FLUSH_SIZE entries or
+INGEST_FLUSH_MS milliseconds, whichever comes first. INGEST_ACK picks when a
+push returns:
+
+    commit  after the group commit holding the entry (default). The caller
+            gets the stored entry, exactly as without the buffer.
+    log     once the entry is fsync'd to a local append log. The database
+            write follows within a flush interval, and the log is replayed
+            if the worker dies first. Liveness is checked on every push, and
+            an acknowledged entry is stored even if its tracker died before
+            the flush (an earlier queued entry crossed its threshold); only
+            entries of deleted trackers are dropped, with a warning.
+
+Log segments live in INGEST_LOG_DIR; each worker holds an flock on its active
+segment. A new buffer replays every segment no live worker holds, skipping
+entries already stored (same tracker, timestamp and value), so a crash between
+the commit and the segment's removal does not duplicate them.
+"""
+import atexit
+import fcntl
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from branches.scoring import apply_changes, tracker_terms
+from core import metrics
+from core.sharding import current_alias, using_alias
+from streaks.services import local_day, on_entry_pushed
+
+from . import anomalies
+from .models import Tracker, TrackerAnomaly, TrackerEntry
+from .services import EWMA_FIELDS
+
+logger = logging.getLogger(__name__)
+
+ACK_MODES = ("commit", "log")
+SEGMENT_GLOB = "ingest-*.log"
+ACK_TIMEOUT = 30
+
+
+class IngestOverloaded(RuntimeError):
+    """The buffer already holds max_pending entries; the caller should retry."""
+
+
+class IngestTimeout(IngestOverloaded):
+    """No flush stored the entry within ACK_TIMEOUT; it may still be stored."""
+
+FLUSHES = metrics.register(metrics.Counter(
+    "tracker_ingest_flushes_total",
+    "Group commits written by the ingest buffer.",
+))
+DROPPED = metrics.register(metrics.Counter(
+    "tracker_ingest_dropped_total",
+    "Acknowledged (log ack) entries dropped because their tracker was deleted.",
+))
+
+
+@dataclass(eq=False)
+class PendingEntry:
+    tracker_id: int
+    value: float
+    timestamp: datetime
+    future: Future = field(default_factory=Future)
+    # Database alias of the owner's shard (core.sharding) when queued.
+    db: str = "default"
+
+
+def write_entries(items, acked=False):
+    """
+    Store queued entries in one transaction, applying running totals,
+    threshold death and anomaly flags in arrival order. Resolves each item's
+    future with (entry, is_active), or Tracker.DoesNotExist for dead or
+    missing trackers. `acked` entries were already acknowledged (log acks)
+    and are stored on dead trackers too.
+    """
+    with transaction.atomic(using=current_alias()):
+        trackers = {
+            tracker.id: tracker
+            for tracker in Tracker.objects.select_for_update(of=("self",))
+            .select_related("branch__owner")
+            .filter(id__in={item.tracker_id for item in items})
+            .order_by("id")
+        }
+        before = {tracker_id: tracker_terms(tracker) for tracker_id, tracker in trackers.items()}
+
+        entries, results = [], []
+        for item in items:
+            tracker = trackers.get(item.tracker_id)
+            if tracker is None or not (tracker.is_active or acked):
+                results.append((item, Tracker.DoesNotExist("Tracker not found or inactive")))
+                continue
+            tracker.running_total += item.value
+            if (
+                tracker.target_type == "THRESHOLD"
+                and tracker.target_value is not None
+                and tracker.running_total >= tracker.target_value
+            ):
+                tracker.is_active = False
+            entry = TrackerEntry(tracker_id=item.tracker_id, value=item.value, timestamp=item.timestamp)
+            entries.append(entry)
+            results.append((item, (entry, tracker.is_active)))
+
+        TrackerEntry.objects.bulk_create(entries)
+        by_tracker = defaultdict(list)
+        for entry in entries:
+            by_tracker[entry.tracker_id].append(entry)
+        changed = [trackers[tracker_id] for tracker_id in by_tracker]
+        flagged = []
+        score_changes = [(before[tracker.id], tracker_terms(tracker)) for tracker in changed]
+        for tracker in changed:
+            own = by_tracker[tracker.id]
+            indices, expected, scores, state = anomalies.ewma_flags(
+                [entry.value for entry in own], tracker.ewma_count, tracker.ewma_mean, tracker.ewma_var
+            )
+            tracker.ewma_count, tracker.ewma_mean, tracker.ewma_var = state
+            flagged.extend(
+                TrackerAnomaly(
+                    tracker_id=tracker.id, timestamp=own[i].timestamp, value=own[i].value,
+                    expected=float(mean), score=float(score),
+                )
+                for i, mean, score in zip(indices, expected, scores)
+            )
+        Tracker.objects.bulk_update(changed, ["running_total", "is_active", *EWMA_FIELDS])
+        TrackerAnomaly.objects.bulk_create(flagged, ignore_conflicts=True)
+
+        # Streaks only care about the first entry per tracker and day.
+        seen = set()
+        for entry in entries:
+            owner = trackers[entry.tracker_id].branch.owner
+            key = (entry.tracker_id, local_day(owner, entry.timestamp))
+            if key not in seen:
+                seen.add(key)
+                on_entry_pushed(entry, owner)
+
+    # After commit, like push_value, and one UPDATE per branch per flush.
+    apply_changes(score_changes)
+    metrics.ENTRIES_INGESTED.inc(len(entries), source="buffer")
+    FLUSHES.inc()
+    if acked and len(entries) < len(items):
+        DROPPED.inc(len(items) - len(entries))
+        logger.warning("Dropped acknowledged entries of deleted trackers", extra={"entries": len(items) - len(entries)})
+    for item, result in results:
+        if isinstance(result, Exception):
+            item.future.set_exception(result)
+        else:
+            item.future.set_result(result)
+    return len(entries)
+
+
+def read_segment(path):
+    items = []
+    with open(path, "rb") as log:
+        for line in log:
+            try:
+                tracker_id, value, ts, *db = json.loads(line)
+            except ValueError:
+                break  # torn final line from a crash mid-append
+            items.append(PendingEntry(tracker_id, value, datetime.fromisoformat(ts), db=db[0] if db else "default"))
+    return items
+
+
+def _chunks(items, size):
+    for offset in range(0, len(items), size):
+        yield items[offset:offset + size]
+
+
+def _by_alias(items):
+    groups = defaultdict(list)
+    for item in items:
+        groups[item.db].append(item)
+    return groups.items()
+
+
+def _unstored(items):
+    stored = set(
+        TrackerEntry.objects.filter(
+            tracker_id__in={item.tracker_id for item in items},
+            timestamp__in={item.timestamp for item in items},
+        ).values_list("tracker_id", "timestamp", "value")
+    )
+    return [item for item in items if (item.tracker_id, item.timestamp, item.value) not in stored]
+
+
+class IngestBuffer:
+    def __init__(self, flush_size, flush_ms, ack="commit", log_dir=None, max_pending=0):
+        if ack not in ACK_MODES:
+            raise ValueError(f"INGEST_ACK must be one of {', '.join(ACK_MODES)}")
+        self.flush_size = flush_size
+        self.flush_interval = flush_ms / 1000
+        self.max_pending = max_pending
+        self.ack = ack
+        self.log_dir = Path(log_dir) if log_dir else None
+
+        # Lock order: _sync_lock before _cond.
+        self._cond = threading.Condition()
+        self._sync_lock = threading.Lock()
+        self._pending = []
+        self._known = set()
+        self._closing = False
+        self._written = self._synced = 0
+        self._log = None
+        self._retired = []
+
+        if ack == "log":
+            self.log_dir.mkdir(parents=True, exist_ok=True)
+            self._orphans = self._claim_orphans()
+            self._log = self._open_segment()
+        else:
+            self._orphans = []
+        self._thread = threading.Thread(target=self._run, name="ingest-flush", daemon=True)
+        self._thread.start()
+
+    # -- accepting ---------------------------------------------------------
+
+    def push(self, tracker_id, owner, value):
+        """
+        Queue one value. Returns (entry, is_active); with log acks the entry is
+        not saved yet and is_active is the tracker's state when accepted.
+        """
+        self._check(tracker_id, owner)
+        item = PendingEntry(tracker_id, value, timezone.now(), db=current_alias())
+        if self.ack == "log":
+            line = json.dumps([tracker_id, value, item.timestamp.isoformat(), item.db]).encode() + b"\n"
+        with self._cond:
+            if self._closing:
+                raise RuntimeError("Ingest buffer is closed")
+            if self.max_pending and len(self._pending) >= self.max_pending:
+                raise IngestOverloaded("Ingest buffer is full")
+            if self._log is not None:
+                self._log.write(line)
+                self._written += 1
+                seq = self._written
+            self._pending.append(item)
+            if len(self._pending) >= self.flush_size:
+                self._cond.notify()
+
+        if self.ack == "log":
+            self._sync(seq)
+            return TrackerEntry(tracker_id=tracker_id, value=value, timestamp=item.timestamp), True
+        try:
+            return item.future.result(timeout=ACK_TIMEOUT)
+        except TimeoutError:
+            raise IngestTimeout("Ingest flush did not finish in time") from None
+
+    def _check(self, tracker_id, owner):
+        # Ownership never changes and, with commit acks, dead trackers are
+        # rejected at flush time, so a positive answer can be remembered for
+        # the worker's lifetime. Log acks store what they acknowledge, so
+        # they check every push.
+        key = (tracker_id, owner.pk)
+        if key in self._known:
+            return
+        if not Tracker.objects.filter(id=tracker_id, branch__owner=owner, is_active=True).exists():
+            raise Tracker.DoesNotExist("Tracker not found or inactive")
+        if self.ack == "commit":
+            self._known.add(key)
+
+    def _sync(self, seq):
+        # Group fsync: one caller syncs everything written so far, and callers
+        # whose lines that covered return without touching the disk.
+        with self._sync_lock:
+            if self._synced >= seq:
+                return
+            with self._cond:
+                target = self._written
+                self._log.flush()
+            os.fsync(self._log.fileno())
+            self._synced = target
+
+    # -- log segments ------------------------------------------------------
+
+    def _open_segment(self):
+        path = self.log_dir / f"ingest-{os.getpid()}-{uuid.uuid4().hex[:8]}.log"
+        log = open(path, "ab")
+        fcntl.flock(log, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return log
+
+    def _claim_orphans(self):
+        claimed = []
+        for path in sorted(self.log_dir.glob(SEGMENT_GLOB)):
+            handle = open(path, "rb")
+            try:
+                fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                handle.close()  # a live worker's active segment
+                continue
+            claimed.append((path, handle))
+        return claimed
+
+    def _take(self):
+        """Detach the pending entries and, with log acks, the segment holding them."""
+        retired = None
+        with self._sync_lock:
+            with self._cond:
+                batch, self._pending = self._pending, []
+                if batch and self._log is not None:
+                    retired = self._log
+                    retired.flush()
+                    os.fsync(retired.fileno())
+                    self._synced = self._written
+                    self._log = self._open_segment()
+        if retired is not None:
+            retired.close()
+            self._retired.append(Path(retired.name))
+        return batch
+
+    # -- flushing ----------------------------------------------------------
+
+    def _run(self):
+        for path, handle in self._orphans:
+            self._replay(path, handle)
+        while True:
+            with self._cond:
+                self._cond.wait_for(
+                    lambda: len(self._pending) >= self.flush_size or self._closing,
+                    timeout=self.flush_interval,
+                )
+                closing = self._closing
+            self._flush()
+            if closing:
+                return
+
+    def _flush(self):
+        batch = self._take()
+        if not batch:
+            return
+
+        close_old_connections()
+        started = time.perf_counter()
+        try:
+            for alias, items in _by_alias(batch):
+                with using_alias(alias):
+                    for chunk in _chunks(items, self.flush_size):
+                        write_entries(chunk, acked=self.ack == "log")
+        except Exception as exc:
+            logger.exception("Ingest flush failed", extra={"entries": len(batch)})
+            close_old_connections()
+            if self.ack == "log":
+                # Acknowledged already: keep the entries (and their segments)
+                # and retry on the next flush.
+                with self._cond:
+                    self._pending[:0] = [item for item in batch if not item.future.done()]
+                return
+            for item in batch:
+                if not item.future.done():
+                    item.future.set_exception(exc)
+            return
+        self._discard_retired()
+        logger.debug(
+            "Ingest flush",
+            extra={"entries": len(batch), "seconds": round(time.perf_counter() - started, 4)},
+        )
+
+    def _discard_retired(self):
+        for path in self._retired:
+            path.unlink(missing_ok=True)
+        self._retired = []
+
+    def _replay(self, path, handle):
+        written = 0
+        try:
+            for alias, items in _by_alias(read_segment(path)):
+                with using_alias(alias):
+                    for chunk in _chunks(items, self.flush_size):
+                        written += write_entries(_unstored(chunk), acked=True)
+        except Exception:
+            logger.exception("Ingest log replay failed", extra={"segment": str(path)})
+            handle.close()
+            return
+        logger.info("Replayed ingest log", extra={"segment": str(path), "entries": written})
+        path.unlink(missing_ok=True)
+        handle.close()
+
+    def close(self):
+        with self._cond:
+            self._closing = True
+            self._cond.notify()
+        self._thread.join()
+        if self._log is not None:
+            self._log.close()
+            Path(self._log.name).unlink(missing_ok=True)
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def get_buffer():
+    global _buffer
+    with _buffer_lock:
+        if _buffer is None:
+            _buffer = IngestBuffer(
+                flush_size=settings.INGEST_FLUSH_SIZE,
+                flush_ms=settings.INGEST_FLUSH_MS,
+                ack=settings.INGEST_ACK,
+                log_dir=settings.INGEST_LOG_DIR,
+                max_pending=settings.INGEST_MAX_PENDING,
+            )
+            atexit.register(_buffer.close)
+        return _buffer
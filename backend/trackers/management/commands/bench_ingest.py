@@ -0,0 +1,95 @@
+import tempfile
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from accounts.models import User
+from branches.models import Branch
+from trackers.ingest import FLUSHES, IngestBuffer
+from trackers.models import Tracker, TrackerEntry
+from trackers.services import push_value
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare entries/s and commits/s of direct push_value against the group-commit "
+        "ingest buffer (commit and log acks) under many concurrent pushers. Creates "
+        "and removes a throwaway user."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--pushers", type=int, default=500)
+        parser.add_argument("--pushes", type=int, default=20, help="Pushes per pusher.")
+        parser.add_argument("--trackers", type=int, default=20)
+        parser.add_argument(
+            "--max-connections", type=int, default=50,
+            help="Direct pushers each hold a connection, so that run is capped at this many threads.",
+        )
+        parser.add_argument("--flush-size", type=int, default=settings.INGEST_FLUSH_SIZE)
+        parser.add_argument("--flush-ms", type=int, default=settings.INGEST_FLUSH_MS)
+
+    def handle(self, *args, **options):
+        owner = User.objects.create_user(f"bench-{uuid.uuid4().hex[:12]}", None)
+        branch = Branch.objects.create(name="bench", owner=owner)
+        try:
+            trackers = [
+                Tracker.objects.create(branch=branch, name=f"t{i}").id for i in range(options["trackers"])
+            ]
+            pushes = options["pushes"]
+
+            direct_threads = min(options["pushers"], options["max_connections"])
+            self.report(
+                f"direct ({direct_threads} threads)",
+                *self.run(direct_threads, pushes, trackers, lambda tid: push_value(tid, owner, 1.0)),
+                commits=None,
+            )
+
+            for ack in ("commit", "log"):
+                with tempfile.TemporaryDirectory() as log_dir:
+                    buffer = IngestBuffer(options["flush_size"], options["flush_ms"], ack=ack, log_dir=log_dir)
+                    for tracker_id in trackers:
+                        buffer._check(tracker_id, owner)  # warm the ownership cache
+                    flushes = FLUSHES.get()
+                    total, seconds = self.run(
+                        options["pushers"], pushes, trackers, lambda tid: buffer.push(tid, owner, 1.0)
+                    )
+                    buffer.close()  # waits for the final flush
+                    seconds_to_db = time.perf_counter() - self.started
+                    self.report(
+                        f"buffer, {ack} ack ({options['pushers']} threads)",
+                        total, seconds, commits=FLUSHES.get() - flushes, db_seconds=seconds_to_db,
+                    )
+
+            stored = TrackerEntry.objects.filter(tracker_id__in=trackers).count()
+            expected = pushes * (direct_threads + 2 * options["pushers"])
+            style = self.style.SUCCESS if stored == expected else self.style.ERROR
+            self.stdout.write(style(f"stored {stored} of {expected} entries"))
+        finally:
+            owner.delete()
+
+    def run(self, count, pushes, trackers, push):
+        def worker(offset):
+            for i in range(pushes):
+                push(trackers[(offset + i) % len(trackers)])
+            connections.close_all()
+
+        workers = [threading.Thread(target=worker, args=(n,)) for n in range(count)]
+        self.started = time.perf_counter()
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        return count * pushes, time.perf_counter() - self.started
+
+    def report(self, label, total, seconds, commits, db_seconds=None):
+        commits = total if commits is None else commits
+        line = (
+            f"{label:32} {total / seconds:9.0f} entries/s acked "
+            f"{commits / (db_seconds or seconds):8.0f} commits/s "
+            f"({commits} commits, {total / commits:.1f} entries each)"
+        )
+        self.stdout.write(line)
@@ -0,0 +1,64 @@
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from core import sharding
+from trackers import partitions
+
+
+class Command(BaseCommand):
+    help = (
+        "Maintain monthly TrackerEntry partitions: create upcoming months and "
+        "roll up + drop months past the retention window. Run daily from cron."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--ahead", type=int, default=3, help="Months to create ahead of today.")
+        parser.add_argument(
+            "--retain-months",
+            type=int,
+            default=settings.TRACKER_ENTRY_RETENTION_MONTHS,
+            help="Keep this many months of raw entries (0 keeps everything).",
+        )
+        parser.add_argument(
+            "--convert",
+            action="store_true",
+            help="Convert an existing unpartitioned table first.",
+        )
+        parser.add_argument(
+            "--database",
+            choices=sharding.data_aliases(),
+            help="Only maintain this database (default: every database holding entries).",
+        )
+
+    def handle(self, *args, **options):
+        aliases = [options["database"]] if options["database"] else sharding.data_aliases()
+        for alias in aliases:
+            self.maintain(alias, options)
+
+    def maintain(self, alias, options):
+        if not partitions.partitioning_enabled(alias):
+            raise CommandError(
+                "Partitioning needs PostgreSQL and TRACKER_ENTRY_PARTITIONING=1."
+            )
+
+        if options["convert"] and partitions.convert_to_partitioned(options["ahead"], using=alias):
+            self.stdout.write(f"{alias}: converted trackers_trackerentry to a partitioned table.")
+
+        with connections[alias].cursor() as cursor:
+            if not partitions.is_partitioned(cursor):
+                raise CommandError(f"{alias}: trackers_trackerentry is not partitioned; pass --convert.")
+
+        for name in partitions.ensure_partitions(options["ahead"], using=alias):
+            self.stdout.write(f"{alias}: created {name}")
+
+        if options["retain_months"] > 0:
+            current = partitions.month_start(datetime.now(timezone.utc))
+            cutoff = partitions.add_months(current, -options["retain_months"])
+            for name in partitions.drop_partitions_before(cutoff, using=alias):
+                if name == partitions.DEFAULT_PARTITION:
+                    self.stdout.write(f"{alias}: rolled up and deleted expired rows of {name}")
+                else:
+                    self.stdout.write(f"{alias}: rolled up and dropped {name}")
@@ -0,0 +1,78 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_datetime
+
+from accounts.models import User
+from core import sharding
+from trackers import export
+
+
+class Command(BaseCommand):
+    help = (
+        "Export tracker entries with tracker/branch metadata to gzip CSV, Arrow "
+        "or Parquet in bounded memory. Use --cursor to resume an interrupted export."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("output")
+        parser.add_argument("--format", choices=["csv", "arrow", "parquet"], default="parquet")
+        parser.add_argument("--user", help="Only export this username's entries.")
+        parser.add_argument("--from", dest="start", help="ISO datetime, inclusive.")
+        parser.add_argument("--to", dest="end", help="ISO datetime, exclusive.")
+        parser.add_argument("--cursor", help="Resume after this cursor.")
+        parser.add_argument("--batch-size", type=int, default=export.BATCH_SIZE)
+        parser.add_argument(
+            "--database",
+            choices=sharding.data_aliases(),
+            help="Database to export from (default: the --user's, or the only one when unsharded).",
+        )
+
+    def handle(self, *args, **options):
+        owner = None
+        if options["user"]:
+            owner = User.objects.filter(username=options["user"]).first()
+            if owner is None:
+                raise CommandError("Unknown user")
+
+        # One export reads one database; a cursor only orders rows within it.
+        if options["database"]:
+            alias = options["database"]
+        elif owner is not None:
+            alias = sharding.alias_for(owner)
+        elif sharding.shard_count():
+            raise CommandError("Sharding is on; pass --user or --database")
+        else:
+            alias = "default"
+
+        bounds = []
+        for key in ("start", "end"):
+            value = options[key] and parse_datetime(options[key])
+            if options[key] and value is None:
+                raise CommandError(f"Invalid --{'from' if key == 'start' else 'to'} value")
+            bounds.append(value)
+
+        try:
+            qs = export.export_queryset(owner, *bounds, cursor=options["cursor"]).using(alias)
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        last = {"cursor": options["cursor"]}
+
+        def progress(batch, total):
+            last["cursor"] = export.encode_cursor(batch[-1])
+            self.stdout.write(f"{total} rows (cursor {last['cursor']})")
+
+        try:
+            total = export.write_export(
+                export.iter_batches(qs, options["batch_size"]),
+                options["output"],
+                options["format"],
+                on_batch=progress,
+            )
+        except ImportError as exc:
+            raise CommandError(str(exc))
+        except BaseException:
+            if last["cursor"]:
+                self.stderr.write(f"Interrupted; resume with --cursor '{last['cursor']}'")
+            raise
+
+        self.stdout.write(self.style.SUCCESS(f"Exported {total} rows to {options['output']}"))
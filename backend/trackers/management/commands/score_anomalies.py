@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+
+from core import sharding
+from trackers import anomalies
+from trackers.downsampling import CHUNK_SIZE
+from trackers.models import Tracker
+from trackers.services import get_tracker_daily_totals
+
+
+class Command(BaseCommand):
+    help = (
+        "Rescore tracker history for anomalies: raw entries (EWMA, streamed in "
+        "chunks) and, with --daily, daily totals (rolling z-score)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--tracker", type=int, action="append", help="Only these tracker ids.")
+        parser.add_argument("--daily", action="store_true", help="Also score daily totals.")
+        parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+        parser.add_argument(
+            "--database",
+            choices=sharding.data_aliases(),
+            help="Only score trackers on this database (default: every database holding trackers).",
+        )
+
+    def handle(self, *args, **options):
+        aliases = [options["database"]] if options["database"] else sharding.data_aliases()
+        raw = daily = scored = 0
+        for alias in aliases:
+            with sharding.using_alias(alias):
+                trackers = Tracker.objects.order_by("id")
+                if options["tracker"]:
+                    trackers = trackers.filter(id__in=options["tracker"])
+
+                for tracker_id, owner_id in trackers.values_list("id", "branch__owner_id").iterator():
+                    raw += anomalies.rescore_raw(tracker_id, options["chunk_size"])
+                    if options["daily"]:
+                        daily += anomalies.rescore_daily(tracker_id, get_tracker_daily_totals(tracker_id, owner_id))
+                    scored += 1
+                    if options["verbosity"] > 1:
+                        self.stdout.write(f"tracker {tracker_id}: {raw} raw / {daily} daily flags so far")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Scored {scored} trackers: {raw} raw and {daily} daily anomalies"
+        ))
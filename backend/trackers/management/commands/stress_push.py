@@ -0,0 +1,85 @@
+import threading
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.models import Sum
+
+from accounts.models import User
+from branches.models import Branch
+from trackers.models import Tracker, TrackerEntry
+from trackers.services import push_value
+
+
+class Command(BaseCommand):
+    help = (
+        "Hammer one THRESHOLD tracker with concurrent pushes, check that it dies "
+        "exactly once with no entries after death, and compare throughput with "
+        "plain inserts. Creates and removes a throwaway user."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=16)
+        parser.add_argument("--pushes", type=int, default=200, help="Pushes per thread.")
+
+    def handle(self, *args, **options):
+        threads, pushes = options["threads"], options["pushes"]
+        owner = User.objects.create_user(f"stress-{uuid.uuid4().hex[:12]}", None)
+        branch = Branch.objects.create(name="stress", owner=owner)
+        try:
+            target = threads * pushes * 0.75
+            tracker = Tracker.objects.create(
+                branch=branch, name="threshold", target_type="THRESHOLD", target_value=target
+            )
+            plain = Tracker.objects.create(branch=branch, name="plain")
+
+            accepted, rejected = [], []
+
+            def push():
+                for _ in range(pushes):
+                    try:
+                        push_value(tracker.id, owner, 1.0)
+                        accepted.append(1)
+                    except Tracker.DoesNotExist:
+                        rejected.append(1)
+                connections.close_all()
+
+            def insert():
+                for _ in range(pushes):
+                    TrackerEntry.objects.create(tracker_id=plain.id, value=1.0)
+                connections.close_all()
+
+            push_seconds = self.run_threads(push, threads)
+            insert_seconds = self.run_threads(insert, threads)
+
+            tracker.refresh_from_db()
+            stored = TrackerEntry.objects.filter(tracker=tracker).aggregate(
+                n=Sum("value")
+            )["n"] or 0
+            ok = (
+                not tracker.is_active
+                and stored == len(accepted) == target
+                and tracker.running_total == stored
+            )
+
+            total = threads * pushes
+            self.stdout.write(f"threshold {target:.0f}: accepted {len(accepted)}, rejected {len(rejected)}")
+            self.stdout.write(f"stored entries sum {stored:.0f}, running_total {tracker.running_total:.0f}")
+            self.stdout.write(f"push_value:    {total / push_seconds:.0f} ops/s")
+            self.stdout.write(f"plain inserts: {total / insert_seconds:.0f} ops/s")
+            if ok:
+                self.stdout.write(self.style.SUCCESS("OK: died exactly at the threshold"))
+            else:
+                self.stdout.write(self.style.ERROR("FAILED: threshold state is inconsistent"))
+        finally:
+            owner.delete()
+
+    def run_threads(self, target, count):
+        workers = [threading.Thread(target=target) for _ in range(count)]
+        started = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        return time.perf_counter() - started
@@ -0,0 +1,38 @@
+# Generated by Django 6.0 on 2026-10-19 13:59
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trackers', '0002_remove_tracker_display_mode_remove_tracker_user_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrackerDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('total', models.FloatField(default=0)),
+                ('minimum', models.FloatField(null=True)),
+                ('maximum', models.FloatField(null=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='trackerentry',
+            index=models.Index(fields=['tracker', 'timestamp'], name='trackerentry_tracker_ts_idx'),
+        ),
+        migrations.AddField(
+            model_name='trackerdailyrollup',
+            name='tracker',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rollups', to='trackers.tracker'),
+        ),
+        migrations.AddConstraint(
+            model_name='trackerdailyrollup',
+            constraint=models.UniqueConstraint(fields=('tracker', 'day'), name='trackerrollup_tracker_day_uniq'),
+        ),
+    ]
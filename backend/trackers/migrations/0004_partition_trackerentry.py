@@ -0,0 +1,20 @@
+from django.db import migrations
+
+
+def partition_entries(apps, schema_editor):
+    from trackers.partitions import convert_to_partitioned, partitioning_enabled
+
+    alias = schema_editor.connection.alias
+    if partitioning_enabled(alias):
+        convert_to_partitioned(using=alias)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trackers', '0003_trackerentry_index_dailyrollup'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_entries, migrations.RunPython.noop),
+    ]
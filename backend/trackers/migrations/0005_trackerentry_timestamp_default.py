@@ -0,0 +1,19 @@
+# Generated by Django 6.0 on 2026-10-19 14:03
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trackers', '0004_partition_trackerentry'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='trackerentry',
+            name='timestamp',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 6.0 on 2026-10-19 14:08
+
+from django.db import migrations, models
+from django.db.models import FloatField, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def backfill_running_total(apps, schema_editor):
+    Tracker = apps.get_model("trackers", "Tracker")
+    TrackerEntry = apps.get_model("trackers", "TrackerEntry")
+    totals = (
+        TrackerEntry.objects.filter(tracker=OuterRef("pk"))
+        .values("tracker")
+        .annotate(total=Sum("value"))
+        .values("total")
+    )
+    Tracker.objects.update(
+        running_total=Coalesce(Subquery(totals, output_field=FloatField()), 0.0)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trackers', '0005_trackerentry_timestamp_default'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tracker',
+            name='running_total',
+            field=models.FloatField(default=0),
+        ),
+        migrations.RunPython(backfill_running_total, migrations.RunPython.noop),
+    ]
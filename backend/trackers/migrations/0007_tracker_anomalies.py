@@ -0,0 +1,45 @@
+# Generated by Django 6.0 on 2026-10-19 14:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trackers', '0006_tracker_running_total'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tracker',
+            name='ewma_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='tracker',
+            name='ewma_mean',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='tracker',
+            name='ewma_var',
+            field=models.FloatField(default=0),
+        ),
+        migrations.CreateModel(
+            name='TrackerAnomaly',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('resolution', models.CharField(choices=[('raw', 'Entry'), ('daily', 'Daily total')], default='raw', max_length=10)),
+                ('timestamp', models.DateTimeField()),
+                ('value', models.FloatField()),
+                ('expected', models.FloatField()),
+                ('score', models.FloatField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('tracker', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='anomalies', to='trackers.tracker')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('tracker', 'resolution', 'timestamp'), name='trackeranomaly_point_uniq')],
+            },
+        ),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 from branches.models import Branch
 
 
@@ -26,16 +27,91 @@ class Tracker(models.Model):
     weight = models.PositiveIntegerField(default=0)
 
     is_active = models.BooleanField(default=True)
+    # Sum of every entry ever pushed, kept in step by push_value's UPDATE.
+    running_total = models.FloatField(default=0)
+    # Exponentially weighted mean/variance of entry values (trackers.anomalies).
+    ewma_count = models.PositiveIntegerField(default=0)
+    ewma_mean = models.FloatField(default=0)
+    ewma_var = models.FloatField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
         return self.name
 
+    @property
+    def is_scoring(self):
+        """Only weighted trackers with a target count towards the commit score."""
+        return bool(self.weight) and self.target_type != "NONE" and self.target_value is not None
+
+    def get_contribution(self):
+        """Weight earned towards the branch score (mirrors the frontend's branch score)."""
+        if not self.is_scoring:
+            return 0.0
+        if self.target_type == "THRESHOLD":
+            # Threshold trackers contribute fully until they die.
+            return float(self.weight) if self.is_active else 0.0
+        if self.target_value <= 0:
+            return float(self.weight)
+        progress = self.running_total / self.target_value
+        return max(0.0, min(progress * self.weight, float(self.weight)))
+
 
 class TrackerEntry(models.Model):
     tracker = models.ForeignKey(Tracker, on_delete=models.CASCADE, related_name="entries")
     value = models.FloatField()
-    timestamp = models.DateTimeField(auto_now_add=True)
+    # A default rather than auto_now_add so imported history keeps its time.
+    timestamp = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["tracker", "timestamp"], name="trackerentry_tracker_ts_idx"),
+        ]
 
     def __str__(self):
         return f"{self.tracker.name}: {self.value}"
+
+
+class TrackerDailyRollup(models.Model):
+    """Per-day aggregates of entries whose raw rows were dropped by retention."""
+
+    tracker = models.ForeignKey(Tracker, on_delete=models.CASCADE, related_name="rollups")
+    day = models.DateField()
+    count = models.PositiveIntegerField(default=0)
+    total = models.FloatField(default=0)
+    minimum = models.FloatField(null=True)
+    maximum = models.FloatField(null=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["tracker", "day"], name="trackerrollup_tracker_day_uniq"),
+        ]
+
+    def __str__(self):
+        return f"{self.tracker.name} @ {self.day}: {self.total}"
+
+
+class TrackerAnomaly(models.Model):
+    """An entry (raw) or daily total (daily) that deviated from its tracker's norm."""
+
+    RESOLUTION_CHOICES = [
+        ("raw", "Entry"),
+        ("daily", "Daily total"),
+    ]
+
+    tracker = models.ForeignKey(Tracker, on_delete=models.CASCADE, related_name="anomalies")
+    resolution = models.CharField(max_length=10, choices=RESOLUTION_CHOICES, default="raw")
+    timestamp = models.DateTimeField()
+    value = models.FloatField()
+    expected = models.FloatField()
+    score = models.FloatField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["tracker", "resolution", "timestamp"], name="trackeranomaly_point_uniq"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.tracker.name} @ {self.timestamp}: {self.value} (z={self.score:.1f})"
@@ -0,0 +1,206 @@
+"""
+Monthly range partitioning of trackers_trackerentry (PostgreSQL only).
+
+The parent table is partitioned on "timestamp" with one partition per UTC
+month plus a DEFAULT partition, so inserts never fail when a month has not
+been created yet. Retention rolls a month up into TrackerDailyRollup and
+drops its raw partition in one transaction, so every entry is counted either
+raw or rolled up, never both. Expired rows that landed in the DEFAULT
+partition are deleted and rolled up by one statement.
+"""
+from datetime import date, datetime, timezone
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+from core.sharding import SHARD_ID_RANGE, shard_index
+
+TABLE = "trackers_trackerentry"
+DEFAULT_PARTITION = f"{TABLE}_default"
+ROLLUP_TABLE = "trackers_trackerdailyrollup"
+INDEX = "trackerentry_tracker_ts_idx"
+
+
+def partitioning_enabled(using=DEFAULT_DB_ALIAS):
+    return connections[using].vendor == "postgresql" and settings.TRACKER_ENTRY_PARTITIONING
+
+
+def month_start(value):
+    return date(value.year, value.month, 1)
+
+
+def add_months(value, months):
+    index = value.year * 12 + value.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month):
+    return f"{TABLE}_p{month:%Y%m}"
+
+
+def _bound(month):
+    return datetime(month.year, month.month, 1, tzinfo=timezone.utc).isoformat()
+
+
+def is_partitioned(cursor):
+    cursor.execute(
+        "SELECT 1 FROM pg_partitioned_table pt JOIN pg_class c ON c.oid = pt.partrelid "
+        "WHERE c.relname = %s",
+        [TABLE],
+    )
+    return cursor.fetchone() is not None
+
+
+def list_partitions(cursor):
+    """Return [(name, month)] for every monthly partition, oldest first."""
+    cursor.execute(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid "
+        "JOIN pg_class p ON p.oid = i.inhparent "
+        "WHERE p.relname = %s",
+        [TABLE],
+    )
+    prefix = f"{TABLE}_p"
+    partitions = []
+    for (name,) in cursor.fetchall():
+        if name.startswith(prefix):
+            suffix = name[len(prefix):]
+            partitions.append((name, date(int(suffix[:4]), int(suffix[4:]), 1)))
+    return sorted(partitions, key=lambda item: item[1])
+
+
+def create_month(cursor, month):
+    """
+    Create the partition for `month` if missing. Rows that already landed in
+    the DEFAULT partition for that range are moved into it first, because
+    PostgreSQL refuses to attach a range the default partition still holds.
+    """
+    name = partition_name(month)
+    cursor.execute("SELECT to_regclass(%s)", [name])
+    if cursor.fetchone()[0] is not None:
+        return False
+
+    lower, upper = _bound(month), _bound(add_months(month, 1))
+    cursor.execute(
+        f'CREATE TABLE "{name}" (LIKE "{TABLE}" INCLUDING DEFAULTS INCLUDING CONSTRAINTS)'
+    )
+    cursor.execute(
+        f'WITH moved AS (DELETE FROM "{DEFAULT_PARTITION}" '
+        f'WHERE "timestamp" >= %s AND "timestamp" < %s RETURNING *) '
+        f'INSERT INTO "{name}" SELECT * FROM moved',
+        [lower, upper],
+    )
+    cursor.execute(
+        f'ALTER TABLE "{TABLE}" ATTACH PARTITION "{name}" '
+        f"FOR VALUES FROM ('{lower}') TO ('{upper}')"
+    )
+    return True
+
+
+def ensure_partitions(months_ahead=3, today=None, using=DEFAULT_DB_ALIAS):
+    """Create partitions from the current month through `months_ahead` months out."""
+    current = month_start(today or datetime.now(timezone.utc))
+    created = []
+    with transaction.atomic(using=using), connections[using].cursor() as cursor:
+        for offset in range(months_ahead + 1):
+            month = add_months(current, offset)
+            if create_month(cursor, month):
+                created.append(partition_name(month))
+    return created
+
+
+def _rollup_sql(source):
+    """INSERT adding the rows of `source` to the daily rollups."""
+    return (
+        f'INSERT INTO "{ROLLUP_TABLE}" (tracker_id, day, count, total, minimum, maximum) '
+        f"SELECT tracker_id, (\"timestamp\" AT TIME ZONE 'UTC')::date, "
+        f'count(*), sum(value), min(value), max(value) FROM "{source}" GROUP BY 1, 2 '
+        f"ON CONFLICT (tracker_id, day) DO UPDATE SET "
+        f'count = "{ROLLUP_TABLE}".count + EXCLUDED.count, '
+        f'total = "{ROLLUP_TABLE}".total + EXCLUDED.total, '
+        f'minimum = LEAST("{ROLLUP_TABLE}".minimum, EXCLUDED.minimum), '
+        f'maximum = GREATEST("{ROLLUP_TABLE}".maximum, EXCLUDED.maximum)'
+    )
+
+
+def drop_partitions_before(cutoff, using=DEFAULT_DB_ALIAS):
+    """
+    Roll up and drop every monthly partition that ends on or before `cutoff`,
+    then roll up and delete the DEFAULT partition's rows before `cutoff`
+    (months whose partition did not exist yet). Returns the partitions
+    expired; each is handled in one transaction.
+    """
+    cutoff = month_start(cutoff)
+    expired = []
+    with connections[using].cursor() as cursor:
+        partitions = list_partitions(cursor)
+
+    for name, month in partitions:
+        if add_months(month, 1) > cutoff:
+            break
+        with transaction.atomic(using=using), connections[using].cursor() as cursor:
+            cursor.execute(_rollup_sql(name))
+            cursor.execute(f'DROP TABLE "{name}"')
+        expired.append(name)
+
+    with transaction.atomic(using=using), connections[using].cursor() as cursor:
+        # The DELETE runs once, so each removed row is rolled up exactly once.
+        cursor.execute(
+            f'WITH "expired" AS (DELETE FROM "{DEFAULT_PARTITION}" WHERE "timestamp" < %s '
+            f'RETURNING tracker_id, "timestamp", value) {_rollup_sql("expired")}',
+            [_bound(cutoff)],
+        )
+        if cursor.rowcount:
+            expired.append(DEFAULT_PARTITION)
+    return expired
+
+
+def convert_to_partitioned(months_ahead=3, using=DEFAULT_DB_ALIAS):
+    """Rebuild trackers_trackerentry as a partitioned table, keeping every row and id."""
+    with connections[using].cursor() as cursor:
+        if is_partitioned(cursor):
+            return False
+
+        legacy = f"{TABLE}_legacy"
+        # The legacy identity sequence keeps the default name and is dropped
+        # with the legacy table, so the partitioned table gets its own.
+        sequence = f"{TABLE}_part_id_seq"
+        cursor.execute(f'ALTER TABLE "{TABLE}" RENAME TO "{legacy}"')
+        cursor.execute(f'ALTER INDEX IF EXISTS "{INDEX}" RENAME TO "{INDEX}_legacy"')
+        cursor.execute(f'CREATE SEQUENCE "{sequence}"')
+        cursor.execute(
+            f'CREATE TABLE "{TABLE}" ('
+            f"id bigint NOT NULL DEFAULT nextval('{sequence}'), "
+            f"value double precision NOT NULL, "
+            f'"timestamp" timestamp with time zone NOT NULL, '
+            f"tracker_id bigint NOT NULL REFERENCES trackers_tracker (id) "
+            f"DEFERRABLE INITIALLY DEFERRED, "
+            f'PRIMARY KEY (id, "timestamp")'
+            f') PARTITION BY RANGE ("timestamp")'
+        )
+        cursor.execute(f'ALTER SEQUENCE "{sequence}" OWNED BY "{TABLE}".id')
+        cursor.execute(f'CREATE INDEX "{INDEX}" ON "{TABLE}" (tracker_id, "timestamp")')
+        cursor.execute(f'CREATE TABLE "{DEFAULT_PARTITION}" PARTITION OF "{TABLE}" DEFAULT')
+
+        cursor.execute(f'SELECT min("timestamp"), max("timestamp") FROM "{legacy}"')
+        first, last = cursor.fetchone()
+        current = month_start(datetime.now(timezone.utc))
+        month = month_start(first) if first else current
+        end = add_months(max(month_start(last) if last else current, current), months_ahead)
+        while month <= end:
+            create_month(cursor, month)
+            month = add_months(month, 1)
+
+        cursor.execute(
+            f'INSERT INTO "{TABLE}" (id, value, "timestamp", tracker_id) '
+            f'SELECT id, value, "timestamp", tracker_id FROM "{legacy}"'
+        )
+        # A shard's new sequence starts in its id range (core.sharding).
+        index = shard_index(using)
+        first_id = (index + 1) * SHARD_ID_RANGE if index is not None else 1
+        cursor.execute(
+            f"SELECT setval('{sequence}', GREATEST(COALESCE((SELECT max(id) FROM \"{TABLE}\"), 0) + 1, %s), false)",
+            [first_id],
+        )
+        cursor.execute(f'DROP TABLE "{legacy}"')
+    return True
@@ -1,7 +1,7 @@
 from rest_framework import serializers
 
 from branches.models import Branch
-from .models import Tracker, TrackerEntry
+from .models import Tracker, TrackerAnomaly, TrackerEntry
 
 
 class TrackerSerializer(serializers.ModelSerializer):
@@ -30,3 +30,9 @@ class TrackerEntrySerializer(serializers.ModelSerializer):
         model = TrackerEntry
         fields = ["id", "value", "timestamp"]
         read_only_fields = ["id", "timestamp"]
+
+
+class TrackerAnomalySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = TrackerAnomaly
+        fields = ["id", "resolution", "timestamp", "value", "expected", "score"]
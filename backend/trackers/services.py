@@ -1,11 +1,81 @@
-from django.db.models import Sum
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Avg, Case, Count, F, Max, Min, Q, Sum, When
+from django.db.models.functions import TruncDate
 from django.utils.timezone import now
 from datetime import timedelta
 
+from branches.models import Branch
+from core.sharding import current_alias, using_alias
+from branches.scoring import apply_change, tracker_terms
+
+from . import anomalies
+from .models import Tracker, TrackerDailyRollup, TrackerEntry
+
+
+SCORE_FIELDS = ("branch_id", "weight", "target_type", "target_value", "running_total", "is_active")
+EWMA_FIELDS = ("ewma_count", "ewma_mean", "ewma_var")
+
+
+def push_value(tracker_id, owner, value):
+    """
+    Insert an entry and apply threshold death in one transaction. The same
+    UPDATE advances the tracker's EWMA state used to flag anomalies. The
+    branch score moves once that transaction commits (branches.scoring).
+
+    A single conditional UPDATE bumps running_total and clears is_active when
+    a THRESHOLD target is crossed. It only matches active trackers and holds
+    the row lock until commit, so concurrent pushes serialize on the tracker
+    row: none is lost, and none lands after the tracker died. Raises
+    Tracker.DoesNotExist for unknown or inactive trackers.
+    """
+    new_total = F("running_total") + value
+    alias = current_alias()
+    with transaction.atomic(using=alias):
+        # branch_id__in (not branch__owner) keeps every condition in the
+        # UPDATE's own WHERE clause, which PostgreSQL re-checks after waiting
+        # on the row lock; a join would be rewritten into a pk__in subquery.
+        updated = Tracker.objects.filter(
+            id=tracker_id,
+            branch_id__in=Branch.objects.filter(owner=owner).values("id"),
+            is_active=True,
+        ).update(
+            running_total=new_total,
+            **anomalies.ewma_update(value),
+            is_active=Case(
+                When(Q(target_type="THRESHOLD") & Q(target_value__lte=new_total), then=False),
+                default=True,
+            ),
+        )
+        if not updated:
+            raise Tracker.DoesNotExist("Tracker not found or inactive")
+
+        entry = TrackerEntry.objects.create(tracker_id=tracker_id, value=value)
+        row = Tracker.objects.filter(id=tracker_id).values(*SCORE_FIELDS, *EWMA_FIELDS).get()
+        anomalies.flag_pushed(entry, *(row.pop(name) for name in EWMA_FIELDS))
+
+        # Queryset updates skip model signals, so move the branch score here,
+        # after commit: taking the branch row lock inside this transaction
+        # would serialize every push to the branch's trackers on it.
+        before = Tracker(id=tracker_id, **{**row, "running_total": row["running_total"] - value, "is_active": True})
+        change = (tracker_terms(before), tracker_terms(Tracker(id=tracker_id, **row)))
+        if change[0] != change[1]:
+            transaction.on_commit(lambda: _move_branch_score(alias, change), using=alias)
+    return entry, row["is_active"]
+
+
+def _move_branch_score(alias, change):
+    with using_alias(alias):
+        apply_change(*change)
+
 
 def get_tracker_current_value(tracker):
     if tracker.target_type == "VALUE":
-        last_entry = tracker.entries.order_by("-timestamp").first()
+        # Look in the current month first so a partitioned table only scans
+        # one partition in the common case.
+        month_start = now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        entries = tracker.entries.order_by("-timestamp")
+        last_entry = entries.filter(timestamp__gte=month_start).first() or entries.first()
         return last_entry.value if last_entry else 0
 
     if tracker.target_type == "SUM":
@@ -14,4 +84,106 @@ def get_tracker_current_value(tracker):
             Sum("value")
         )["value__sum"] or 0
 
+    if tracker.target_type == "THRESHOLD":
+        return tracker.running_total
+
     return 0
+
+
+def rebuild_tracker_state(tracker_ids):
+    """Re-derive state that depends on a tracker's entries after bulk writes."""
+    raw = dict(
+        TrackerEntry.objects.filter(tracker_id__in=tracker_ids)
+        .values_list("tracker_id")
+        .annotate(total=Sum("value"))
+        .values_list("tracker_id", "total")
+    )
+    rolled = dict(
+        TrackerDailyRollup.objects.filter(tracker_id__in=tracker_ids)
+        .values_list("tracker_id")
+        .annotate(total=Sum("total"))
+        .values_list("tracker_id", "total")
+    )
+    with transaction.atomic(using=current_alias()):
+        for tracker in Tracker.objects.select_for_update().filter(id__in=tracker_ids):
+            tracker.running_total = (raw.get(tracker.id) or 0) + (rolled.get(tracker.id) or 0)
+            if (
+                tracker.target_type == "THRESHOLD"
+                and tracker.target_value is not None
+                and tracker.running_total >= tracker.target_value
+            ):
+                tracker.is_active = False
+            tracker.save(update_fields=["running_total", "is_active"])
+    for tracker_id in tracker_ids:
+        anomalies.rescore_raw(tracker_id)
+
+
+def filter_time_range(qs, start=None, end=None, field="timestamp"):
+    """Bound a queryset by time so partitioned tables prune to the matching months."""
+    if start is not None:
+        qs = qs.filter(**{f"{field}__gte": start})
+    if end is not None:
+        qs = qs.filter(**{f"{field}__lt": end})
+    return qs
+
+
+def _rollups(tracker_id, owner, start=None, end=None):
+    """Rolled-up history, only present once retention has dropped raw partitions."""
+    if not settings.TRACKER_ENTRY_PARTITIONING:
+        return None
+    qs = TrackerDailyRollup.objects.filter(tracker_id=tracker_id, tracker__branch__owner=owner)
+    if start is not None:
+        qs = qs.filter(day__gte=start.date())
+    if end is not None:
+        qs = qs.filter(day__lt=end.date())
+    return qs
+
+
+def get_tracker_stats(tracker_id, owner, start=None, end=None):
+    entries = filter_time_range(
+        TrackerEntry.objects.filter(tracker_id=tracker_id, tracker__branch__owner=owner),
+        start,
+        end,
+    )
+    raw = entries.aggregate(
+        max=Max("value"), min=Min("value"), avg=Avg("value"), count=Count("id")
+    )
+    stats = {"max": raw["max"], "min": raw["min"], "avg": raw["avg"]}
+
+    rollups = _rollups(tracker_id, owner, start, end)
+    if rollups is not None:
+        old = rollups.aggregate(
+            max=Max("maximum"), min=Min("minimum"), total=Sum("total"), count=Sum("count")
+        )
+        if old["count"]:
+            values = [v for v in (stats["max"], old["max"]) if v is not None]
+            stats["max"] = max(values)
+            values = [v for v in (stats["min"], old["min"]) if v is not None]
+            stats["min"] = min(values)
+            count = raw["count"] + old["count"]
+            stats["avg"] = ((raw["avg"] or 0) * raw["count"] + old["total"]) / count
+    return stats
+
+
+def get_tracker_daily_totals(tracker_id, owner, start=None, end=None):
+    entries = filter_time_range(
+        TrackerEntry.objects.filter(tracker_id=tracker_id, tracker__branch__owner=owner),
+        start,
+        end,
+    )
+    data = (
+        entries
+        .annotate(day=TruncDate("timestamp"))
+        .values("day")
+        .annotate(total=Sum("value"))
+        .order_by("day")
+    )
+
+    rollups = _rollups(tracker_id, owner, start, end)
+    if rollups is None:
+        return list(data)
+
+    totals = {row["day"]: row["total"] for row in rollups.values("day", "total")}
+    for row in data:
+        totals[row["day"]] = totals.get(row["day"], 0) + row["total"]
+    return [{"day": day, "total": totals[day]} for day in sorted(totals)]
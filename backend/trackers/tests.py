@@ -1,3 +1,619 @@
-from django.test import TestCase
+import csv
+import gzip
+import io
+import json
+import sys
+import tempfile
+import threading
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection, connections
+import numpy as np
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from accounts.models import User
+from branches.models import Branch
+from core import sharding
+
+from . import anomalies, downsampling, export, forecasting, ingest, partitions
+from .models import Tracker, TrackerAnomaly, TrackerDailyRollup, TrackerEntry
+from .services import get_tracker_daily_totals, get_tracker_stats
+
+
+def read_csv_export(response):
+    body = gzip.decompress(b"".join(response.streaming_content)).decode()
+    return list(csv.DictReader(io.StringIO(body)))
+
+
+@skipUnless(settings.DB_SHARDS >= 2, "needs DB_SHARDS=2")
+class ShardedExportTests(TestCase):
+    databases = "__all__"
+
+    def test_export_streams_from_owner_shard(self):
+        user = User.objects.create_user("sharded", "pw")
+        alias = sharding.alias_for(user)
+        self.assertNotEqual(alias, "default")
+        self.client.force_login(user)
+        with sharding.using_alias(alias):
+            branch = Branch.objects.create(name="Health", owner=user)
+            tracker = Tracker.objects.create(name="Run", branch=branch)
+        for value in (1, 2, 3):
+            response = self.client.post(f"/api/trackers/{tracker.id}/push/", {"value": value}, content_type="application/json")
+            self.assertEqual(response.status_code, 201)
+
+        self.assertEqual(TrackerEntry.objects.using(alias).count(), 3)
+        rows = read_csv_export(self.client.get("/api/trackers/export/"))
+        self.assertEqual([float(row["value"]) for row in rows], [1.0, 2.0, 3.0])
+
+
+class PushEntryTests(TestCase):
+    databases = "__all__"
+
+    def setUp(self):
+        self.user = User.objects.create_user("ada", password="pw")
+        self.client.force_login(self.user)
+        with sharding.using_owner(self.user):
+            branch = Branch.objects.create(name="Health", owner=self.user)
+            self.tracker = Tracker.objects.create(
+                name="Water", branch=branch, target_type="THRESHOLD", target_value=5, weight=1
+            )
+
+    def push(self, value):
+        return self.client.post(
+            f"/api/trackers/{self.tracker.id}/push/", {"value": value}, content_type="application/json"
+        )
+
+    def reload(self):
+        with sharding.using_owner(self.user):
+            return Tracker.objects.get(id=self.tracker.id)
+
+    def test_push_adds_to_running_total(self):
+        response = self.push(2)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()["entry"]["value"], 2.0)
+        self.assertTrue(response.json()["is_active"])
+        self.assertEqual(self.reload().running_total, 2.0)
+
+    def test_crossing_the_threshold_kills_the_tracker(self):
+        self.push(3)
+        response = self.push(2.5)
+        self.assertFalse(response.json()["is_active"])
+        self.assertEqual(self.push(1).status_code, 404)
+        tracker = self.reload()
+        self.assertEqual((tracker.running_total, tracker.is_active), (5.5, False))
+
+    def test_flush_moves_each_branch_score_once_after_commit(self):
+        now = datetime.now(timezone.utc)
+        with sharding.using_owner(self.user):
+            other = Tracker.objects.create(
+                name="Tea", branch=self.tracker.branch, target_type="THRESHOLD", target_value=5, weight=1
+            )
+            alias = sharding.current_alias()
+            items = [ingest.PendingEntry(tracker.id, 5, now, db=alias) for tracker in (self.tracker, other)]
+            with CaptureQueriesContext(connections[alias]) as queries:
+                self.assertEqual(ingest.write_entries(items), 2)
+            branch = Branch.objects.get(id=self.tracker.branch_id)
+            expected = branch.calculate_score_terms()
+        updates = [query["sql"] for query in queries if query["sql"].startswith('UPDATE "branches_branch"')]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual((branch.score_earned, branch.score_total), expected)
+
+    def test_invalid_values_are_rejected(self):
+        for value in (None, "abc", "nan", "inf", "-Infinity", "1e400"):
+            with self.subTest(value=value):
+                self.assertEqual(self.push(value).status_code, 400)
+        tracker = self.reload()
+        self.assertEqual((tracker.running_total, tracker.ewma_count), (0, 0))
+        with sharding.using_owner(self.user):
+            self.assertFalse(TrackerEntry.objects.exists())
+
+    def test_unknown_tracker_is_not_found(self):
+        response = self.client.post("/api/trackers/0/push/", {"value": 1}, content_type="application/json")
+        self.assertEqual(response.status_code, 404)
+
+
+@override_settings(INGEST_BUFFER=True)
+class BufferedPushTests(TransactionTestCase):
+    databases = "__all__"
+
+    def setUp(self):
+        self.buffer = ingest.IngestBuffer(flush_size=50, flush_ms=5)
+        patcher = mock.patch.object(ingest, "_buffer", self.buffer)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.buffer.close)
+
+        self.user = User.objects.create_user("ada", password="pw")
+        self.client.force_login(self.user)
+        with sharding.using_owner(self.user):
+            branch = Branch.objects.create(name="Health", owner=self.user)
+            self.tracker = Tracker.objects.create(name="Water", branch=branch)
+
+    def push(self, value, key=None):
+        headers = {"Idempotency-Key": key} if key else {}
+        return self.client.post(
+            f"/api/trackers/{self.tracker.id}/push/", {"value": value}, content_type="application/json",
+            headers=headers,
+        )
+
+    def stored(self):
+        with sharding.using_owner(self.user):
+            return list(TrackerEntry.objects.values_list("value", flat=True))
+
+    def test_push_is_stored_by_the_flush(self):
+        response = self.push(2)
+        self.assertEqual(response.status_code, 201)
+        self.assertFalse(response.json()["queued"])
+        self.assertEqual(self.stored(), [2.0])
+
+    def test_slow_flush_answers_retryable_503(self):
+        release = threading.Event()
+        write = ingest.write_entries
+        self.addCleanup(release.set)
+        with mock.patch.object(ingest, "ACK_TIMEOUT", 0.05), \
+                mock.patch.object(ingest, "write_entries", lambda *a, **kw: release.wait(5) and write(*a, **kw)):
+            response = self.push(2)
+        self.assertEqual((response.status_code, response["Retry-After"]), (503, "1"))
+
+    def test_keyed_push_is_claimed_outside_the_flush(self):
+        first = self.push(2, key="k1")
+        retry = self.push(2, key="k1")
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual((retry.content, retry["Idempotent-Replayed"]), (first.content, "true"))
+        self.assertEqual(self.stored(), [2.0])
+
+
+@override_settings(INGEST_BUFFER=True)
+class LogAckPushTests(TransactionTestCase):
+    databases = "__all__"
+
+    def setUp(self):
+        log_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(log_dir.cleanup)
+        self.log_dir = log_dir.name
+        # Flushes only on close, so pushes stay queued.
+        self.buffer = ingest.IngestBuffer(flush_size=1000, flush_ms=60_000, ack="log", log_dir=self.log_dir)
+        patcher = mock.patch.object(ingest, "_buffer", self.buffer)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.user = User.objects.create_user("ada", password="pw")
+        self.client.force_login(self.user)
+        with sharding.using_owner(self.user):
+            branch = Branch.objects.create(name="Health", owner=self.user)
+            self.tracker = Tracker.objects.create(
+                name="Water", branch=branch, target_type="THRESHOLD", target_value=5
+            )
+
+    def push(self, value):
+        return self.client.post(
+            f"/api/trackers/{self.tracker.id}/push/", {"value": value}, content_type="application/json"
+        )
+
+    def reload(self):
+        with sharding.using_owner(self.user):
+            return Tracker.objects.get(id=self.tracker.id)
+
+    def test_acknowledged_entries_survive_threshold_death(self):
+        self.assertEqual(self.push(5).status_code, 202)
+        self.assertEqual(self.push(1).status_code, 202)
+        self.buffer.close()
+        tracker = self.reload()
+        self.assertEqual((tracker.running_total, tracker.is_active), (6.0, False))
+        with sharding.using_owner(self.user):
+            self.assertEqual(TrackerEntry.objects.count(), 2)
+
+    def test_dead_trackers_are_refused_before_the_ack(self):
+        self.push(1)
+        with sharding.using_owner(self.user):
+            Tracker.objects.filter(id=self.tracker.id).update(is_active=False)
+        self.assertEqual(self.push(1).status_code, 404)
+        self.buffer.close()
+        with sharding.using_owner(self.user):
+            self.assertEqual(TrackerEntry.objects.count(), 1)
+
+    def test_full_buffer_answers_retryable_503(self):
+        self.buffer.max_pending = 1
+        self.assertEqual(self.push(1).status_code, 202)
+        response = self.push(1)
+        self.assertEqual((response.status_code, response["Retry-After"]), (503, "1"))
+        self.buffer.close()
+        with sharding.using_owner(self.user):
+            self.assertEqual(TrackerEntry.objects.count(), 1)
+
+    def test_orphaned_segments_are_replayed_once(self):
+        self.buffer.close()
+        stored = datetime(2026, 3, 1, tzinfo=timezone.utc)
+        alias = sharding.alias_for(self.user)
+        with sharding.using_owner(self.user):
+            TrackerEntry.objects.create(tracker=self.tracker, value=1, timestamp=stored)
+        lines = [
+            [self.tracker.id, 1, stored.isoformat(), alias],
+            [self.tracker.id, 2, (stored + timedelta(hours=1)).isoformat(), alias],
+        ]
+        with open(f"{self.log_dir}/ingest-1-dead.log", "w") as segment:
+            segment.write("".join(json.dumps(line) + "\n" for line in lines) + '[1, "torn')
+
+        ingest.IngestBuffer(flush_size=1000, flush_ms=5, ack="log", log_dir=self.log_dir).close()
+        with sharding.using_owner(self.user):
+            self.assertEqual(sorted(TrackerEntry.objects.values_list("value", flat=True)), [1.0, 2.0])
+        self.assertFalse(list(Path(self.log_dir).glob("ingest-1-*.log")))
+
+    def test_entries_of_deleted_trackers_are_dropped(self):
+        self.push(1)
+        with sharding.using_owner(self.user):
+            self.tracker.delete()
+        dropped = ingest.DROPPED.get()
+        with self.assertLogs("trackers.ingest", "WARNING"):
+            self.buffer.close()
+        self.assertEqual(ingest.DROPPED.get(), dropped + 1)
+        with sharding.using_owner(self.user):
+            self.assertFalse(TrackerEntry.objects.exists())
+
+
+class PartitionTests(TestCase):
+    databases = "__all__"
+
+    def test_month_arithmetic(self):
+        self.assertEqual(partitions.month_start(datetime(2026, 2, 17, 8, tzinfo=timezone.utc)), date(2026, 2, 1))
+        self.assertEqual(partitions.add_months(date(2026, 11, 1), 3), date(2027, 2, 1))
+        self.assertEqual(partitions.add_months(date(2026, 1, 1), -1), date(2025, 12, 1))
+        self.assertEqual(partitions.partition_name(date(2026, 3, 1)), "trackers_trackerentry_p202603")
+
+    def test_partitioning_needs_postgresql(self):
+        with self.settings(TRACKER_ENTRY_PARTITIONING=True):
+            self.assertEqual(partitions.partitioning_enabled(), connection.vendor == "postgresql")
+
+    def test_retention_expires_months_and_default_partition_rows(self):
+        cursor = mock.MagicMock(rowcount=3)
+        cursor.__enter__.return_value = cursor
+        months = [(partitions.partition_name(date(2026, month, 1)), date(2026, month, 1)) for month in (1, 2, 3)]
+        with mock.patch.object(partitions, "connections", {"default": mock.Mock(cursor=lambda: cursor)}), \
+                mock.patch.object(partitions, "list_partitions", return_value=months):
+            expired = partitions.drop_partitions_before(date(2026, 3, 1))
+
+        self.assertEqual(expired, [months[0][0], months[1][0], partitions.DEFAULT_PARTITION])
+        statements = [call.args[0] for call in cursor.execute.call_args_list]
+        self.assertIn('DROP TABLE "trackers_trackerentry_p202602"', statements)
+        self.assertFalse(any("p202603" in sql for sql in statements))
+        default_sql, params = cursor.execute.call_args_list[-1].args
+        self.assertIn('DELETE FROM "trackers_trackerentry_default" WHERE "timestamp" < %s', default_sql)
+        self.assertIn('FROM "expired" GROUP BY', default_sql)
+        self.assertEqual(params, ["2026-03-01T00:00:00+00:00"])
+
+    @override_settings(TRACKER_ENTRY_PARTITIONING=True)
+    def test_stats_and_totals_include_rolled_up_months(self):
+        user = User.objects.create_user("ada")
+        branch = Branch.objects.create(name="Health", owner=user)
+        tracker = Tracker.objects.create(name="Run", branch=branch)
+        TrackerDailyRollup.objects.create(tracker=tracker, day=date(2025, 1, 5), count=2, total=10, minimum=4, maximum=6)
+        for value in (1, 3):
+            TrackerEntry.objects.create(tracker=tracker, value=value, timestamp=datetime(2026, 3, 1, 12, tzinfo=timezone.utc))
+
+        self.assertEqual(get_tracker_stats(tracker.id, user), {"max": 6, "min": 1, "avg": 3.5})
+        self.assertEqual(
+            [(row["day"], row["total"]) for row in get_tracker_daily_totals(tracker.id, user)],
+            [(date(2025, 1, 5), 10), (date(2026, 3, 1), 4)],
+        )
+        start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+        self.assertEqual(get_tracker_stats(tracker.id, user, start=start)["avg"], 2)
+
+
+class DownsamplingTests(SimpleTestCase):
+    def test_lttb_keeps_endpoints_and_spikes(self):
+        x = np.arange(100, dtype=np.float64)
+        y = np.zeros(100)
+        y[37] = 50
+        keep = downsampling.lttb(x, y, 10)
+        self.assertEqual(len(keep), 10)
+        self.assertEqual((keep[0], keep[-1]), (0, 99))
+        self.assertIn(37, keep)
+        self.assertEqual(list(keep), sorted(keep))
+
+    def test_lttb_returns_short_series_unchanged(self):
+        x = np.arange(5, dtype=np.float64)
+        self.assertEqual(list(downsampling.lttb(x, x, 10)), [0, 1, 2, 3, 4])
+
+
+class SeriesEndpointTests(TestCase):
+    databases = "__all__"
+    start = datetime(2026, 3, 1, tzinfo=timezone.utc)
+
+    def setUp(self):
+        self.user = User.objects.create_user("ada")
+        self.client.force_login(self.user)
+        with sharding.using_owner(self.user):
+            branch = Branch.objects.create(name="Health", owner=self.user)
+            self.tracker = Tracker.objects.create(name="Pulse", branch=branch)
+            TrackerEntry.objects.bulk_create(
+                TrackerEntry(tracker=self.tracker, value=minute % 7, timestamp=self.start + timedelta(minutes=minute))
+                for minute in range(600)
+            )
+
+    def series(self, **params):
+        return self.client.get(f"/api/trackers/{self.tracker.id}/series/", params)
+
+    def test_lttb_series(self):
+        points = self.series(points=50).json()["points"]
+        self.assertEqual(len(points), 50)
+        self.assertEqual(points[0], {"t": int(self.start.timestamp() * 1000), "v": 0.0})
+
+    def test_minmax_buckets(self):
+        end = self.start + timedelta(hours=10)
+        body = self.series(method="minmax", points=10, **{"from": self.start.isoformat(), "to": end.isoformat()}).json()
+        buckets = body["points"]
+        self.assertEqual(len(buckets), 10)
+        self.assertEqual(sum(bucket["count"] for bucket in buckets), 600)
+        self.assertEqual((buckets[0]["min"], buckets[0]["max"]), (0.0, 6.0))
+
+    def test_unknown_method_is_rejected(self):
+        self.assertEqual(self.series(method="spline").status_code, 400)
+
+
+class ExportTests(TestCase):
+    databases = "__all__"
+    start = datetime(2026, 3, 1, tzinfo=timezone.utc)
+
+    def setUp(self):
+        self.user = User.objects.create_user("ada")
+        self.client.force_login(self.user)
+        other = User.objects.create_user("bob")
+        with sharding.using_owner(self.user):
+            branch = Branch.objects.create(name="Health", owner=self.user)
+            tracker = Tracker.objects.create(name="Run", branch=branch)
+            self.entries = TrackerEntry.objects.bulk_create(
+                TrackerEntry(tracker=tracker, value=day, timestamp=self.start + timedelta(days=day))
+                for day in range(5)
+            )
+        with sharding.using_owner(other):
+            branch = Branch.objects.create(name="Other", owner=other)
+            TrackerEntry.objects.create(tracker=Tracker.objects.create(name="Swim", branch=branch), value=99)
+
+    def export(self, **params):
+        return self.client.get("/api/trackers/export/", params)
+
+    def test_csv_export_of_own_entries(self):
+        response = self.export()
+        self.assertEqual(response["Content-Type"], "application/gzip")
+        rows = read_csv_export(response)
+        self.assertEqual([row["value"] for row in rows], ["0.0", "1.0", "2.0", "3.0", "4.0"])
+        self.assertEqual(rows[0]["tracker_name"], "Run")
+
+    def test_cursor_resumes_after_the_last_row(self):
+        with sharding.using_owner(self.user):
+            batches = list(export.iter_batches(export.export_queryset(self.user), batch_size=2))
+        self.assertEqual([len(batch) for batch in batches], [2, 2, 1])
+        rows = read_csv_export(self.export(cursor=export.encode_cursor(batches[0][-1])))
+        self.assertEqual([row["value"] for row in rows], ["2.0", "3.0", "4.0"])
+        self.assertEqual(self.export(cursor="nope").status_code, 400)
+
+    def test_empty_export_has_a_header(self):
+        rows = read_csv_export(self.export(**{"from": "2030-01-01"}))
+        self.assertEqual(rows, [])
+
+    def test_arrow_without_pyarrow_is_a_bad_request(self):
+        with mock.patch.dict(sys.modules, {"pyarrow": None, "pyarrow.parquet": None}):
+            response = self.export(output="arrow")
+            self.assertEqual(response.status_code, 400)
+            self.assertIn("pyarrow", response.json()["error"])
+            with self.assertRaises(CommandError):
+                call_command("export_entries", "entries.parquet", user="ada", stdout=io.StringIO())
+
+    @skipUnless(pyarrow, "needs pyarrow")
+    def test_arrow_stream_and_parquet(self):
+        response = self.export(output="arrow")
+        table = pyarrow.ipc.open_stream(b"".join(response.streaming_content)).read_all()
+        self.assertEqual(table.column("value").to_pylist(), [0.0, 1.0, 2.0, 3.0, 4.0])
+
+        with tempfile.TemporaryDirectory() as directory, sharding.using_owner(self.user):
+            path = f"{directory}/entries.parquet"
+            written = export.write_export(export.iter_batches(export.export_queryset(self.user)), path, "parquet")
+            self.assertEqual(written, 5)
+            self.assertEqual(pyarrow.parquet.read_table(path).num_rows, 5)
+
+
+def naive_ewma(values, alpha):
+    """Per-value (count, mean, var) before each value, one step at a time."""
+    count, mean, var, states = 0, 0.0, 0.0, []
+    for value in values:
+        states.append((count, mean, var))
+        if count == 0:
+            mean, var = value, 0.0
+        else:
+            error = value - mean
+            mean, var = mean + alpha * error, (1 - alpha) * (var + alpha * error * error)
+        count += 1
+    return states, (count, mean, var)
+
+
+@override_settings(ANOMALY_ALPHA=0.1, ANOMALY_MIN_POINTS=10, ANOMALY_Z=4.0)
+class EwmaTests(SimpleTestCase):
+    values = np.sin(np.arange(300) / 5.0) * 3 + np.arange(300) % 4
+
+    def test_scan_matches_the_step_by_step_recurrence(self):
+        counts, means, variances, state = anomalies.ewma_scan(self.values)
+        states, final = naive_ewma(self.values, 0.1)
+        np.testing.assert_array_equal(counts, [count for count, _, _ in states])
+        np.testing.assert_allclose(means, [mean for _, mean, _ in states], rtol=1e-9, atol=1e-9)
+        np.testing.assert_allclose(variances, [var for _, _, var in states], rtol=1e-9, atol=1e-9)
+        np.testing.assert_allclose(state, final, rtol=1e-9)
+
+    def test_chunked_scan_carries_state(self):
+        whole = anomalies.ewma_flags(self.values)
+        state, flagged = (0, 0.0, 0.0), []
+        for offset in range(0, len(self.values), 70):
+            indices, _, _, state = anomalies.ewma_flags(self.values[offset:offset + 70], *state)
+            flagged.extend(indices + offset)
+        self.assertEqual(flagged, list(whole[0]))
+        np.testing.assert_allclose(state, whole[3], rtol=1e-9)
+
+    def test_spike_is_flagged_after_warm_up(self):
+        values = np.concatenate((np.tile([10.0, 11.0], 10), [40.0]))
+        flagged, expected, scores, _ = anomalies.ewma_flags(values)
+        self.assertEqual(list(flagged), [20])
+        self.assertGreater(scores[0], 4.0)
+        self.assertAlmostEqual(expected[0], 10.5, delta=0.5)
+        # The same spike before MIN_POINTS values is not scored.
+        self.assertEqual(len(anomalies.ewma_flags(values[-5:])[0]), 0)
+
+    def test_state_before_inverts_one_update(self):
+        _, (count, mean, var) = naive_ewma(self.values[:50], 0.1)
+        states, after = naive_ewma(self.values[:51], 0.1)
+        restored = anomalies.state_before(*after, self.values[50])
+        np.testing.assert_allclose(restored, (count, mean, var), rtol=1e-9)
+
+    def test_rolling_zscores(self):
+        means, scores = anomalies.rolling_zscores([1, 2, 1, 2, 1, 2, 30], window=6)
+        self.assertTrue(np.isnan(scores[:6]).all())
+        self.assertAlmostEqual(means[6], 1.5)
+        self.assertAlmostEqual(scores[6], (30 - 1.5) / 0.5)
+
+
+@override_settings(ANOMALY_ALPHA=0.1, ANOMALY_MIN_POINTS=10, ANOMALY_Z=4.0)
+class AnomalyTests(TestCase):
+    databases = "__all__"
+
+    def setUp(self):
+        self.user = User.objects.create_user("ada")
+        self.client.force_login(self.user)
+        with sharding.using_owner(self.user):
+            branch = Branch.objects.create(name="Health", owner=self.user)
+            self.tracker = Tracker.objects.create(name="Pulse", branch=branch)
+
+    def push(self, value):
+        response = self.client.post(
+            f"/api/trackers/{self.tracker.id}/push/", {"value": value}, content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 201)
+
+    def flags(self):
+        with sharding.using_owner(self.user):
+            return list(
+                TrackerAnomaly.objects.filter(resolution="raw").order_by("timestamp").values_list("value", "score")
+            )
+
+    def state(self):
+        with sharding.using_owner(self.user):
+            return Tracker.objects.filter(id=self.tracker.id).values_list("ewma_count", "ewma_mean", "ewma_var").get()
+
+    def test_pushes_flag_spikes_and_rescoring_agrees(self):
+        for value in [10, 11] * 10 + [40, 10]:
+            self.push(value)
+        pushed, state = self.flags(), self.state()
+        self.assertEqual([value for value, _ in pushed], [40.0])
+        self.assertEqual(state[0], 22)
+
+        response = self.client.get(f"/api/trackers/{self.tracker.id}/anomalies/")
+        self.assertEqual([row["value"] for row in response.json()], [40.0])
+
+        with sharding.using_owner(self.user):
+            self.assertEqual(anomalies.rescore_raw(self.tracker.id, chunk_size=7), 1)
+        [(value, score)] = self.flags()
+        self.assertEqual(value, 40.0)
+        self.assertAlmostEqual(score, pushed[0][1], places=6)
+        np.testing.assert_allclose(self.state(), state, rtol=1e-9)
+
+    def test_score_anomalies_command(self):
+        with sharding.using_owner(self.user):
+            TrackerEntry.objects.bulk_create(
+                TrackerEntry(tracker=self.tracker, value=value, timestamp=datetime(2026, 3, 1, minute, tzinfo=timezone.utc))
+                for minute, value in enumerate([10, 11] * 10 + [40])
+            )
+        out = io.StringIO()
+        with sharding.using_owner(self.user):
+            call_command("score_anomalies", tracker=[self.tracker.id], daily=True, stdout=out)
+        self.assertIn("Scored 1 trackers: 1 raw", out.getvalue())
+        self.assertEqual(self.flags()[0][0], 40.0)
+        self.assertEqual(self.state()[0], 21)
+
+
+class ForecastModelTests(SimpleTestCase):
+    def test_holt_and_linear_follow_a_line(self):
+        series = np.array([[0.0, 0.0, 5.0, 7.0, 9.0, 11.0], [1.0, 2.0, 3.0, 4.0, 5.0, 6.0]])
+        first = np.array([2, 0])
+        level, trend = forecasting.linear(series, first)
+        np.testing.assert_allclose(level, [11.0, 6.0])
+        np.testing.assert_allclose(trend, [2.0, 1.0])
+        level, trend = forecasting.holt(series, first)
+        self.assertTrue((trend > 0).all())
+        self.assertTrue((level <= series[:, -1]).all())
+        np.testing.assert_allclose(forecasting.project(np.array([1.0]), np.array([2.0]), 3), [[3.0, 5.0, 7.0]])
+
+    def test_carry_forward_fills_gaps_in_each_row(self):
+        values = np.array([[0.0, 4.0, 0.0, 6.0, 0.0]])
+        observed = values > 0
+        np.testing.assert_array_equal(forecasting.carry_forward(values, observed), [[4.0, 4.0, 4.0, 6.0, 6.0]])
+
+
+@override_settings(FORECAST_WINDOW_DAYS=14, FORECAST_HORIZON_DAYS=60)
+class ForecastEndpointTests(TestCase):
+    databases = "__all__"
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user("ada")
+        self.client.force_login(self.user)
+        today = datetime.now(timezone.utc).replace(hour=12, minute=0, second=0, microsecond=0)
+        with sharding.using_owner(self.user):
+            branch = Branch.objects.create(name="Health", owner=self.user)
+            self.threshold = Tracker.objects.create(
+                name="Steps", branch=branch, target_type="THRESHOLD", target_value=100, running_total=20
+            )
+            self.value = Tracker.objects.create(
+                name="Weight", branch=branch, tracker_type="DECREMENT", target_type="VALUE", target_value=70
+            )
+            self.new = Tracker.objects.create(name="Pages", branch=branch, target_type="SUM", target_value=10)
+            Tracker.objects.create(name="Mood", branch=branch)
+            TrackerEntry.objects.bulk_create(
+                [TrackerEntry(tracker=self.threshold, value=2, timestamp=today - timedelta(days=day)) for day in range(10)]
+                + [TrackerEntry(tracker=self.value, value=72, timestamp=today - timedelta(days=day)) for day in range(10)]
+                + [TrackerEntry(tracker=self.new, value=1, timestamp=today)]
+            )
+
+    def forecast(self, **params):
+        response = self.client.get("/api/trackers/forecast/", params)
+        self.assertEqual(response.status_code, 200)
+        return {row["tracker"]: row for row in response.json()}
+
+    def test_statuses(self):
+        for method in forecasting.METHODS:
+            with self.subTest(method=method):
+                rows = self.forecast(method=method)
+                self.assertEqual(set(rows), {self.threshold.id, self.value.id, self.new.id})
+                steps = rows[self.threshold.id]
+                self.assertEqual((steps["status"], steps["days"]), ("on_track", 40))
+                self.assertAlmostEqual(steps["trend"], 0.0)
+                self.assertEqual(rows[self.value.id]["status"], "off_track")
+                self.assertEqual(rows[self.value.id]["current"], 72.0)
+                self.assertEqual(rows[self.new.id]["status"], "insufficient_data")
+
+    def test_met_target_is_reached(self):
+        with sharding.using_owner(self.user):
+            Tracker.objects.filter(id=self.value.id).update(target_value=75)
+        self.assertEqual(self.forecast()[self.value.id]["status"], "reached")
+
+    def test_forecasts_are_cached_until_entries_change(self):
+        with mock.patch.object(forecasting, "compute_forecasts", wraps=forecasting.compute_forecasts) as compute:
+            self.forecast()
+            self.forecast()
+            self.assertEqual(compute.call_count, 1)
+            with sharding.using_owner(self.user):
+                Tracker.objects.filter(id=self.threshold.id).update(running_total=100)
+            self.assertEqual(self.forecast()[self.threshold.id]["status"], "reached")
+            self.assertEqual(compute.call_count, 2)
+
+    def test_unknown_method_is_rejected(self):
+        self.assertEqual(self.client.get("/api/trackers/forecast/", {"method": "arima"}).status_code, 400)
@@ -5,12 +5,20 @@ from .views import (
     tracker_entries,
     tracker_analytics,
     tracker_heatmap,
+    tracker_series,
+    tracker_anomalies,
+    tracker_forecast,
+    export_entries,
 )
 
 urlpatterns = [
     path("", TrackerListCreateView.as_view()),
+    path("export/", export_entries),
+    path("forecast/", tracker_forecast),
     path("<int:tracker_id>/push/", push_entry),
     path("<int:tracker_id>/entries/", tracker_entries),
     path("<int:tracker_id>/analytics/", tracker_analytics),
     path("<int:tracker_id>/heatmap/", tracker_heatmap),
+    path("<int:tracker_id>/series/", tracker_series),
+    path("<int:tracker_id>/anomalies/", tracker_anomalies),
 ]
@@ -1,3 +1,6 @@
+import logging
+import math
+
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
@@ -7,7 +10,12 @@ from .models import Tracker
 from .serializers import TrackerSerializer
 from .serializers import TrackerEntrySerializer
 from branches.models import Branch
+from core import metrics
+from core.fieldsets import list_response
+from core.timerange import parse_time_range
+from streaks.services import on_entry_pushed
 
+logger = logging.getLogger(__name__)
 
 class TrackerListCreateView(APIView):
     permission_classes = [IsAuthenticated]
@@ -15,11 +23,11 @@ class TrackerListCreateView(APIView):
     def get(self, request):
         branch_id = request.query_params.get("branch")
         trackers = Tracker.objects.filter(branch__owner=request.user)
-        print("Initial trackers:", trackers)
+        logger.debug("Listing trackers", extra={"branch_id": branch_id})
         if branch_id:
             trackers = trackers.filter(branch_id=branch_id)
 
-        return Response(TrackerSerializer(trackers, many=True).data)
+        return list_response(request, trackers, TrackerSerializer)
 
     def post(self, request):
         serializer = TrackerSerializer(data=request.data)
@@ -30,79 +38,234 @@ class TrackerListCreateView(APIView):
 
         return Response(TrackerSerializer(tracker).data, status=201)
 
-from rest_framework.decorators import api_view, permission_classes
-from .models import TrackerEntry
-from .services import get_tracker_current_value
+from django.conf import settings
+from rest_framework.decorators import api_view, permission_classes, throttle_classes
+from core.idempotency import idempotent
+from core.throttling import ANALYTICS_THROTTLES, WRITE_THROTTLES, keep_stale
+from . import forecasting, ingest
+from .models import TrackerAnomaly, TrackerEntry
+from .serializers import TrackerAnomalySerializer
+from .services import (
+    filter_time_range,
+    get_tracker_daily_totals,
+    get_tracker_stats,
+    push_value,
+)
+
+def _pushes_inline():
+    # Buffered entries are committed by the flush thread, outside the
+    # Idempotency-Key transaction (see core.idempotency).
+    return not settings.INGEST_BUFFER
+
 
 @api_view(["POST"])
 @permission_classes([IsAuthenticated])
+@throttle_classes(WRITE_THROTTLES)
+@idempotent(atomic=_pushes_inline)
 def push_entry(request, tracker_id):
-    tracker = Tracker.objects.get(
-        id=tracker_id,
-        branch__owner=request.user,
-        is_active=True,
-    )
-
     value = request.data.get("value")
     if value is None:
         return Response({"error": "value required"}, status=400)
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return Response({"error": "value must be a number"}, status=400)
+    if not math.isfinite(value):
+        # NaN and infinities would poison running totals and EWMA state.
+        return Response({"error": "value must be a finite number"}, status=400)
 
-    entry = TrackerEntry.objects.create(
-        tracker=tracker,
-        value=value,
-    )
+    if settings.INGEST_BUFFER:
+        # The buffer's flush applies threshold death, streaks and metrics.
+        try:
+            entry, is_active = ingest.get_buffer().push(tracker_id, request.user, value)
+        except Tracker.DoesNotExist:
+            return Response({"error": "Tracker not found or inactive"}, status=404)
+        except ingest.IngestOverloaded:
+            return Response({"error": "Ingest is overloaded, retry shortly"}, status=503, headers={"Retry-After": "1"})
+        queued = entry.pk is None
+        return Response({
+            "entry": TrackerEntrySerializer(entry).data,
+            "is_active": is_active,
+            "queued": queued,
+        }, status=202 if queued else 201)
 
-    # Handle threshold death
-    if tracker.target_type == "THRESHOLD":
-        current = get_tracker_current_value(tracker)
-        if current >= tracker.target_value:
-            tracker.is_active = False
-            tracker.save()
+    # Threshold death is applied inside push_value's transaction.
+    try:
+        entry, is_active = push_value(tracker_id, request.user, value)
+    except Tracker.DoesNotExist:
+        return Response({"error": "Tracker not found or inactive"}, status=404)
+    metrics.ENTRIES_INGESTED.inc(source="push")
+    on_entry_pushed(entry, request.user)
 
     return Response({
         "entry": TrackerEntrySerializer(entry).data,
-        "is_active": tracker.is_active,
+        "is_active": is_active,
     }, status=201)
 
+from django.db.models import Max, Min
+from datetime import timedelta
+
+from django.http import StreamingHttpResponse
+
+from . import export
+from .downsampling import bucket_series, lttb_series
+
+
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
 def tracker_entries(request, tracker_id):
-    entries = TrackerEntry.objects.filter(
-        tracker_id=tracker_id,
-        tracker__branch__owner=request.user,
+    try:
+        start, end = parse_time_range(request)
+    except ValueError as exc:
+        return Response({"error": str(exc)}, status=400)
+
+    entries = filter_time_range(
+        TrackerEntry.objects.filter(
+            tracker_id=tracker_id,
+            tracker__branch__owner=request.user,
+        ),
+        start,
+        end,
     ).order_by("-timestamp")
 
-    return Response(TrackerEntrySerializer(entries, many=True).data)
+    return list_response(request, entries, TrackerEntrySerializer)
 
-from django.db.models import Avg, Max, Min
 
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
+@throttle_classes(ANALYTICS_THROTTLES)
+@keep_stale
 def tracker_analytics(request, tracker_id):
-    qs = TrackerEntry.objects.filter(
-        tracker_id=tracker_id,
-        tracker__branch__owner=request.user,
-    )
+    try:
+        start, end = parse_time_range(request)
+    except ValueError as exc:
+        return Response({"error": str(exc)}, status=400)
 
-    return Response({
-        "max": qs.aggregate(Max("value"))["value__max"],
-        "min": qs.aggregate(Min("value"))["value__min"],
-        "avg": qs.aggregate(Avg("value"))["value__avg"],
-    })
+    return Response(get_tracker_stats(tracker_id, request.user, start, end))
 
-from django.db.models.functions import TruncDate
-from django.db.models import Sum
 
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
+@throttle_classes(ANALYTICS_THROTTLES)
+@keep_stale
 def tracker_heatmap(request, tracker_id):
-    data = (
-        TrackerEntry.objects
-        .filter(tracker_id=tracker_id, tracker__branch__owner=request.user)
-        .annotate(day=TruncDate("timestamp"))
-        .values("day")
-        .annotate(total=Sum("value"))
-        .order_by("day")
+    try:
+        start, end = parse_time_range(request)
+    except ValueError as exc:
+        return Response({"error": str(exc)}, status=400)
+
+    return Response(get_tracker_daily_totals(tracker_id, request.user, start, end))
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+@throttle_classes(ANALYTICS_THROTTLES)
+@keep_stale
+def tracker_forecast(request):
+    method = request.query_params.get("method", "holt")
+    if method not in forecasting.METHODS:
+        return Response({"error": f"method must be one of {', '.join(forecasting.METHODS)}"}, status=400)
+
+    return Response(forecasting.forecast_trackers(request.user, method))
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+@throttle_classes(ANALYTICS_THROTTLES)
+@keep_stale
+def tracker_anomalies(request, tracker_id):
+    try:
+        start, end = parse_time_range(request)
+    except ValueError as exc:
+        return Response({"error": str(exc)}, status=400)
+
+    resolution = request.query_params.get("resolution", "raw")
+    if resolution not in ("raw", "daily"):
+        return Response({"error": "resolution must be raw or daily"}, status=400)
+
+    anomalies = filter_time_range(
+        TrackerAnomaly.objects.filter(
+            tracker_id=tracker_id,
+            tracker__branch__owner=request.user,
+            resolution=resolution,
+        ),
+        start,
+        end,
+    ).order_by("-timestamp")
+
+    return list_response(request, anomalies, TrackerAnomalySerializer)
+
+
+SERIES_METHODS = ("lttb", "minmax")
+MAX_SERIES_POINTS = 5000
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+@throttle_classes(ANALYTICS_THROTTLES)
+@keep_stale
+def tracker_series(request, tracker_id):
+    try:
+        start, end = parse_time_range(request)
+        points = int(request.query_params.get("points", 500))
+    except ValueError as exc:
+        return Response({"error": str(exc)}, status=400)
+
+    method = request.query_params.get("method", "lttb")
+    if method not in SERIES_METHODS:
+        return Response({"error": f"method must be one of {', '.join(SERIES_METHODS)}"}, status=400)
+    points = max(3, min(points, MAX_SERIES_POINTS))
+
+    entries = filter_time_range(
+        TrackerEntry.objects.filter(
+            tracker_id=tracker_id,
+            tracker__branch__owner=request.user,
+        ),
+        start,
+        end,
     )
 
-    return Response(list(data))
+    if method == "lttb":
+        series = lttb_series(entries, points)
+    else:
+        if start is None or end is None:
+            bounds = entries.aggregate(first=Min("timestamp"), last=Max("timestamp"))
+            start = start or bounds["first"]
+            end = end or (bounds["last"] and bounds["last"] + timedelta(microseconds=1))
+        series = bucket_series(entries, start, end, points) if start and end else []
+
+    return Response({"method": method, "points": series})
+
+
+EXPORT_CONTENT_TYPES = {
+    "csv": ("application/gzip", "entries.csv.gz"),
+    "arrow": ("application/vnd.apache.arrow.stream", "entries.arrow"),
+}
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+@throttle_classes(ANALYTICS_THROTTLES)
+def export_entries(request):
+    # Not ?format=, which DRF reserves for renderer selection.
+    fmt = request.query_params.get("output", "csv")
+    if fmt not in EXPORT_CONTENT_TYPES:
+        return Response({"error": "output must be csv or arrow"}, status=400)
+
+    try:
+        start, end = parse_time_range(request)
+        qs = export.export_queryset(
+            request.user, start, end, cursor=request.query_params.get("cursor")
+        )
+        # The response streams after the routing middleware (replica, shard)
+        # has exited, so pin the database the router picks now.
+        qs = qs.using(qs.db)
+        batches = export.iter_batches(qs)
+        stream = export.iter_arrow_stream(batches) if fmt == "arrow" else export.iter_csv_gzip(batches)
+    except (ValueError, ImportError) as exc:
+        return Response({"error": str(exc)}, status=400)
+
+    content_type, filename = EXPORT_CONTENT_TYPES[fmt]
+    response = StreamingHttpResponse(stream, content_type=content_type)
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response